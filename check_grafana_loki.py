@@ -1,7 +1,5 @@
 #!/usr/bin/env python3
-import requests
-import json
-from datetime import datetime, timedelta
+from loki_query import LokiQueryClient, LokiQueryError
 
 def check_grafana_loki_connection():
     """Check if Grafana can connect to Loki"""
@@ -19,39 +17,22 @@ def check_grafana_loki_connection():
     print(f"📡 Loki URL: {loki_url}")
     print("-" * 50)
     
+    client = LokiQueryClient(loki_url, timeout=10)
+    
     # First, verify Loki is accessible
-    try:
-        loki_response = requests.get(f"{loki_url}/ready", timeout=5)
-        print(f"✅ Loki server is accessible: {loki_response.status_code}")
-    except Exception as e:
-        print(f"❌ Loki server not accessible: {e}")
+    if client.ready():
+        print("✅ Loki server is accessible")
+    else:
+        print("❌ Loki server not accessible")
         return
     
-    # Check if we can query Loki directly
+    # Check if we can query Loki directly; Loki counts the whole hour server-side
     try:
-        query_url = f"{loki_url}/loki/api/v1/query_range"
-        params = {
-            "query": "{job=\"test_agent\"}",
-            "start": str(int((datetime.now() - timedelta(hours=1)).timestamp() * 1000000000)),
-            "end": str(int(datetime.now().timestamp() * 1000000000)),
-            "limit": 5
-        }
-        
-        response = requests.get(query_url, params=params, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "success":
-                streams = data.get("data", {}).get("result", [])
-                print(f"✅ Loki query successful: Found {len(streams)} streams")
-                for stream in streams:
-                    labels = stream.get("stream", {})
-                    values = stream.get("values", [])
-                    print(f"   📊 Stream: {labels} - {len(values)} entries")
-            else:
-                print(f"❌ Loki query failed: {data}")
-        else:
-            print(f"❌ Loki query HTTP error: {response.status_code}")
-    except Exception as e:
+        streams = client.count_over_time("{job=\"test_agent\"}", since=3600)
+        print(f"✅ Loki query successful: Found {len(streams)} streams")
+        for labels, count in streams.items():
+            print(f"   📊 Stream: {dict(labels)} - {count} entries")
+    except LokiQueryError as e:
         print(f"❌ Loki query error: {e}")
     
     print("\n" + "=" * 50)
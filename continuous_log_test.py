@@ -1,10 +1,20 @@
 #!/usr/bin/env python3
-import requests
+import os
 import time
-import json
 from datetime import datetime
 import random
 
+from loki_client import LokiClient, spill_dir
+
+def report_push(result, streams):
+    """Print the outcome of each batch sent by the Loki client"""
+    if result.ok:
+        print(f"✅ Pushed {result.entries} log(s) in {result.streams} stream(s)")
+    elif result.spilled:
+        print(f"💾 Spilled {result.entries} log(s) to disk for replay: {result.error}")
+    else:
+        print(f"❌ Failed to push {result.entries} log(s) after {result.attempts} attempt(s): {result.error}")
+
 def push_continuous_logs():
     """Continuously push test logs to remote Loki server"""
     loki_url = "http://100.64.0.160:3100/loki/api/v1/push"
@@ -24,6 +34,14 @@ def push_continuous_logs():
     print("🛑 Press Ctrl+C to stop")
     print("-" * 50)
     
+    # Batches that cannot be delivered are spilled to disk and replayed once Loki is back;
+    # set LOKI_CLIENT_METRICS_PORT to expose loki_client_spill_backlog_bytes
+    client = LokiClient(loki_url, timeout=5, on_result=report_push, spill_dir=spill_dir("continuous_log_test"))
+    metrics_port = os.environ.get("LOKI_CLIENT_METRICS_PORT")
+    if metrics_port:
+        from prometheus_client import start_http_server
+        start_http_server(int(metrics_port))
+        print(f"📈 Metrics on :{metrics_port}/metrics")
     try:
         counter = 1
         while True:
@@ -33,44 +51,25 @@ def push_continuous_logs():
             log_type, level, description = random.choice(log_types)
             log_message = f"{description} #{counter} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Random data: {random.randint(1000, 9999)}"
             
-            # Prepare the payload
-            stream = {
-                "stream": {
-                    "job": log_type,
-                    "instance": "GC-aro12-agent",
-                    "level": level,
-                    "logger": f"{log_type}_logger",
-                    "service_name": "telemetry_agent"
-                },
-                "values": [
-                    [str(current_time), log_message]
-                ]
+            labels = {
+                "job": log_type,
+                "instance": "GC-aro12-agent",
+                "level": level,
+                "logger": f"{log_type}_logger",
+                "service_name": "telemetry_agent"
             }
-            
-            payload = {"streams": [stream]}
-            
-            try:
-                response = requests.post(
-                    loki_url,
-                    headers={"Content-Type": "application/json"},
-                    json=payload,
-                    timeout=5
-                )
-                
-                if response.status_code == 204:
-                    print(f"✅ [{counter:03d}] {log_type.upper()}/{level} - {log_message[:50]}...")
-                else:
-                    print(f"❌ [{counter:03d}] Failed to push log: {response.status_code}")
-                    
-            except Exception as e:
-                print(f"❌ [{counter:03d}] Error pushing log: {e}")
+            client.push(log_message, labels, current_time)
+            print(f"📝 [{counter:03d}] {log_type.upper()}/{level} - {log_message[:50]}...")
             
             counter += 1
             time.sleep(5)  # Wait 5 seconds between pushes
             
     except KeyboardInterrupt:
         print("\n🛑 Stopped by user")
-        print(f"📊 Total logs pushed: {counter - 1}")
+    finally:
+        client.close()
+        print(f"📊 Total logs pushed: {client.sent_entries}, replayed: {client.replayed_entries}, "
+              f"failed: {client.failed_entries}, still spilled: {client.spilled_entries}")
 
 if __name__ == "__main__":
     push_continuous_logs()
@@ -3,8 +3,8 @@ import time
 import random
 from datetime import datetime
 
-def generate_sdp_error_log():
-    """Generate SDP error log in the specified format"""
+def generate_sdp_error_log(rng=random):
+    """Generate SDP error log in the specified format; pass a random.Random for reproducible output"""
     
     # SDP error templates
     game_types = ["SPEED_ROULETTE", "BACCARAT", "BLACKJACK", "SIC_BO"]
@@ -12,16 +12,16 @@ def generate_sdp_error_log():
     table_names = ["Speed Roulette", "Baccarat Table", "Blackjack Table","Sic Bo Table"]
     
     # Generate random error
-    game_type = random.choice(game_types)
-    error_code = random.choice(error_codes)
-    table_name = random.choice(table_names)
+    game_type = rng.choice(game_types)
+    error_code = rng.choice(error_codes)
+    table_name = rng.choice(table_names)
     
     # Generate error message based on error code
     error_messages = {
-        "SENSOR_STUCK": f"SENSOR ERROR - Detected warning_flag={random.randint(1, 8)} in *X;{random.randint(1, 10)} message",
-        "ZCAM_ERROR": f"ZCAM ERROR - Frame capture failed, retry count: {random.randint(1, 5)}",
-        "NETWORK_TIMEOUT": f"NETWORK ERROR - Connection timeout after {random.randint(5, 30)}s",
-        "HARDWARE_FAILURE": f"HARDWARE ERROR - Component {random.choice(['A', 'B', 'C'])} failed self-test",
+        "SENSOR_STUCK": f"SENSOR ERROR - Detected warning_flag={rng.randint(1, 8)} in *X;{rng.randint(1, 10)} message",
+        "ZCAM_ERROR": f"ZCAM ERROR - Frame capture failed, retry count: {rng.randint(1, 5)}",
+        "NETWORK_TIMEOUT": f"NETWORK ERROR - Connection timeout after {rng.randint(5, 30)}s",
+        "HARDWARE_FAILURE": f"HARDWARE ERROR - Component {rng.choice(['A', 'B', 'C'])} failed self-test",
     }
     
     error_message = error_messages.get(error_code, "Unknown error occurred")
@@ -2,30 +2,475 @@
 """
 Grafana Webhook Service for SRS Log Monitoring
 Receives alerts from Grafana and triggers API calls when okbps=0,0,0 is detected
+
+Status updates are queued and sent by a pool of dispatch workers, so the webhook
+answers Grafana with 202 immediately instead of waiting on the status API.
+
+Each table's active alerts are tracked in TableStateCache: a table is 'down'
+while any handled alert is firing for it and 'up' once all have resolved.
+Updates within WEBHOOK_COALESCE_WINDOW are merged into one PATCH, and PATCHes
+that would not change the table's last sent state are suppressed.
+
+Alerts are routed by the rule table in WEBHOOK_ROUTES_FILE (webhook_routes.yml),
+compiled into an AlertRouter and reloaded when the file changes.
+
+Production: gunicorn -c webhook_gunicorn_conf.py grafana_webhook_service:app
+Running this file directly starts the Flask development server.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from requests.adapters import HTTPAdapter
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, NamedTuple, Optional, Pattern, Set, Tuple
 import requests
+import yaml
+import atexit
 import logging
 import json
+import os
+import queue
+import random
+import re
+import signal
+import sys
+import threading
+import time
 from datetime import datetime
 
 app = Flask(__name__)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ]
-)
+# Logging configuration
+LOG_LEVEL = os.environ.get("WEBHOOK_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("WEBHOOK_LOG_FORMAT", "text")  # text | json
+# Fraction of incoming payloads logged in full; the rest are logged as a summary line
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get("WEBHOOK_LOG_PAYLOAD_SAMPLE_RATE", "1.0"))
+LOG_MAX_PAYLOAD_CHARS = int(os.environ.get("WEBHOOK_LOG_MAX_PAYLOAD_CHARS", "2000"))
+
+
+class LazyJson:
+    """Defers json.dumps and truncation until a log record is actually formatted"""
+
+    def __init__(self, value: Any, max_chars: int = LOG_MAX_PAYLOAD_CHARS):
+        self.value = value
+        self.max_chars = max_chars
+
+    def __str__(self) -> str:
+        text = self.value if isinstance(self.value, str) else json.dumps(self.value, separators=(',', ':'), default=str)
+        if self.max_chars and len(text) > self.max_chars:
+            return f"{text[:self.max_chars]}...(+{len(text) - self.max_chars} chars)"
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including `extra` fields"""
+
+    RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in self.RESERVED})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves message formatting to the listener thread
+
+    The stock handler merges msg and args in the calling thread; here only the
+    traceback is rendered up front, so payload serialization and log I/O both
+    happen off the request thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(vars(record))
+        record.exc_info = None
+        return record
+
+
+def setup_logging() -> QueueListener:
+    """Route all logging through a queue drained by a background listener"""
+    handler = logging.StreamHandler()
+    if LOG_FORMAT == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    root = logging.getLogger()
+    root.handlers = [DeferredQueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Configuration
 API_ENDPOINT = "http://localhost:8085/v1/service/status"
 API_SIGNATURE = "rgs-local-signature"
 
+# Dispatch configuration
+DISPATCH_WORKERS = int(os.environ.get("WEBHOOK_DISPATCH_WORKERS", "4"))
+DISPATCH_QUEUE_SIZE = int(os.environ.get("WEBHOOK_DISPATCH_QUEUE_SIZE", "1000"))
+DISPATCH_MAX_RETRIES = int(os.environ.get("WEBHOOK_DISPATCH_MAX_RETRIES", "3"))
+DISPATCH_BACKOFF_BASE = float(os.environ.get("WEBHOOK_DISPATCH_BACKOFF_BASE", "0.5"))
+DISPATCH_TIMEOUT = float(os.environ.get("WEBHOOK_DISPATCH_TIMEOUT", "10"))
+DRAIN_TIMEOUT = float(os.environ.get("WEBHOOK_DRAIN_TIMEOUT", "20"))
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Routing configuration
+ROUTES_FILE = os.environ.get(
+    "WEBHOOK_ROUTES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "webhook_routes.yml")
+)
+ROUTES_RELOAD_INTERVAL = float(os.environ.get("WEBHOOK_ROUTES_RELOAD_INTERVAL", "5"))
+ROUTE_ACTIONS = ('table_status', 'ignore')
+
+# Used when the routes file cannot be loaded at startup; mirrors webhook_routes.yml
+DEFAULT_ROUTES = [
+    {"name": "srs-service", "match": {"service": "srs"}, "source": "SRS"},
+    {"name": "srs-no-data", "match": {"alertname": "SRSNoDataAlert"}, "source": "SRS"},
+    {"name": "srs-okbps-alertname", "match_re": {"alertname": "okbps"}, "source": "SRS"},
+    {"name": "srs-okbps-rulename", "match_re": {"rulename": "okbps"}, "source": "SRS"},
+    {"name": "ffmpeg-service", "match": {"service": "ffmpeg"}, "source": "FFmpeg/ZCAM"},
+    {"name": "zcam-device", "match": {"device": "zcam"}, "source": "FFmpeg/ZCAM"},
+    {"name": "frame-stuck", "match": {"alert_type": "frame_stuck"}, "source": "FFmpeg/ZCAM"},
+]
+
+# Per-table state cache configuration
+STATE_TTL = float(os.environ.get("WEBHOOK_STATE_TTL", "600"))
+COALESCE_WINDOW = float(os.environ.get("WEBHOOK_COALESCE_WINDOW", "2"))
+
+# Metrics
+dispatch_queue_depth = Gauge('webhook_dispatch_queue_depth', 'Status updates waiting to be dispatched')
+dispatch_latency = Histogram(
+    'webhook_dispatch_latency_seconds', 'Time from enqueue to completed status update',
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+dispatch_total = Counter('webhook_dispatch_total', 'Status update dispatches', ['result'])
+dispatch_attempts_total = Counter('webhook_dispatch_attempts_total', 'Status API requests including retries')
+status_updates_suppressed_total = Counter(
+    'webhook_status_updates_suppressed_total', 'Status updates skipped because the table state did not change'
+)
+status_updates_coalesced_total = Counter(
+    'webhook_status_updates_coalesced_total', 'Alert updates merged into an already pending status update'
+)
+tracked_tables = Gauge('webhook_tracked_tables', 'Tables held in the state cache')
+route_matches_total = Counter('webhook_route_matches_total', 'Alerts matched per routing rule', ['rule'])
+route_reloads_total = Counter('webhook_route_reloads_total', 'Routing table reloads', ['status'])
+
+
+class StatusUpdate(NamedTuple):
+    """A queued status update for the service status API"""
+    table_id: str
+    status: str
+    reason: str
+    enqueued_at: float
+
+
+dispatch_queue: "queue.Queue[StatusUpdate]" = queue.Queue(maxsize=DISPATCH_QUEUE_SIZE)
+dispatch_queue_depth.set_function(dispatch_queue.qsize)
+
+_workers_lock = threading.Lock()
+_workers_started = False
+
+
+class TableState:
+    """Alert and dispatch state of one table"""
+
+    def __init__(self):
+        self.active_alerts: Set[str] = set()
+        self.sent_status: Optional[str] = None
+        self.sent_at = 0.0
+        self.updated_at = time.monotonic()
+        self.pending = False
+        self.reason = ''
+
+    @property
+    def desired_status(self) -> str:
+        return 'down' if self.active_alerts else 'up'
+
+
+class TableStateCache:
+    """
+    Per-table state machine with deduplication and burst coalescing
+
+    A table's desired status is derived from its set of firing alerts. The first
+    change opens a coalescing window; alert updates arriving within it are merged
+    and a single status update is queued when it closes. An update is suppressed
+    if it matches the status last sent less than `ttl` seconds ago, so Grafana's
+    repeat notifications and overlapping SRS/ZCAM alerts cost no PATCH.
+    """
+
+    def __init__(self, ttl: float = STATE_TTL, window: float = COALESCE_WINDOW):
+        self.ttl = ttl
+        self.window = window
+        self._lock = threading.Lock()
+        self._tables: Dict[str, TableState] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+
+    def observe(self, table_id: str, alert_key: str, firing: bool, reason: str = '') -> bool:
+        """
+        Record a firing or resolved alert for a table
+
+        Returns:
+            bool: True if a status update is pending for the table, False if suppressed
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._evict(now)
+            state = self._tables.setdefault(table_id, TableState())
+            if firing:
+                state.active_alerts.add(alert_key)
+            else:
+                state.active_alerts.discard(alert_key)
+            state.updated_at = now
+            state.reason = reason
+
+            if state.pending:
+                status_updates_coalesced_total.inc()
+                return True
+            if self._is_current(state, now):
+                status_updates_suppressed_total.inc()
+                return False
+            state.pending = True
+
+        if self.window > 0:
+            timer = threading.Timer(self.window, self.flush, args=(table_id,))
+            timer.daemon = True
+            with self._lock:
+                self._timers[table_id] = timer
+            timer.start()
+        else:
+            self.flush(table_id)
+        return True
+
+    def flush(self, table_id: str):
+        """Close the coalescing window and queue the table's status if it changed"""
+        with self._lock:
+            self._timers.pop(table_id, None)
+            state = self._tables.get(table_id)
+            if state is None or not state.pending:
+                return
+            state.pending = False
+            now = time.monotonic()
+            if self._is_current(state, now):
+                status_updates_suppressed_total.inc()
+                return
+            status = state.desired_status
+            # Recorded before sending so a new window does not queue it again;
+            # invalidate() undoes this if the dispatch fails
+            state.sent_status = status
+            state.sent_at = now
+            reason = state.reason
+        if not enqueue_status_update(table_id, status, reason):
+            self.invalidate(table_id, status)
+
+    def flush_pending(self):
+        """Close every open coalescing window now (used on shutdown)"""
+        with self._lock:
+            timers = list(self._timers.items())
+            self._timers.clear()
+        for table_id, timer in timers:
+            timer.cancel()
+            self.flush(table_id)
+
+    def invalidate(self, table_id: str, status: str):
+        """Forget a sent status after a failed dispatch so the next alert retries it"""
+        with self._lock:
+            state = self._tables.get(table_id)
+            if state is not None and state.sent_status == status:
+                state.sent_status = None
+
+    def _is_current(self, state: TableState, now: float) -> bool:
+        return state.sent_status == state.desired_status and now - state.sent_at < self.ttl
+
+    def _evict(self, now: float):
+        # Drop idle tables whose state is 'up' and older than the TTL
+        expired = [
+            table_id for table_id, state in self._tables.items()
+            if not state.active_alerts and not state.pending and now - state.updated_at >= self.ttl
+        ]
+        for table_id in expired:
+            del self._tables[table_id]
+        tracked_tables.set(len(self._tables))
+
+
+table_states = TableStateCache()
+
+
+def alert_key(alert: dict) -> str:
+    """Stable identity of an alert across notifications"""
+    fingerprint = alert.get('fingerprint')
+    if fingerprint:
+        return fingerprint
+    return json.dumps(alert.get('labels', {}), sort_keys=True)
+
+class RouteRule(NamedTuple):
+    """A compiled routing rule"""
+    index: int
+    name: str
+    action: str
+    source: str
+    exact: Dict[str, str]
+    regex: Dict[str, Pattern]
+    table_id_annotation: str
+    default_table_id: str
+
+    def matches(self, labels: Dict[str, Any]) -> bool:
+        for key, value in self.exact.items():
+            if labels.get(key) != value:
+                return False
+        for key, pattern in self.regex.items():
+            value = labels.get(key)
+            if value is None or not pattern.search(str(value)):
+                return False
+        return True
+
+
+class AlertRouter:
+    """
+    Routing table compiled for lookup by label
+
+    Rules with exact matchers are indexed under one of their (label, value)
+    pairs, so an alert only checks rules sharing one of its label values;
+    regex-only rules are checked in order as a fallback. The lowest-indexed
+    matching rule wins, as if the table were scanned top to bottom.
+    """
+
+    def __init__(self, routes: List[dict]):
+        self.rules: List[RouteRule] = []
+        self._exact_index: Dict[Tuple[str, str], List[RouteRule]] = {}
+        self._regex_rules: List[RouteRule] = []
+
+        for index, route in enumerate(routes):
+            rule = self.compile_rule(index, route)
+            self.rules.append(rule)
+            if rule.exact:
+                key = next(iter(rule.exact.items()))
+                self._exact_index.setdefault(key, []).append(rule)
+            else:
+                self._regex_rules.append(rule)
+
+    @staticmethod
+    def compile_rule(index: int, route: dict) -> RouteRule:
+        """Validate one route definition and compile its matchers"""
+        if not isinstance(route, dict):
+            raise ValueError(f"route #{index} must be a mapping")
+        name = str(route.get('name', f'route-{index}'))
+        action = route.get('action', 'table_status')
+        if action not in ROUTE_ACTIONS:
+            raise ValueError(f"route {name}: unknown action {action!r}")
+        exact = {str(key): str(value) for key, value in (route.get('match') or {}).items()}
+        try:
+            regex = {str(key): re.compile(str(value), re.IGNORECASE)
+                     for key, value in (route.get('match_re') or {}).items()}
+        except re.error as e:
+            raise ValueError(f"route {name}: invalid regex: {e}")
+        if not exact and not regex:
+            raise ValueError(f"route {name}: needs at least one match or match_re entry")
+        return RouteRule(
+            index, name, action, str(route.get('source', name)), exact, regex,
+            str(route.get('table_id_annotation', 'table_id')), str(route.get('default_table_id', 'ARO-001'))
+        )
+
+    def route(self, labels: Dict[str, Any]) -> Optional[RouteRule]:
+        """Return the first rule matching the alert labels, or None"""
+        best = None
+        for key, value in labels.items():
+            for rule in self._exact_index.get((key, value), ()):
+                if (best is None or rule.index < best.index) and rule.matches(labels):
+                    best = rule
+        for rule in self._regex_rules:
+            if best is not None and rule.index > best.index:
+                break
+            if rule.matches(labels):
+                best = rule
+                break
+        return best
+
+
+def load_routes(path: str) -> AlertRouter:
+    """Load and compile the routing table from a YAML file"""
+    with open(path) as f:
+        config = yaml.safe_load(f) or {}
+    routes = config.get('routes') if isinstance(config, dict) else None
+    if not isinstance(routes, list):
+        raise ValueError(f"{path}: expected a top-level 'routes' list")
+    return AlertRouter(routes)
+
+
+class RouteTableWatcher:
+    """Reloads the routing table when the routes file's inode, mtime or size changes"""
+
+    def __init__(self, path: str = ROUTES_FILE, interval: float = ROUTES_RELOAD_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._started = False
+        self._lock = threading.Lock()
+
+    def check(self):
+        """Reload the routes file if it changed; keeps the current table on errors"""
+        global alert_router
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            if self._signature is None:
+                logger.error("Routes file unavailable, using built-in routes: %s", e)
+                self._signature = (0, 0, 0)
+            return
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return
+        self._signature = signature
+        try:
+            alert_router = load_routes(self.path)
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            route_reloads_total.labels(status='error').inc()
+            logger.error("Error loading routes from %s, keeping current table: %s", self.path, e)
+            return
+        route_reloads_total.labels(status='success').inc()
+        logger.info("Loaded %d routing rules from %s", len(alert_router.rules), self.path)
+
+    def start(self):
+        """Start polling the routes file in a background thread (once per process)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.check()
+        threading.Thread(target=self._watch, name="routes-watcher", daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            self.check()
+
+
+alert_router = AlertRouter(DEFAULT_ROUTES)
+route_watcher = RouteTableWatcher()
+
+
+# Pooled HTTP session shared by the dispatch workers
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=DISPATCH_WORKERS))
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=DISPATCH_WORKERS))
+
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -33,84 +478,174 @@ def health_check():
     return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()}), 200
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
+
+def validate_alert_payload(alert_data) -> Optional[str]:
+    """
+    Check the shape of a Grafana webhook payload
+
+    Returns:
+        str: Error message, or None if the payload is valid
+    """
+    if not alert_data:
+        return "No alert data received"
+    if not isinstance(alert_data, dict):
+        return "Alert payload must be a JSON object"
+    if not isinstance(alert_data.get('status', ''), str):
+        return "'status' must be a string"
+    alerts = alert_data.get('alerts', [])
+    if not isinstance(alerts, list) or not all(isinstance(alert, dict) for alert in alerts):
+        return "'alerts' must be a list of objects"
+    for index, alert in enumerate(alerts):
+        # Routing hashes label values; a list or object value would fail there with a 500
+        for field in ('labels', 'annotations'):
+            values = alert.get(field) or {}
+            if not isinstance(values, dict) or not all(
+                    isinstance(key, str) and isinstance(value, str) for key, value in values.items()):
+                return f"alerts[{index}].{field} must be an object of string values"
+    return None
+
+
 @app.route('/webhook/grafana', methods=['POST'])
 def grafana_webhook():
     """
-    Receive Grafana alert webhook and trigger API call
+    Receive Grafana alert webhook and queue the resulting status updates
+
+    Returns 202 once the updates are queued; dispatch workers send them.
     """
     try:
         # Log incoming webhook
-        alert_data = request.json
-        logger.info(f"Received Grafana alert: {json.dumps(alert_data, indent=2)}")
+        alert_data = request.get_json(silent=True)
+        if logger.isEnabledFor(logging.INFO) and random.random() < LOG_PAYLOAD_SAMPLE_RATE:
+            logger.info("Received Grafana alert: %s", LazyJson(alert_data))
         
-        # Extract alert information
-        if not alert_data:
-            logger.error("No alert data received")
-            return jsonify({"error": "No alert data received"}), 400
+        error = validate_alert_payload(alert_data)
+        if error:
+            logger.error("Rejected webhook payload: %s", error)
+            return jsonify({"error": error}), 400
         
         # Get alert status
         status = alert_data.get('status', '')
         alerts = alert_data.get('alerts', [])
+        queued = 0
+        route_watcher.start()
+        router = alert_router
         
-        logger.info(f"Alert status: {status}")
-        logger.info(f"Number of alerts: {len(alerts)}")
-        
-        # Process firing alerts
-        if status == 'firing':
-            for alert in alerts:
-                alert_name = alert.get('labels', {}).get('alertname', 'Unknown')
-                logger.info(f"Processing alert: {alert_name}")
-                
-                # Check if it's an alert we should handle (SRS or FFmpeg/ZCAM)
-                rule_name = alert.get('labels', {}).get('rulename', '')
-                service = alert.get('labels', {}).get('service', '')
-                alert_type = alert.get('labels', {}).get('alert_type', '')
-                device = alert.get('labels', {}).get('device', '')
-                
-                # Handle SRS alerts (okbps=0,0,0)
-                if 'okbps' in alert_name.lower() or 'okbps' in rule_name.lower() or service == 'srs':
-                    table_id = alert.get('annotations', {}).get('table_id', 'ARO-001')
-                    logger.info(f"Triggering API call for SRS alert - table: {table_id}")
-                    success = send_status_update(table_id, 'down')
-                    
-                    if success:
-                        logger.info(f"Successfully sent status update for table {table_id}")
-                    else:
-                        logger.error(f"Failed to send status update for table {table_id}")
-                
-                # Handle FFmpeg/ZCAM alerts (frame not increasing)
-                elif service == 'ffmpeg' or device == 'zcam' or alert_type == 'frame_stuck':
-                    table_id = alert.get('annotations', {}).get('table_id', 'ARO-001')
-                    logger.info(f"Triggering API call for FFmpeg/ZCAM alert - table: {table_id}")
-                    success = send_status_update(table_id, 'down')
-                    
-                    if success:
-                        logger.info(f"Successfully sent ZCAM status update for table {table_id}")
-                    else:
-                        logger.error(f"Failed to send ZCAM status update for table {table_id}")
+        logger.info("Alert status: %s, number of alerts: %d", status, len(alerts),
+                    extra={"alert_status": status, "alert_count": len(alerts)})
         
-        elif status == 'resolved':
-            # Optional: Handle resolved alerts (set status to 'up')
-            for alert in alerts:
-                alert_name = alert.get('labels', {}).get('alertname', 'Unknown')
-                logger.info(f"Alert resolved: {alert_name}")
-                
-                if 'okbps' in alert_name.lower() or alert_name == 'SRSNoDataAlert':
-                    table_id = alert.get('annotations', {}).get('table_id', 'ARO-001')
-                    # Optionally send 'up' status when resolved
-                    # send_status_update(table_id, 'up')
+        for alert in alerts:
+            # Grafana groups firing and resolved alerts in one notification
+            alert_status = alert.get('status', status)
+            if alert_status not in ('firing', 'resolved'):
+                continue
+            labels = alert.get('labels') or {}
+            alert_name = labels.get('alertname', 'Unknown')
+            logger.debug("Processing %s alert: %s", alert_status, alert_name)
+            
+            rule = router.route(labels)
+            if rule is None:
+                continue
+            route_matches_total.labels(rule=rule.name).inc()
+            if rule.action == 'ignore':
+                continue
+            
+            table_id = (alert.get('annotations') or {}).get(rule.table_id_annotation, rule.default_table_id)
+            logger.debug("Updating table state for %s alert - table: %s", rule.source, table_id,
+                         extra={"table_id": table_id, "alert_name": alert_name, "rule": rule.name})
+            queued += table_states.observe(table_id, alert_key(alert), alert_status == 'firing', alert_name)
         
-        return jsonify({"status": "success", "message": "Alert processed"}), 200
+        return jsonify({"status": "accepted", "message": "Alert queued", "queued": queued}), 202
     
     except Exception as e:
-        logger.error(f"Error processing webhook: {str(e)}", exc_info=True)
+        logger.error("Error processing webhook: %s", e, exc_info=True)
         return jsonify({"error": str(e)}), 500
 
 
+def enqueue_status_update(table_id: str, status: str, reason: str = '') -> bool:
+    """
+    Queue a status update for the dispatch workers
+    
+    Returns:
+        bool: True if queued, False if the queue is full
+    """
+    start_dispatch_workers()
+    try:
+        dispatch_queue.put_nowait(StatusUpdate(table_id, status, reason, time.monotonic()))
+        return True
+    except queue.Full:
+        logger.error("Dispatch queue full, dropping status update for table %s", table_id,
+                     extra={"table_id": table_id, "status": status})
+        dispatch_total.labels(result='dropped').inc()
+        return False
+
+
+def dispatch_worker():
+    """Send queued status updates until the process exits"""
+    while True:
+        update = dispatch_queue.get()
+        try:
+            success = send_status_update(update.table_id, update.status)
+            dispatch_total.labels(result='success' if success else 'failed').inc()
+            if success:
+                logger.info("Successfully sent status update for table %s (%s)", update.table_id, update.reason,
+                            extra={"table_id": update.table_id, "status": update.status})
+            else:
+                logger.error("Failed to send status update for table %s (%s)", update.table_id, update.reason,
+                             extra={"table_id": update.table_id, "status": update.status})
+                table_states.invalidate(update.table_id, update.status)
+        except Exception as e:
+            dispatch_total.labels(result='failed').inc()
+            table_states.invalidate(update.table_id, update.status)
+            logger.error("Unexpected error dispatching status update: %s", e, exc_info=True)
+        finally:
+            dispatch_latency.observe(time.monotonic() - update.enqueued_at)
+            dispatch_queue.task_done()
+
+
+def start_dispatch_workers():
+    """Start the dispatch worker pool on first use (after any fork into server workers)"""
+    global _workers_started
+    if _workers_started:
+        return
+    with _workers_lock:
+        if _workers_started:
+            return
+        for i in range(DISPATCH_WORKERS):
+            threading.Thread(target=dispatch_worker, name=f"dispatch-worker-{i}", daemon=True).start()
+        _workers_started = True
+        logger.info("Started %d dispatch workers", DISPATCH_WORKERS)
+
+
+def drain_dispatch_queue(timeout: float = DRAIN_TIMEOUT) -> bool:
+    """
+    Flush pending coalescing windows and wait for queued updates to be sent
+    
+    Returns:
+        bool: True if the queue drained within the timeout
+    """
+    table_states.flush_pending()
+    deadline = time.monotonic() + timeout
+    while dispatch_queue.unfinished_tasks:
+        if time.monotonic() >= deadline:
+            logger.warning("Shutting down with %d status updates not sent", dispatch_queue.unfinished_tasks)
+            return False
+        time.sleep(0.1)
+    logger.info("Dispatch queue drained")
+    return True
+
+
 def send_status_update(table_id: str, status: str) -> bool:
     """
     Send PATCH request to update service status
     
+    Connection errors, 429 and 5xx responses are retried with exponential
+    backoff and jitter, up to DISPATCH_MAX_RETRIES times.
+    
     Args:
         table_id: Table identifier (e.g., 'ARO-001')
         status: Status to set ('up' or 'down')
@@ -118,43 +653,50 @@ def send_status_update(table_id: str, status: str) -> bool:
     Returns:
         bool: True if successful, False otherwise
     """
-    try:
-        headers = {
-            'accept': 'application/json',
-            'x-signature': API_SIGNATURE,
-            'Content-Type': 'application/json'
-        }
-        
-        payload = {
-            "tableId": table_id,
-            "zCam": status
-        }
-        
-        logger.info(f"Sending API request to {API_ENDPOINT}")
-        logger.info(f"Payload: {json.dumps(payload, indent=2)}")
-        
-        response = requests.patch(
-            API_ENDPOINT,
-            headers=headers,
-            json=payload,
-            timeout=10
-        )
-        
-        logger.info(f"API Response Status: {response.status_code}")
-        logger.info(f"API Response Body: {response.text}")
-        
-        if response.status_code in [200, 201, 204]:
-            return True
-        else:
-            logger.error(f"API request failed with status {response.status_code}")
-            return False
+    headers = {
+        'accept': 'application/json',
+        'x-signature': API_SIGNATURE,
+        'Content-Type': 'application/json'
+    }
+    
+    payload = {
+        "tableId": table_id,
+        "zCam": status
+    }
+    
+    for attempt in range(DISPATCH_MAX_RETRIES + 1):
+        if attempt:
+            delay = DISPATCH_BACKOFF_BASE * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+            logger.info("Retrying status update for %s in %.2fs (attempt %d)", table_id, delay, attempt + 1)
+            time.sleep(delay)
+        try:
+            logger.debug("Sending API request to %s: %s", API_ENDPOINT, LazyJson(payload))
             
-    except requests.exceptions.RequestException as e:
-        logger.error(f"API request error: {str(e)}", exc_info=True)
-        return False
-    except Exception as e:
-        logger.error(f"Unexpected error in send_status_update: {str(e)}", exc_info=True)
-        return False
+            dispatch_attempts_total.inc()
+            response = _session.patch(
+                API_ENDPOINT,
+                headers=headers,
+                json=payload,
+                timeout=DISPATCH_TIMEOUT
+            )
+            
+            logger.info("API response for %s=%s: %d", table_id, status, response.status_code,
+                        extra={"table_id": table_id, "status": status, "http_status": response.status_code})
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("API response body: %s", LazyJson(response.text))
+            
+            if response.status_code in [200, 201, 204]:
+                return True
+            logger.error("API request failed with status %d", response.status_code)
+            if response.status_code not in RETRY_STATUS_CODES:
+                return False
+                
+        except requests.exceptions.RequestException as e:
+            logger.error("API request error: %s", e)
+        except Exception as e:
+            logger.error("Unexpected error in send_status_update: %s", e, exc_info=True)
+            return False
+    return False
 
 
 @app.route('/test', methods=['POST'])
@@ -176,14 +718,24 @@ def test_endpoint():
             return jsonify({"status": "error", "message": "Failed to send status update"}), 500
             
     except Exception as e:
-        logger.error(f"Test endpoint error: {str(e)}", exc_info=True)
+        logger.error("Test endpoint error: %s", e, exc_info=True)
         return jsonify({"error": str(e)}), 500
 
 
+def handle_sigterm(signum, frame):
+    """Drain in-flight dispatches before exiting"""
+    logger.info("Received SIGTERM, draining dispatch queue...")
+    drain_dispatch_queue()
+    sys.exit(0)
+
+
 if __name__ == '__main__':
-    logger.info("Starting Grafana Webhook Service...")
-    logger.info(f"API Endpoint: {API_ENDPOINT}")
-    logger.info(f"Listening on http://0.0.0.0:5000")
+    logger.info("Starting Grafana Webhook Service (development server)...")
+    logger.info("API Endpoint: %s", API_ENDPOINT)
+    start_dispatch_workers()
+    route_watcher.start()
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    logger.info("Listening on http://0.0.0.0:5000")
     
     # Run Flask app
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Synthetic log load generator for Promtail/Loki capacity testing
+
+Worker processes emit a configurable mix of the log formats we ship
+(SDP error blocks, studio-sdp-roulette self-test-2api.log Receive/Send
+lines and mock_sicbo lines) at a target line rate or MB/s, either appended
+to files for Promtail to tail or pushed straight to Loki through
+loki_client.LokiClient.
+
+Every worker also emits a marker line once per --marker-interval carrying
+the run id and its send time. The main process queries the markers back
+from Loki and reports end-to-end ingest lag (time until a marker becomes
+queryable, to within the one second poll interval) next to the achieved
+throughput, so a run shows both how much load was offered and at what
+point the pipeline falls behind.
+
+Usage:
+  # push 20k lines/s from 4 processes for 2 minutes, 50 label values per worker
+  python3 log_load_generator.py push --rate 20000 --processes 4 --duration 120 --cardinality 50
+
+  # write 10 MB/s of self-test lines into files tailed by Promtail
+  python3 log_load_generator.py file --mb-per-sec 10 --mix selftest=1 --output-dir /var/log/loadgen \\
+      --marker-selector '{job="loadgen"}'
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import re
+import statistics
+import time
+import uuid
+from datetime import datetime
+from multiprocessing.connection import wait
+
+from generate_sdp_logs import generate_sdp_error_log
+from loki_client import DEFAULT_PUSH_URL, LokiClient
+from loki_query import DEFAULT_LOKI_URL, LokiQueryClient, LokiQueryError
+
+FORMATS = ("sdp", "selftest", "mock_sicbo")
+TICK_SECONDS = 0.05
+GROUP_SIZE = 64
+MARKER = "LOADGEN-MARKER"
+MARKER_PATTERN = re.compile(MARKER + r" run=(?P<run>\S+) worker=(?P<worker>\d+) seq=(?P<seq>\d+) sent_ns=(?P<sent_ns>\d+)")
+# Re-queried span behind the newest marker seen, for markers ingested out of timestamp order
+LAG_QUERY_OVERLAP_NS = 10 * 1_000_000_000
+
+SELFTEST_MESSAGES = [
+    "Receive >>> *X;2;{a};{b};0;{c};0",
+    "Receive >>> *X;3;{a};{b};0;{c};0",
+    "Send <<< *u 1",
+    "Receive >>> *X;6;{a};{b};{c};0",
+    "WebSocket >>> round result {a}",
+]
+MOCK_SICBO_MESSAGES = [
+    "Dice shake started for round {a}",
+    "Dice result: {a} {b} {c}",
+    "Game status updated: BETTING",
+    "Round {a} settled in {b}ms",
+]
+
+
+def parse_mix(text: str) -> dict:
+    """Parse 'sdp=1,selftest=3' into normalized weights"""
+    weights = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in FORMATS:
+            raise argparse.ArgumentTypeError(f"unknown format {name!r} (choose from {', '.join(FORMATS)})")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("format weights must add up to more than 0")
+    return {name: weight / total for name, weight in weights.items()}
+
+
+FILLER = random.Random(0).randbytes(32 * 1024).hex()
+
+
+def pad(line: str, line_size: int, rng: random.Random) -> str:
+    """Pad a line with filler up to line_size bytes"""
+    missing = line_size - len(line) - 1
+    if missing <= 0:
+        return line
+    offset = rng.randrange(len(FILLER) - missing) if missing < len(FILLER) else 0
+    return f"{line} {FILLER[offset:offset + missing]}"
+
+
+def make_line(fmt: str, rng: random.Random, line_size: int, now: datetime) -> str:
+    """One synthetic entry in the given format; SDP entries span several lines"""
+    a, b, c = rng.randint(1, 999), rng.randint(1, 999), rng.randint(1, 999)
+    if fmt == "sdp":
+        return generate_sdp_error_log()
+    stamp = now.strftime("%Y-%m-%d %H:%M:%S")
+    if fmt == "selftest":
+        message = rng.choice(SELFTEST_MESSAGES).format(a=a, b=b, c=c)
+        return pad(f"[{stamp}.{now.microsecond // 1000:03d}] {message}", line_size, rng)
+    message = rng.choice(MOCK_SICBO_MESSAGES).format(a=a, b=b, c=c)
+    return pad(f"{stamp} - mock_sicbo - INFO - {message}", line_size, rng)
+
+
+def marker_line(run_id: str, worker: int, seq: int) -> str:
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return f"{now} - loadgen - INFO - {MARKER} run={run_id} worker={worker} seq={seq} sent_ns={time.time_ns()}"
+
+
+class FileSink:
+    """Appends entries to <output_dir>/<format>-<worker>-<n>.log, one file per label value"""
+
+    def __init__(self, output_dir: str, worker: int, cardinality: int):
+        os.makedirs(output_dir, exist_ok=True)
+        self.files = {}
+        self.output_dir = output_dir
+        self.worker = worker
+        self.cardinality = cardinality
+
+    def _file(self, fmt: str, shard: int):
+        key = (fmt, shard)
+        if key not in self.files:
+            path = os.path.join(self.output_dir, f"{fmt}-{self.worker}-{shard}.log")
+            self.files[key] = open(path, "a", buffering=1024 * 1024)
+        return self.files[key]
+
+    def write(self, fmt: str, shard: int, entry: str):
+        self._file(fmt, shard).write(entry + ("\n\n" if fmt == "sdp" else "\n"))
+
+    def marker(self, line: str):
+        self._file("mock_sicbo", 0).write(line + "\n")
+
+    def flush(self):
+        for f in self.files.values():
+            f.flush()
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+class PushSink:
+    """Pushes entries to Loki with job=loadgen and a `shard` label per label value"""
+
+    def __init__(self, url: str, run_id: str, worker: int, failed):
+        self.run_id = run_id
+        self.worker = worker
+
+        def on_result(result, streams):
+            if not result.ok:
+                with failed.get_lock():
+                    failed.value += result.entries
+
+        # No spill queue: a load test should see failures, not hide them behind a replay backlog
+        self.client = LokiClient(url, max_retries=2, on_result=on_result)
+
+    def labels(self, fmt: str, shard: int) -> dict:
+        return {"job": "loadgen", "run": self.run_id, "format": fmt, "worker": str(self.worker),
+                "shard": str(shard)}
+
+    def write(self, fmt: str, shard: int, entry: str):
+        self.client.push(entry, self.labels(fmt, shard))
+
+    def marker(self, line: str):
+        self.client.push(line, self.labels("marker", 0))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.client.close()
+
+
+def run_worker(worker: int, args, run_id: str, lines, sent_bytes, failed, stop):
+    """Emit entries at this worker's share of the target rate until `stop` is set or the duration ends"""
+    rng = random.Random(f"{run_id}-{worker}")
+    random.seed(f"{run_id}-{worker}")
+    if args.mode == "push":
+        sink = PushSink(args.url, run_id, worker, failed)
+    else:
+        sink = FileSink(args.output_dir, worker, args.cardinality)
+
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    rate = (args.rate or 0) / args.processes
+    byte_rate = (args.mb_per_sec or 0) * 1024 * 1024 / args.processes
+    emitted_lines = 0
+    emitted_bytes = 0
+    seq = 0
+    started = time.monotonic()
+    next_marker = started
+    deadline = started + args.duration if args.duration else None
+
+    try:
+        while not stop.is_set():
+            now = time.monotonic()
+            if deadline and now >= deadline:
+                break
+            if now >= next_marker:
+                sink.marker(marker_line(run_id, worker, seq))
+                seq += 1
+                next_marker += args.marker_interval
+
+            # Catch up to the schedule, one tick's worth at most past the target
+            elapsed = now - started + TICK_SECONDS
+            batch_lines = 0
+            batch_bytes = 0
+            while (rate and emitted_lines + batch_lines < rate * elapsed) or \
+                    (byte_rate and emitted_bytes + batch_bytes < byte_rate * elapsed):
+                # Entries in a group share one timestamp, which keeps formatting cost per entry low
+                stamp = datetime.now()
+                group = min(GROUP_SIZE, int(rate * elapsed) - emitted_lines - batch_lines + 1) if rate else GROUP_SIZE
+                for fmt in rng.choices(names, weights, k=group):
+                    entry = make_line(fmt, rng, args.line_size, stamp)
+                    sink.write(fmt, rng.randrange(args.cardinality), entry)
+                    batch_lines += 1
+                    batch_bytes += len(entry) + 1
+                if time.monotonic() - now > TICK_SECONDS:
+                    break  # falling behind; report what we managed
+            sink.flush()
+            emitted_lines += batch_lines
+            emitted_bytes += batch_bytes
+            with lines.get_lock():
+                lines.value += batch_lines
+            with sent_bytes.get_lock():
+                sent_bytes.value += batch_bytes
+
+            sleep = started + (emitted_lines / rate if rate else emitted_bytes / byte_rate) - TICK_SECONDS - time.monotonic()
+            if sleep > 0:
+                stop.wait(min(sleep, TICK_SECONDS))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.close()
+
+
+class LagTracker:
+    """Queries marker lines back from Loki and records how long each took to become visible"""
+
+    def __init__(self, client: LokiQueryClient, selector: str, run_id: str, started_ns: int):
+        self.client = client
+        self.query = f'{selector} |= "{MARKER} run={run_id}"'
+        self.run_id = run_id
+        self.started_ns = started_ns
+        # Start of the next query: latest marker timestamp seen minus an overlap for late, out-of-order entries
+        self.cursor_ns = started_ns - 60 * 1_000_000_000
+        self.lags = []
+        self.seen = set()
+        self.errors = 0
+
+    def poll(self) -> int:
+        """Fetch markers newer than the cursor; returns the number of new ones"""
+        now_ns = time.time_ns()
+        new = 0
+        latest_ns = None
+        try:
+            for entry in self.client.query_range(self.query, start=self.cursor_ns, end=now_ns + 1):
+                latest_ns = entry.timestamp if latest_ns is None else max(latest_ns, entry.timestamp)
+                match = MARKER_PATTERN.search(entry.line)
+                if not match or match["run"] != self.run_id:
+                    continue
+                key = (int(match["worker"]), int(match["seq"]))
+                if key in self.seen:
+                    continue
+                self.seen.add(key)
+                self.lags.append((now_ns - int(match["sent_ns"])) / 1_000_000_000)
+                new += 1
+        except LokiQueryError:
+            self.errors += 1
+        if latest_ns is not None:
+            self.cursor_ns = max(self.cursor_ns, latest_ns - LAG_QUERY_OVERLAP_NS)
+        return new
+
+    def summary(self) -> str:
+        if not self.lags:
+            return "no markers seen yet"
+        lags = sorted(self.lags)
+        p95 = lags[min(len(lags) - 1, int(len(lags) * 0.95))]
+        return f"lag p50 {statistics.median(lags):.2f}s  p95 {p95:.2f}s  max {lags[-1]:.2f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic log load and measure Loki ingest lag")
+    parser.add_argument("mode", choices=["file", "push"], help="Write files for Promtail or push straight to Loki")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--rate", type=float, help="Target entries per second (all processes)")
+    target.add_argument("--mb-per-sec", type=float, help="Target MB per second (all processes)")
+    parser.add_argument("--processes", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Worker processes (default: half the CPUs)")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run, 0 for until Ctrl+C (default: 60)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("sdp=1,selftest=6,mock_sicbo=3"),
+                        help="Format weights, e.g. sdp=1,selftest=6,mock_sicbo=3")
+    parser.add_argument("--cardinality", type=int, default=1,
+                        help="Label values (push: shard label, file: files) per worker and format")
+    parser.add_argument("--line-size", type=int, default=0, help="Pad single-line entries to this many bytes")
+    parser.add_argument("--output-dir", default="/tmp/loadgen", help="Directory for file mode (default: /tmp/loadgen)")
+    parser.add_argument("--url", default=DEFAULT_PUSH_URL, help=f"Loki push URL (default: {DEFAULT_PUSH_URL})")
+    parser.add_argument("--query-url", default=DEFAULT_LOKI_URL, help=f"Loki base URL for lag queries (default: {DEFAULT_LOKI_URL})")
+    parser.add_argument("--marker-selector", default='{job="loadgen"}',
+                        help="Stream selector under which markers arrive (default: {job=\"loadgen\"})")
+    parser.add_argument("--marker-interval", type=float, default=1.0, help="Seconds between marker lines per worker")
+    parser.add_argument("--lag-timeout", type=float, default=60, help="Seconds to wait for outstanding markers at the end")
+    parser.add_argument("--no-lag", action="store_true", help="Skip querying markers back")
+    parser.add_argument("--report-interval", type=float, default=5, help="Seconds between progress reports")
+    args = parser.parse_args()
+    if args.cardinality < 1 or args.processes < 1:
+        parser.error("--cardinality and --processes must be at least 1")
+
+    run_id = uuid.uuid4().hex[:8]
+    lines = multiprocessing.Value("q", 0)
+    sent_bytes = multiprocessing.Value("q", 0)
+    failed = multiprocessing.Value("q", 0)
+    stop = multiprocessing.Event()
+
+    target_text = f"{args.rate:,.0f} entries/s" if args.rate else f"{args.mb_per_sec:g} MB/s"
+    print(f"🚀 Load run {run_id}: {args.mode} mode, {target_text}, {args.processes} process(es)")
+    print(f"📝 Mix: {', '.join(f'{name} {weight:.0%}' for name, weight in args.mix.items())}, "
+          f"cardinality {args.cardinality}, line size {args.line_size or 'natural'}")
+    print(f"📡 Target: {args.url if args.mode == 'push' else args.output_dir}")
+    print("🛑 Press Ctrl+C to stop")
+    print("-" * 80)
+
+    tracker = None
+    if not args.no_lag:
+        tracker = LagTracker(LokiQueryClient(args.query_url, max_workers=1), args.marker_selector, run_id,
+                             time.time_ns())
+
+    workers = [multiprocessing.Process(target=run_worker, name=f"loadgen-{i}",
+                                       args=(i, args, run_id, lines, sent_bytes, failed, stop))
+               for i in range(args.processes)]
+    for worker in workers:
+        worker.start()
+
+    started = time.monotonic()
+    last_report = started
+    last_lines = last_bytes = 0
+    try:
+        while any(worker.is_alive() for worker in workers):
+            # Wakes early when a worker exits so the summary's elapsed time stays accurate
+            wait([worker.sentinel for worker in workers if worker.is_alive()], min(1.0, args.report_interval))
+            if tracker:
+                tracker.poll()
+            now = time.monotonic()
+            if now - last_report >= args.report_interval:
+                current_lines, current_bytes = lines.value, sent_bytes.value
+                interval = now - last_report
+                print(f"⏱️  {now - started:6.0f}s  {(current_lines - last_lines) / interval:>10,.0f} entries/s  "
+                      f"{(current_bytes - last_bytes) / interval / 1024 / 1024:7.2f} MB/s  "
+                      f"failed {failed.value:,}" + (f"  markers {len(tracker.seen)}  {tracker.summary()}" if tracker else ""))
+                last_report, last_lines, last_bytes = now, current_lines, current_bytes
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping workers...")
+        stop.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.monotonic() - started
+
+    expected = 0
+    if tracker:
+        expected = args.processes * max(1, int(elapsed / args.marker_interval))
+        deadline = time.monotonic() + args.lag_timeout
+        while len(tracker.seen) < expected and time.monotonic() < deadline:
+            time.sleep(1)
+            tracker.poll()
+
+    print("-" * 80)
+    print(f"📊 Run {run_id} summary ({elapsed:.1f}s)")
+    print(f"   Entries: {lines.value:,} ({lines.value / elapsed:,.0f}/s), failed: {failed.value:,}")
+    print(f"   Volume:  {sent_bytes.value / 1024 / 1024:,.1f} MB ({sent_bytes.value / elapsed / 1024 / 1024:.2f} MB/s)")
+    if tracker:
+        print(f"   Markers: {len(tracker.seen)}/~{expected} seen, {tracker.errors} query error(s)")
+        print(f"   Ingest:  {tracker.summary()}")
+
+
+if __name__ == "__main__":
+    main()
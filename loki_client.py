@@ -0,0 +1,604 @@
+#!/usr/bin/env python3
+"""
+Batching Loki push client
+
+Entries are grouped into streams by label set and sent as one push request
+once the pending batch reaches `batch_size` bytes or is `batch_wait` seconds
+old, over a pooled HTTP session. Payloads are JSON with gzip
+Content-Encoding by default, or snappy-compressed protobuf (Loki's native
+push format) with encoding="protobuf", which needs python-snappy.
+429/5xx responses and connection errors are retried with exponential
+backoff and jitter.
+
+With `spill_dir` set, batches that still fail after retrying (Loki down or
+unreachable) are appended to a bounded on-disk segment queue instead of being
+dropped, and a background thread replays them in order, rate limited, once
+Loki accepts pushes again. While a backlog exists new batches are queued
+behind it so ordering is preserved.
+
+Usage:
+    from loki_client import LokiClient
+
+    with LokiClient() as client:
+        client.push("SDP Error ...", {"job": "sdp", "level": "ERROR"})
+
+Environment:
+    LOKI_PUSH_URL   default push endpoint (http://100.64.0.113:3100/loki/api/v1/push)
+    LOKI_SPILL_DIR  base directory for spill queues (default ~/.cache/telemetry/loki-spill)
+"""
+
+import fcntl
+import gzip
+import json
+import logging
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from prometheus_client import Counter, Gauge
+except ImportError:  # metrics are optional for the push scripts
+    Counter = Gauge = None
+
+DEFAULT_PUSH_URL = os.environ.get("LOKI_PUSH_URL", "http://100.64.0.113:3100/loki/api/v1/push")
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+SPILL_BASE_DIR = os.environ.get("LOKI_SPILL_DIR", os.path.expanduser("~/.cache/telemetry/loki-spill"))
+# Record header in spill segments: payload length and CRC32
+SPILL_RECORD_HEADER = struct.Struct("<II")
+# Rough per-entry overhead (timestamp and JSON framing) counted towards batch_size
+ENTRY_OVERHEAD = 32
+
+logger = logging.getLogger(__name__)
+
+if Gauge is not None:
+    spill_backlog_bytes = Gauge('loki_client_spill_backlog_bytes', 'Bytes of unsent Loki batches spilled to disk',
+                                ['directory'])
+    spill_dropped_total = Counter('loki_client_spill_dropped_batches_total',
+                                  'Spilled batches discarded because the spill queue was full', ['directory'])
+else:
+    spill_backlog_bytes = spill_dropped_total = None
+
+LabelSet = Tuple[Tuple[str, str], ...]
+Streams = Dict[LabelSet, List[Tuple[int, str]]]
+
+
+class PushResult(NamedTuple):
+    """Outcome of one push request"""
+    ok: bool
+    status_code: Optional[int]
+    streams: int
+    entries: int
+    attempts: int
+    error: Optional[str]
+    spilled: bool = False
+
+
+def label_set(labels: Dict[str, str]) -> LabelSet:
+    """Canonical, hashable form of a label dict"""
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def format_labels(labels: LabelSet) -> str:
+    """Render a label set in Loki's selector syntax, e.g. {job="sdp", level="ERROR"}"""
+    pairs = ('{}="{}"'.format(k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+             for k, v in labels)
+    return '{' + ', '.join(pairs) + '}'
+
+
+def encode_json(streams: Streams) -> bytes:
+    """Encode streams as a JSON push request"""
+    payload = {"streams": [
+        {"stream": dict(labels), "values": [[str(ts), line] for ts, line in entries]}
+        for labels, entries in streams.items()
+    ]}
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _field(number: int, data: bytes) -> bytes:
+    """Length-delimited protobuf field"""
+    return _varint(number << 3 | 2) + _varint(len(data)) + data
+
+
+def encode_protobuf(streams: Streams) -> bytes:
+    """Encode streams as a logproto.PushRequest message (uncompressed)"""
+    out = bytearray()
+    for labels, entries in streams.items():
+        stream = bytearray(_field(1, format_labels(labels).encode()))
+        for ts, line in entries:
+            seconds, nanos = divmod(ts, 1_000_000_000)
+            timestamp = _varint(1 << 3) + _varint(seconds)
+            if nanos:
+                timestamp += _varint(2 << 3) + _varint(nanos)
+            stream += _field(2, _field(1, timestamp) + _field(2, line.encode()))
+        out += _field(1, bytes(stream))
+    return bytes(out)
+
+
+def spill_dir(name: str) -> str:
+    """Spill directory for one pusher under LOKI_SPILL_DIR; use one directory per process"""
+    return os.path.join(SPILL_BASE_DIR, name)
+
+
+class SpillQueue:
+    """
+    Bounded on-disk FIFO of push batches
+
+    Batches are appended as length+CRC framed JSON records to segment files
+    (segment-<seq>.wal) that are rolled at `segment_bytes`. The read position
+    is persisted to a checkpoint file after every committed record, and fully
+    replayed segments are deleted. When the queue exceeds `max_bytes` the
+    oldest segments are discarded. A torn record at the tail (crash during
+    append) ends its segment. The directory is flock'ed so only one process
+    uses it at a time.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024, segment_bytes: int = 8 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = max(64 * 1024, min(segment_bytes, max_bytes // 4))
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock_file = open(os.path.join(directory, "lock"), "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            raise RuntimeError(f"spill directory {directory} is in use by another process")
+
+        self._checkpoint_path = os.path.join(directory, "checkpoint")
+        segments = self._segments()
+        self._read_seq, self._read_offset = self._load_checkpoint(segments)
+        # Always start a fresh segment so appends never follow a torn tail
+        self._write_seq = (segments[-1] + 1) if segments else 1
+        self._writer = None
+        self._write_size = 0
+        self._update_metric()
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"segment-{seq:012d}.wal")
+
+    def _segments(self) -> List[int]:
+        seqs = []
+        for name in os.listdir(self.directory):
+            if name.startswith("segment-") and name.endswith(".wal"):
+                try:
+                    seqs.append(int(name[8:-4]))
+                except ValueError:
+                    continue
+        return sorted(seqs)
+
+    def _load_checkpoint(self, segments: List[int]) -> Tuple[int, int]:
+        try:
+            with open(self._checkpoint_path) as f:
+                checkpoint = json.load(f)
+            seq, offset = int(checkpoint["segment"]), int(checkpoint["offset"])
+            if seq in segments:
+                return seq, offset
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return (segments[0] if segments else 1), 0
+
+    def _save_checkpoint(self):
+        tmp = self._checkpoint_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"segment": self._read_seq, "offset": self._read_offset}, f)
+        os.replace(tmp, self._checkpoint_path)
+
+    def backlog_bytes(self) -> int:
+        """Bytes of spilled records not yet replayed"""
+        with self._lock:
+            return self._backlog_bytes()
+
+    def _backlog_bytes(self) -> int:
+        total = 0
+        for seq in self._segments():
+            if seq < self._read_seq:
+                continue
+            try:
+                size = os.path.getsize(self._segment_path(seq))
+            except OSError:
+                continue
+            total += size - (self._read_offset if seq == self._read_seq else 0)
+        return max(total, 0)
+
+    def _update_metric(self):
+        if spill_backlog_bytes is not None:
+            spill_backlog_bytes.labels(directory=self.directory).set(self._backlog_bytes())
+
+    def append(self, streams: Streams) -> Tuple[int, int]:
+        """Append one batch durably (flushed and fsynced); returns the position after it, as peek() reports it"""
+        payload = json.dumps([[list(labels), entries] for labels, entries in streams.items()],
+                             separators=(',', ':')).encode()
+        record = SPILL_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._lock:
+            if self._writer is None or self._write_size >= self.segment_bytes:
+                if self._writer is not None:
+                    self._writer.close()
+                    self._write_seq += 1
+                self._writer = open(self._segment_path(self._write_seq), "ab")
+                self._write_size = self._writer.tell()
+            self._writer.write(record)
+            self._writer.flush()
+            os.fsync(self._writer.fileno())
+            self._write_size += len(record)
+            position = (self._write_seq, self._write_size)
+            self._enforce_limit()
+            self._update_metric()
+        return position
+
+    def _enforce_limit(self):
+        segments = self._segments()
+        total = sum(os.path.getsize(self._segment_path(seq)) for seq in segments)
+        for seq in segments:
+            if total <= self.max_bytes or seq == self._write_seq:
+                break
+            size = os.path.getsize(self._segment_path(seq))
+            os.remove(self._segment_path(seq))
+            total -= size
+            logger.error("Loki spill queue %s over %d bytes, dropped segment %d", self.directory, self.max_bytes, seq)
+            if spill_dropped_total is not None:
+                spill_dropped_total.labels(directory=self.directory).inc()
+            if seq >= self._read_seq:
+                self._read_seq, self._read_offset = seq + 1, 0
+                self._save_checkpoint()
+
+    def peek(self) -> Optional[Tuple[Streams, Tuple[int, int]]]:
+        """Return the oldest unreplayed batch and the position after it, or None if empty"""
+        with self._lock:
+            while self._read_seq <= self._write_seq:
+                path = self._segment_path(self._read_seq)
+                record = None
+                if os.path.exists(path):
+                    with open(path, "rb") as f:
+                        f.seek(self._read_offset)
+                        header = f.read(SPILL_RECORD_HEADER.size)
+                        if len(header) == SPILL_RECORD_HEADER.size:
+                            length, crc = SPILL_RECORD_HEADER.unpack(header)
+                            payload = f.read(length)
+                            if len(payload) == length and zlib.crc32(payload) == crc:
+                                record = payload
+                if record is not None:
+                    streams = {tuple(tuple(pair) for pair in labels): [tuple(entry) for entry in entries]
+                               for labels, entries in json.loads(record)}
+                    next_offset = self._read_offset + SPILL_RECORD_HEADER.size + len(record)
+                    return streams, (self._read_seq, next_offset)
+                if self._read_seq == self._write_seq:
+                    return None
+                # Segment finished (or torn at the tail): move on to the next one
+                if os.path.exists(path):
+                    os.remove(path)
+                self._read_seq, self._read_offset = self._read_seq + 1, 0
+                self._save_checkpoint()
+            return None
+
+    def commit(self, position: Tuple[int, int]):
+        """Mark everything before `position` (from peek) as replayed"""
+        with self._lock:
+            self._read_seq, self._read_offset = position
+            self._save_checkpoint()
+            self._update_metric()
+
+    def close(self):
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        self._lock_file.close()
+
+
+class LokiClient:
+    """
+    Thread-safe batching client for the Loki push API
+
+    push() only appends to the pending batch; a background thread sends it
+    when it is `batch_wait` seconds old, and push() sends it inline once it
+    exceeds `batch_size` bytes. Call flush() to send immediately and close()
+    (or use the client as a context manager) to send what is left.
+
+    Args:
+        url: Loki push endpoint
+        batch_size: bytes of log lines that trigger an immediate send
+        batch_wait: maximum seconds an entry waits in the batch
+        encoding: "json" or "protobuf"
+        compress: gzip JSON payloads (protobuf payloads are always snappy-compressed)
+        max_retries: retries after the first attempt for 429/5xx/connection errors
+        backoff_base: base delay in seconds, doubled per retry with jitter
+        timeout: per-request timeout in seconds
+        tenant_id: X-Scope-OrgID header for multi-tenant Loki
+        on_result: called with (PushResult, streams) after every send attempt completes
+        spill_dir: directory for the on-disk spill queue; None drops batches that fail
+        spill_max_bytes: size bound of the spill queue
+        replay_rate: maximum spilled batches replayed per second
+    """
+
+    def __init__(self, url: str = DEFAULT_PUSH_URL, batch_size: int = 1024 * 1024, batch_wait: float = 1.0,
+                 encoding: str = "json", compress: bool = True, max_retries: int = 5,
+                 backoff_base: float = 0.5, timeout: float = 10.0, tenant_id: Optional[str] = None,
+                 on_result: Optional[Callable[[PushResult, Streams], None]] = None,
+                 spill_dir: Optional[str] = None, spill_max_bytes: int = 256 * 1024 * 1024,
+                 replay_rate: float = 5.0):
+        if encoding not in ("json", "protobuf"):
+            raise ValueError(f"unknown encoding {encoding!r}")
+        if encoding == "protobuf":
+            import snappy  # noqa: F401 - fail early if python-snappy is missing
+
+        self.url = url
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.encoding = encoding
+        self.compress = compress
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self.on_result = on_result
+
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        if tenant_id:
+            self.session.headers["X-Scope-OrgID"] = tenant_id
+
+        self.sent_entries = 0
+        self.failed_entries = 0
+        self.spilled_entries = 0
+        self.replayed_entries = 0
+        self.requests = 0
+        # Result of the most recent batch taken from the pending queue; replaced by the
+        # replay's result once that batch, if spilled, is replayed
+        self.last_result: Optional[PushResult] = None
+        self._last_spill_position: Optional[Tuple[int, int]] = None
+        self._spill_position: Optional[Tuple[int, int]] = None
+
+        self._streams: Streams = {}
+        self._bytes = 0
+        self._batch_started: Optional[float] = None
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._closed = False
+        self._flusher: Optional[threading.Thread] = None
+
+        self.replay_rate = replay_rate
+        self.spill = SpillQueue(spill_dir, max_bytes=spill_max_bytes) if spill_dir else None
+        self._replay_wakeup = threading.Event()
+        self._replay_stop = threading.Event()
+        self._replayer: Optional[threading.Thread] = None
+        if self.spill is not None:
+            self._replayer = threading.Thread(target=self._replay_loop, name="loki-replayer", daemon=True)
+            self._replayer.start()
+
+    def push(self, line: str, labels: Dict[str, str], timestamp_ns: Optional[int] = None):
+        """Queue one log line for the stream identified by `labels`"""
+        if timestamp_ns is None:
+            timestamp_ns = time.time_ns()
+        key = label_set(labels)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("LokiClient is closed")
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="loki-flusher", daemon=True)
+                self._flusher.start()
+            self._streams.setdefault(key, []).append((timestamp_ns, line))
+            self._bytes += len(line) + ENTRY_OVERHEAD
+            if self._batch_started is None:
+                self._batch_started = time.monotonic()
+                self._wakeup.notify()
+            full = self._bytes >= self.batch_size
+        if full:
+            self.flush()
+
+    def pending(self) -> int:
+        """Number of entries waiting to be sent"""
+        with self._lock:
+            return sum(len(entries) for entries in self._streams.values())
+
+    def _take_batch(self) -> Streams:
+        with self._lock:
+            streams, self._streams = self._streams, {}
+            self._bytes = 0
+            self._batch_started = None
+        return streams
+
+    def flush(self) -> Optional[PushResult]:
+        """Send the pending batch now; returns None if there was nothing to send"""
+        # Holding the send lock while taking the batch keeps batches in push order
+        with self._send_lock:
+            streams = self._take_batch()
+            if not streams:
+                return None
+            if self.spill is not None and self.spill.backlog_bytes():
+                # Keep ordering: queue behind the batches still waiting for replay
+                result = self._spill(streams, PushResult(False, None, len(streams),
+                                                         sum(len(v) for v in streams.values()), 0,
+                                                         "queued behind spill backlog"))
+            else:
+                result = self.send(streams)
+            self.last_result = result
+            self._last_spill_position = self._spill_position if result.spilled else None
+            return result
+
+    def send(self, streams: Streams, max_retries: Optional[int] = None, spill: bool = True) -> PushResult:
+        """Encode and send one batch of streams, retrying transient failures"""
+        max_retries = self.max_retries if max_retries is None else max_retries
+        for entries in streams.values():
+            entries.sort(key=lambda entry: entry[0])
+        entries = sum(len(values) for values in streams.values())
+        body, headers = self._encode(streams)
+
+        status_code, error = None, None
+        attempt = 0
+        for attempt in range(1, max_retries + 2):
+            if attempt > 1:
+                delay = self.backoff_base * (2 ** (attempt - 2)) * random.uniform(0.5, 1.5)
+                logger.info("Retrying Loki push of %d entries in %.2fs (attempt %d)", entries, delay, attempt)
+                time.sleep(delay)
+            try:
+                self.requests += 1
+                response = self.session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+                status_code, error = response.status_code, None
+                if response.status_code in (200, 204):
+                    break
+                error = response.text.strip()[:500] or f"HTTP {response.status_code}"
+                if response.status_code not in RETRY_STATUS_CODES:
+                    break
+            except requests.exceptions.RequestException as e:
+                status_code, error = None, str(e)
+
+        result = PushResult(error is None, status_code, len(streams), entries, attempt, error)
+        if result.ok:
+            self.sent_entries += entries
+        elif spill and self.spill is not None and (status_code is None or status_code in RETRY_STATUS_CODES):
+            logger.error("Loki push of %d entries failed after %d attempt(s), spilling to disk: %s",
+                         entries, attempt, error)
+            return self._spill(streams, result)
+        elif spill:
+            self.failed_entries += entries
+            logger.error("Loki push of %d entries failed after %d attempt(s): %s", entries, attempt, error)
+        if self.on_result and spill:
+            self.on_result(result, streams)
+        return result
+
+    def _spill(self, streams: Streams, result: PushResult) -> PushResult:
+        try:
+            self._spill_position = self.spill.append(streams)
+        except OSError as e:
+            self.failed_entries += result.entries
+            logger.error("Could not spill %d entries to %s: %s", result.entries, self.spill.directory, e)
+        else:
+            self.spilled_entries += result.entries
+            result = result._replace(spilled=True)
+            self._replay_wakeup.set()
+        if self.on_result:
+            self.on_result(result, streams)
+        return result
+
+    def _replay_loop(self):
+        """Replay spilled batches oldest first, at most replay_rate per second"""
+        failures = 0
+        while not self._replay_stop.is_set():
+            self._replay_wakeup.wait(timeout=5.0)
+            self._replay_wakeup.clear()
+            while not self._replay_stop.is_set():
+                with self._send_lock:
+                    head = self.spill.peek()
+                    if head is None:
+                        break
+                    streams, position = head
+                    result = self.send(streams, max_retries=0, spill=False)
+                    retryable = not result.ok and (result.status_code is None
+                                                   or result.status_code in RETRY_STATUS_CODES)
+                    if position == self._last_spill_position and (result.ok or not retryable):
+                        # The last flushed batch has now been delivered (or finally rejected)
+                        self.last_result = result
+                        self._last_spill_position = None
+                    if result.ok:
+                        self.spill.commit(position)
+                        self.replayed_entries += result.entries
+                        self.spilled_entries -= min(self.spilled_entries, result.entries)
+                    elif not retryable:
+                        # Loki rejected the batch itself (e.g. entries too old); it will never succeed
+                        logger.error("Dropping spilled batch of %d entries rejected by Loki: %s",
+                                     result.entries, result.error)
+                        self.spill.commit(position)
+                        self.failed_entries += result.entries
+                if retryable:
+                    failures += 1
+                    delay = min(30.0, self.backoff_base * (2 ** min(failures, 10))) * random.uniform(0.5, 1.5)
+                    self._replay_stop.wait(timeout=delay)
+                    continue
+                failures = 0
+                self._replay_stop.wait(timeout=1.0 / self.replay_rate)
+
+    def drain(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for the spill backlog to be replayed; True if it is empty"""
+        if self.spill is None:
+            return True
+        deadline = time.monotonic() + timeout
+        self._replay_wakeup.set()
+        while self.spill.backlog_bytes():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+        return True
+
+    def _encode(self, streams: Streams) -> Tuple[bytes, Dict[str, str]]:
+        if self.encoding == "protobuf":
+            import snappy
+
+            return snappy.compress(encode_protobuf(streams)), {"Content-Type": "application/x-protobuf"}
+        body = encode_json(streams)
+        headers = {"Content-Type": "application/json"}
+        if self.compress:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        return body, headers
+
+    def _flush_loop(self):
+        while True:
+            with self._lock:
+                while not self._closed and self._batch_started is None:
+                    self._wakeup.wait()
+                if self._closed:
+                    return
+                remaining = self._batch_started + self.batch_wait - time.monotonic()
+                if remaining > 0:
+                    self._wakeup.wait(remaining)
+                    continue
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Unexpected error flushing Loki batch: %s", e, exc_info=True)
+
+    def close(self, drain_timeout: float = 0.0) -> PushResult:
+        """
+        Stop the background flusher and send anything still pending
+
+        Returns the result of the last batch sent, the final one or, if nothing
+        was pending, the last one the flusher sent (an empty ok result if
+        nothing was ever pushed). With a spill queue, waits up to
+        `drain_timeout` seconds for the backlog to replay, and a spilled last
+        batch that was replayed meanwhile reports the replay's result; anything
+        left stays on disk for the next client using the same spill_dir.
+        """
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify_all()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        if self.spill is not None:
+            if drain_timeout > 0 and not self.drain(drain_timeout):
+                logger.warning("%d bytes of Loki batches left in %s for later replay",
+                               self.spill.backlog_bytes(), self.spill.directory)
+            self._replay_stop.set()
+            self._replay_wakeup.set()
+            self._replayer.join()
+            self.spill.close()
+        self.session.close()
+        return self.last_result or PushResult(True, None, 0, 0, 0, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Streaming Loki query client
+
+query_range() splits a long time range into shards fetched concurrently,
+pages through each shard with a timestamp cursor (so it is not capped at
+one request's `limit`), and yields entries one at a time in time order.
+Only a bounded number of pages is held in memory. Responses are parsed
+incrementally with ijson when it is installed (pip3 install ijson), and
+with response.json() otherwise.
+
+Shards are aligned to a fixed grid of `shard_seconds` buckets. With
+`cache_dir` set, buckets that closed more than `cache_settle_seconds` ago
+are fetched whole, stored on disk (gzip JSONL keyed by Loki URL, query and
+bucket) and served from there on later forward queries, so repeated
+investigations over overlapping windows only hit Loki for the still-open
+edge. Queries with a `limit` or in backward direction bypass the cache and
+request pages of at most `limit` entries. The cache
+is bounded by `cache_max_bytes` and evicts least recently used buckets.
+
+count_over_time() returns per-stream entry counts from one instant query,
+for summaries that need totals but not the entries themselves.
+
+tail() follows a query live over the /loki/api/v1/tail websocket (needs
+aiohttp).
+
+Usage:
+    from loki_query import LokiQueryClient
+
+    client = LokiQueryClient()
+    for entry in client.query_range('{job="sdp"}', since=24 * 3600):
+        print(entry.timestamp, entry.labels, entry.line)
+
+Environment:
+    LOKI_URL              default Loki base URL (http://100.64.0.113:3100)
+    LOKI_QUERY_CACHE_DIR  cache directory used by the query scripts (default ~/.cache/telemetry/loki-query)
+"""
+
+import asyncio
+import gzip
+import hashlib
+import heapq
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import ijson
+except ImportError:  # incremental parsing is optional
+    ijson = None
+
+DEFAULT_LOKI_URL = os.environ.get("LOKI_URL", "http://100.64.0.113:3100")
+DEFAULT_CACHE_DIR = os.environ.get("LOKI_QUERY_CACHE_DIR", os.path.expanduser("~/.cache/telemetry/loki-query"))
+NS_PER_SECOND = 1_000_000_000
+# Pages buffered per shard ahead of the consumer
+PAGES_AHEAD = 2
+
+_DONE = object()
+
+
+class LogEntry(NamedTuple):
+    """One log line returned by Loki"""
+    timestamp: int
+    labels: Dict[str, str]
+    line: str
+
+
+class LokiQueryError(Exception):
+    """Raised when Loki rejects a query or cannot be reached"""
+
+
+def _stream_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted(labels.items()))
+
+
+class QueryCache:
+    """
+    On-disk cache of closed query buckets with LRU eviction by total size
+
+    Each bucket is one gzip JSONL file of [timestamp, labels, line] rows in
+    forward order, written to a temporary name and renamed into place once
+    complete. A hit bumps the file's mtime, which eviction uses as recency.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.evict()
+
+    def path(self, *key) -> str:
+        digest = hashlib.sha256("\x00".join(str(part) for part in key).encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.jsonl.gz")
+
+    def read(self, path: str) -> Optional[Iterator[LogEntry]]:
+        """Entries of a cached bucket, or None on a miss"""
+        try:
+            os.utime(path)
+            f = gzip.open(path, "rt")
+        except OSError:
+            return None
+
+        def entries():
+            with f:
+                for row in f:
+                    timestamp, labels, line = json.loads(row)
+                    yield LogEntry(timestamp, labels, line)
+        return entries()
+
+    def write(self, path: str, pages: Iterator[List[LogEntry]], complete: Callable[[], bool]) -> Iterator[List[LogEntry]]:
+        """Pass `pages` through while writing them to `path`; kept only if complete() is true at the end"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        stored = False
+        try:
+            with gzip.open(tmp, "wt", compresslevel=5) as f:
+                for page in pages:
+                    for entry in page:
+                        f.write(json.dumps([entry.timestamp, entry.labels, entry.line]) + "\n")
+                    yield page
+            if complete():
+                os.replace(tmp, path)
+                stored = True
+        finally:
+            if not stored and os.path.exists(tmp):
+                os.remove(tmp)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used buckets until the cache fits in max_bytes"""
+        with self._evict_lock:
+            files = []
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    if name.endswith(".jsonl.gz"):
+                        path = os.path.join(root, name)
+                        try:
+                            stat = os.stat(path)
+                        except OSError:
+                            continue
+                        files.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+
+
+class LokiQueryClient:
+    """
+    Client for Loki's query_range, query and tail APIs
+
+    Args:
+        base_url: Loki base URL, without the /loki/api/v1 path
+        page_limit: entries requested per query_range call
+        shard_seconds: length of the time shards fetched in parallel
+        max_workers: shards fetched concurrently
+        timeout: per-request timeout in seconds
+        tenant_id: X-Scope-OrgID header for multi-tenant Loki
+        cache_dir: directory for the bucket cache; None disables caching
+        cache_max_bytes: size bound of the bucket cache
+        cache_settle_seconds: how long after a bucket ends before it is treated as closed,
+            allowing for late ingestion
+    """
+
+    def __init__(self, base_url: str = DEFAULT_LOKI_URL, page_limit: int = 5000, shard_seconds: float = 3600,
+                 max_workers: int = 4, timeout: float = 30.0, tenant_id: Optional[str] = None,
+                 cache_dir: Optional[str] = None, cache_max_bytes: int = 1024 * 1024 * 1024,
+                 cache_settle_seconds: float = 300):
+        self.base_url = base_url.rstrip("/")
+        self.page_limit = page_limit
+        self.shard_ns = int(shard_seconds * NS_PER_SECOND)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.tenant_id = tenant_id
+        self.cache = QueryCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self.cache_settle_ns = int(cache_settle_seconds * NS_PER_SECOND)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=max_workers))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max_workers))
+        if tenant_id:
+            self.session.headers["X-Scope-OrgID"] = tenant_id
+
+    def ready(self) -> bool:
+        """True if Loki's /ready endpoint answers 200"""
+        try:
+            return self.session.get(f"{self.base_url}/ready", timeout=self.timeout).status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+    def _fetch_page(self, query: str, start: int, end: int, limit: int, direction: str) -> List[LogEntry]:
+        """One query_range call, returned as entries merged across streams in `direction` order"""
+        params = {"query": query, "start": str(start), "end": str(end), "limit": limit, "direction": direction}
+        try:
+            response = self.session.get(f"{self.base_url}/loki/api/v1/query_range", params=params,
+                                        timeout=self.timeout, stream=ijson is not None)
+        except requests.exceptions.RequestException as e:
+            raise LokiQueryError(f"Loki query failed: {e}")
+        if response.status_code != 200:
+            raise LokiQueryError(f"Loki query failed with HTTP {response.status_code}: {response.text[:500]}")
+
+        if ijson is not None:
+            response.raw.decode_content = True
+            streams = ijson.items(response.raw, "data.result.item")
+        else:
+            data = response.json()
+            if data.get("status") != "success":
+                raise LokiQueryError(f"Loki query failed: {data}")
+            streams = data.get("data", {}).get("result", [])
+
+        per_stream = []
+        for stream in streams:
+            labels = stream.get("stream", {})
+            per_stream.append([LogEntry(int(ts), labels, line) for ts, line in stream.get("values", [])])
+        response.close()
+        return list(heapq.merge(*per_stream, key=lambda entry: entry.timestamp,
+                                reverse=direction == "backward"))
+
+    def _paginate(self, query: str, start: int, end: int, direction: str,
+                  stop: threading.Event, page_limit: Optional[int] = None) -> Iterator[List[LogEntry]]:
+        """
+        Yield pages covering [start, end) using a timestamp cursor
+
+        The cursor re-requests the boundary timestamp and drops entries already
+        seen there, so entries sharing a timestamp across pages are neither
+        lost nor duplicated.
+        """
+        page_limit = page_limit or self.page_limit
+        seen = set()
+        while not stop.is_set() and start < end:
+            page = self._fetch_page(query, start, end, page_limit, direction)
+            fresh = [entry for entry in page if (entry.timestamp, _stream_key(entry.labels), entry.line) not in seen]
+            if fresh:
+                yield fresh
+            if len(page) < page_limit:
+                return
+            cursor = page[-1].timestamp
+            if fresh:
+                at_cursor = {(e.timestamp, _stream_key(e.labels), e.line) for e in page if e.timestamp == cursor}
+                seen = (seen | at_cursor) if any(key[0] == cursor for key in seen) else at_cursor
+            else:
+                # More entries share this timestamp than fit in a page; step past it
+                cursor += 1 if direction == "forward" else -1
+                seen = set()
+            if direction == "forward":
+                start = cursor
+            else:
+                end = cursor + 1
+
+    def _shards(self, start: int, end: int, direction: str) -> List[Tuple[int, int, int]]:
+        """(start, end, bucket start) of each grid-aligned shard overlapping [start, end)"""
+        shards = []
+        bucket = start - start % self.shard_ns
+        while bucket < end:
+            shards.append((max(start, bucket), min(end, bucket + self.shard_ns), bucket))
+            bucket += self.shard_ns
+        return shards if direction == "forward" else shards[::-1]
+
+    def _bucket_pages(self, query: str, bucket: int, stop: threading.Event) -> Iterator[List[LogEntry]]:
+        """Forward pages of a whole closed bucket, from the cache or fetched and stored"""
+        path = self.cache.path(self.base_url, self.tenant_id, query, self.shard_ns, bucket)
+        cached = self.cache.read(path)
+        if cached is not None:
+            self.cache_hits += 1
+            page = []
+            for entry in cached:
+                page.append(entry)
+                if len(page) >= self.page_limit:
+                    yield page
+                    page = []
+            if page:
+                yield page
+            return
+        self.cache_misses += 1
+        pages = self._paginate(query, bucket, bucket + self.shard_ns, "forward", stop)
+        yield from self.cache.write(path, pages, lambda: not stop.is_set())
+
+    def _shard_pages(self, query: str, shard: Tuple[int, int, int], direction: str,
+                     stop: threading.Event, limit: Optional[int] = None) -> Iterator[List[LogEntry]]:
+        start, end, bucket = shard
+        # Limited and backward reads go straight to Loki with pages no larger than the limit:
+        # filling a whole forward-stored bucket to return the last few entries costs more than it saves
+        if (self.cache is None or limit is not None or direction == "backward"
+                or bucket + self.shard_ns > time.time_ns() - self.cache_settle_ns):
+            page_limit = min(limit, self.page_limit) if limit is not None else None
+            yield from self._paginate(query, start, end, direction, stop, page_limit)
+            return
+
+        pages = ([entry for entry in page if start <= entry.timestamp < end]
+                 for page in self._bucket_pages(query, bucket, stop))
+        yield from (page for page in pages if page)
+
+    def query_range(self, query: str, start: Optional[int] = None, end: Optional[int] = None,
+                    since: float = 3600, limit: Optional[int] = None,
+                    direction: str = "forward") -> Iterator[LogEntry]:
+        """
+        Stream all entries matching `query` in [start, end) (nanoseconds)
+
+        Defaults to the last `since` seconds. Shards are fetched concurrently but
+        entries are yielded strictly in `direction` order; at most `limit`
+        entries are returned when it is set. Raises LokiQueryError on failure.
+        """
+        if direction not in ("forward", "backward"):
+            raise ValueError(f"direction must be 'forward' or 'backward', not {direction!r}")
+        end = time.time_ns() if end is None else end
+        start = end - int(since * NS_PER_SECOND) if start is None else start
+
+        shards = self._shards(start, end, direction)
+        stop = threading.Event()
+        buffers = [queue.Queue(maxsize=PAGES_AHEAD) for _ in shards]
+
+        def put(buffer, item):
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.2)
+                    return
+                except queue.Full:
+                    continue
+
+        def fetch(index):
+            try:
+                for page in self._shard_pages(query, shards[index], direction, stop, limit):
+                    put(buffers[index], page)
+                put(buffers[index], _DONE)
+            except Exception as e:
+                put(buffers[index], e)
+
+        returned = 0
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="loki-shard")
+        try:
+            for index in range(len(shards)):
+                executor.submit(fetch, index)
+            for buffer in buffers:
+                while True:
+                    page = buffer.get()
+                    if page is _DONE:
+                        break
+                    if isinstance(page, Exception):
+                        raise page
+                    for entry in page:
+                        yield entry
+                        returned += 1
+                        if limit is not None and returned >= limit:
+                            return
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def count_over_time(self, query: str, since: float = 3600,
+                        end: Optional[int] = None) -> Dict[Tuple[Tuple[str, str], ...], int]:
+        """
+        Entry count per stream of `query` over the `since` seconds before `end`
+
+        One count_over_time instant query, so Loki counts server-side instead of
+        every entry being streamed to the client. Keys are sorted label tuples.
+        """
+        end = time.time_ns() if end is None else end
+        params = {"query": f"count_over_time({query}[{max(int(since), 1)}s])", "time": str(end)}
+        try:
+            response = self.session.get(f"{self.base_url}/loki/api/v1/query", params=params, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            raise LokiQueryError(f"Loki query failed: {e}")
+        if response.status_code != 200:
+            raise LokiQueryError(f"Loki query failed with HTTP {response.status_code}: {response.text[:500]}")
+        data = response.json()
+        if data.get("status") != "success":
+            raise LokiQueryError(f"Loki query failed: {data}")
+        return {_stream_key(sample.get("metric", {})): int(float(sample["value"][1]))
+                for sample in data.get("data", {}).get("result", [])}
+
+    def tail(self, query: str, start: Optional[int] = None, limit: int = 100,
+             delay_for: int = 0) -> Iterator[LogEntry]:
+        """
+        Follow `query` live over the tail websocket, yielding entries as they arrive
+
+        Runs until the caller stops iterating or the connection closes. Requires aiohttp.
+        """
+        import aiohttp
+
+        params = {"query": query, "limit": str(limit), "delay_for": str(delay_for)}
+        if start is not None:
+            params["start"] = str(start)
+        url = self.base_url.replace("http://", "ws://", 1).replace("https://", "wss://", 1)
+        headers = {"X-Scope-OrgID": self.tenant_id} if self.tenant_id else {}
+
+        async def connect():
+            session = aiohttp.ClientSession()
+            try:
+                return session, await session.ws_connect(f"{url}/loki/api/v1/tail", params=params,
+                                                         headers=headers, heartbeat=30)
+            except BaseException:
+                await session.close()
+                raise
+
+        loop = asyncio.new_event_loop()
+        session = None
+        try:
+            session, ws = loop.run_until_complete(connect())
+            while True:
+                message = loop.run_until_complete(ws.receive())
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    if message.type == aiohttp.WSMsgType.ERROR:
+                        raise LokiQueryError(f"Loki tail failed: {ws.exception()}")
+                    return
+                data = json.loads(message.data)
+                for dropped in data.get("dropped_entries") or []:
+                    print(f"⚠️ Loki dropped tail entry at {dropped.get('timestamp')}")
+                for stream in data.get("streams", []):
+                    labels = stream.get("stream", {})
+                    for ts, line in stream.get("values", []):
+                        yield LogEntry(int(ts), labels, line)
+        except aiohttp.ClientError as e:
+            raise LokiQueryError(f"Loki tail failed: {e}")
+        finally:
+            if session is not None:
+                loop.run_until_complete(session.close())
+            loop.close()
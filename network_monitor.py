@@ -2,69 +2,508 @@
 """
 Network Interface Monitor
 Collects network interface statistics and writes to log file for Promtail collection
+
+Interfaces are sampled at sub-second resolution on the monotonic clock and
+rx/tx bits, packets, errors and drops per second are computed in-process.
+One JSON line is written per interface and window (1s and 10s by default)
+with the min/max/avg rate over the window plus the cumulative counters, so
+short bursts are visible without LogQL rate() queries.
+
+Outputs are selected with NETWORK_MONITOR_MODE (comma-separated):
+  log       JSON lines for Promtail -> Loki (the original path)
+  exporter  Prometheus /metrics endpoint with real counters per interface
+  push      periodic push of the same metrics to the Prometheus Pushgateway
+The exporter and push modes need prometheus_client (pip3 install prometheus-client).
+
+/proc/net/dev is kept open and re-read from the start on every sample, and log
+lines go through one persistent buffered handle that is flushed/fsynced
+periodically and reopened when logrotate moves or removes the file.
+
+Environment:
+  NETWORK_MONITOR_INTERFACES      comma-separated interface names or globs, e.g. "enp*,eth0" or "*"
+                                  (default enp86s0, or NETWORK_MONITOR_INTERFACE if set)
+  NETWORK_MONITOR_EXCLUDE         comma-separated globs never sampled (default lo)
+  NETWORK_MONITOR_SAMPLE_INTERVAL seconds between samples (default 0.1)
+  NETWORK_MONITOR_WINDOWS         comma-separated window lengths in seconds (default 1,10)
+  NETWORK_MONITOR_LOG_FILE        log file (default /home/rnd/telemetry/logs/network_stats.log)
+  NETWORK_MONITOR_MODE            log, exporter and/or push (default log)
+  NETWORK_MONITOR_EXPORTER_PORT   exporter mode listen port (default 9275)
+  NETWORK_MONITOR_PUSHGATEWAY     push mode Pushgateway address (default pushgateway:9091)
+  NETWORK_MONITOR_PUSH_INTERVAL   push mode interval in seconds (default 10)
+  NETWORK_MONITOR_INSTANCE        instance grouping label for pushes (default hostname)
+  NETWORK_MONITOR_FLUSH_INTERVAL  seconds between buffer flushes / rotation checks (default 5)
+  NETWORK_MONITOR_FSYNC_INTERVAL  seconds between fsyncs, 0 to disable (default 30)
 """
 
 import time
 import json
-import subprocess
+import signal
+import socket
+import sys
+import threading
 from datetime import datetime
+from fnmatch import fnmatchcase
 import os
 
-def get_network_stats(interface="enp86s0"):
+INTERFACE_PATTERNS = [p.strip() for p in os.environ.get(
+    "NETWORK_MONITOR_INTERFACES", os.environ.get("NETWORK_MONITOR_INTERFACE", "enp86s0")).split(",") if p.strip()]
+EXCLUDE_PATTERNS = [p.strip() for p in os.environ.get("NETWORK_MONITOR_EXCLUDE", "lo").split(",") if p.strip()]
+LOG_FILE = os.environ.get("NETWORK_MONITOR_LOG_FILE", "/home/rnd/telemetry/logs/network_stats.log")
+FLUSH_INTERVAL = float(os.environ.get("NETWORK_MONITOR_FLUSH_INTERVAL", "5"))
+FSYNC_INTERVAL = float(os.environ.get("NETWORK_MONITOR_FSYNC_INTERVAL", "30"))
+SAMPLE_INTERVAL = float(os.environ.get("NETWORK_MONITOR_SAMPLE_INTERVAL", "0.1"))
+WINDOWS = sorted(float(w) for w in os.environ.get("NETWORK_MONITOR_WINDOWS", "1,10").split(",") if w.strip())
+WRITE_BUFFER_SIZE = 64 * 1024
+
+MODES = {m.strip() for m in os.environ.get("NETWORK_MONITOR_MODE", "log").split(",") if m.strip()}
+EXPORTER_PORT = int(os.environ.get("NETWORK_MONITOR_EXPORTER_PORT", "9275"))
+PUSHGATEWAY = os.environ.get("NETWORK_MONITOR_PUSHGATEWAY", "pushgateway:9091")
+PUSH_INTERVAL = float(os.environ.get("NETWORK_MONITOR_PUSH_INTERVAL", "10"))
+PUSH_JOB = "network_monitor"
+INSTANCE = os.environ.get("NETWORK_MONITOR_INSTANCE", socket.gethostname())
+
+# /proc/net/dev column index of each counter
+COUNTER_COLUMNS = {
+    'rx_bytes': 0,
+    'rx_packets': 1,
+    'rx_errors': 2,
+    'rx_drops': 3,
+    'tx_bytes': 8,
+    'tx_packets': 9,
+    'tx_errors': 10,
+    'tx_drops': 11,
+}
+
+# Counter -> exported metric name (exposed with a _total suffix)
+COUNTER_METRICS = {
+    'rx_bytes': ('network_monitor_receive_bytes', 'Bytes received'),
+    'tx_bytes': ('network_monitor_transmit_bytes', 'Bytes transmitted'),
+    'rx_packets': ('network_monitor_receive_packets', 'Packets received'),
+    'tx_packets': ('network_monitor_transmit_packets', 'Packets transmitted'),
+    'rx_errors': ('network_monitor_receive_errors', 'Receive errors'),
+    'tx_errors': ('network_monitor_transmit_errors', 'Transmit errors'),
+    'rx_drops': ('network_monitor_receive_drops', 'Received packets dropped'),
+    'tx_drops': ('network_monitor_transmit_drops', 'Transmitted packets dropped'),
+}
+
+# Rate name -> (counter, multiplier)
+RATES = {
+    'rx_bps': ('rx_bytes', 8),
+    'tx_bps': ('tx_bytes', 8),
+    'rx_pps': ('rx_packets', 1),
+    'tx_pps': ('tx_packets', 1),
+    'rx_errors_per_sec': ('rx_errors', 1),
+    'tx_errors_per_sec': ('tx_errors', 1),
+    'rx_drops_per_sec': ('rx_drops', 1),
+    'tx_drops_per_sec': ('tx_drops', 1),
+}
+
+# Window summary fields exported as gauges, merged across windows between collections
+WINDOW_FIELDS = [f"{prefix}_{unit}_{stat}" for prefix in ('rx', 'tx') for unit in ('bps', 'pps')
+                 for stat in ('min', 'max', 'avg')]
+
+
+class NetDevReader:
+    """
+    Long-lived reader for /proc/net/dev
+
+    The file is opened once; each read seeks back to the start, so sampling
+    costs one read() syscall instead of an open/read/close cycle.
+    """
+
+    def __init__(self, path='/proc/net/dev'):
+        self.path = path
+        self._file = open(path, 'rb', buffering=0)
+
+    def read(self):
+        """
+        Read counters for all interfaces
+        Returns: dict of interface name -> list of counter ints
+        """
+        self._file.seek(0)
+        data = self._file.read()
+        counters = {}
+        # The first two lines are column headers
+        for line in data.split(b'\n')[2:]:
+            name, sep, values = line.partition(b':')
+            if sep:
+                counters[name.strip().decode()] = [int(v) for v in values.split()]
+        return counters
+
+    def close(self):
+        self._file.close()
+
+
+class InterfaceSelector:
+    """Matches interface names against include/exclude globs, caching the result per name"""
+
+    def __init__(self, patterns=INTERFACE_PATTERNS, exclude=EXCLUDE_PATTERNS):
+        self.patterns = patterns
+        self.exclude = exclude
+        self._cache = {}
+
+    def __call__(self, name):
+        selected = self._cache.get(name)
+        if selected is None:
+            selected = (any(fnmatchcase(name, p) for p in self.patterns)
+                        and not any(fnmatchcase(name, p) for p in self.exclude))
+            self._cache[name] = selected
+        return selected
+
+
+def get_network_stats(reader, selector):
     """
-    Get network interface statistics from /proc/net/dev
-    Returns: dict with rx_bytes, tx_bytes, rx_packets, tx_packets
+    Get counters for the selected interfaces from /proc/net/dev
+    Returns: dict of interface name -> dict of COUNTER_COLUMNS counters
     """
+    stats = {}
     try:
-        with open('/proc/net/dev', 'r') as f:
-            lines = f.readlines()
-        
-        for line in lines:
-            if interface in line:
-                # Parse the line: interface: rx_bytes rx_packets ... tx_bytes tx_packets ...
-                parts = line.split(':')
-                if len(parts) >= 2:
-                    stats = parts[1].split()
-                    if len(stats) >= 8:
-                        return {
-                            'rx_bytes': int(stats[0]),
-                            'rx_packets': int(stats[1]),
-                            'tx_bytes': int(stats[8]),
-                            'tx_packets': int(stats[9]),
-                            'rx_bits': int(stats[0]) * 8,  # Convert bytes to bits
-                            'tx_bits': int(stats[8]) * 8   # Convert bytes to bits
-                        }
+        for name, values in reader.read().items():
+            if selector(name) and len(values) >= 12:
+                stats[name] = {counter: values[column] for counter, column in COUNTER_COLUMNS.items()}
     except Exception as e:
         print(f"Error reading network stats: {e}")
-    
-    return None
+    return stats
+
 
-def write_network_log(stats, log_file="/home/rnd/telemetry/logs/network_stats.log"):
+class RateWindow:
     """
-    Write network statistics to log file in JSON format
+    Min/max/avg of per-sample rates over one window
+
+    avg is computed from the counter deltas over the summed sample time, so it
+    is the true mean rate of the window rather than the mean of the samples.
+    """
+
+    def __init__(self, length, start):
+        self.length = length
+        self.reset(start)
+
+    def reset(self, start):
+        self.start = start
+        self.samples = 0
+        self.elapsed = 0.0
+        self.deltas = dict.fromkeys(COUNTER_COLUMNS, 0)
+        self.minimum = {}
+        self.maximum = {}
+
+    def add(self, deltas, rates, dt):
+        self.samples += 1
+        self.elapsed += dt
+        for counter, delta in deltas.items():
+            self.deltas[counter] += delta
+        for name, rate in rates.items():
+            if self.samples == 1:
+                self.minimum[name] = self.maximum[name] = rate
+            else:
+                if rate < self.minimum[name]:
+                    self.minimum[name] = rate
+                if rate > self.maximum[name]:
+                    self.maximum[name] = rate
+
+    def due(self, now):
+        return now - self.start >= self.length
+
+    def summary(self):
+        """Return the window's rate fields, or None if it holds no samples"""
+        if not self.samples or self.elapsed <= 0:
+            return None
+        fields = {}
+        for name, (counter, multiplier) in RATES.items():
+            fields[f"{name}_avg"] = round(self.deltas[counter] * multiplier / self.elapsed, 3)
+            fields[f"{name}_min"] = round(self.minimum[name], 3)
+            fields[f"{name}_max"] = round(self.maximum[name], 3)
+        for counter in ('rx_errors', 'tx_errors', 'rx_drops', 'tx_drops'):
+            fields[f"{counter}_delta"] = self.deltas[counter]
+        fields['duration'] = round(self.elapsed, 3)
+        fields['samples'] = self.samples
+        return fields
+
+
+class RateCollector:
+    """
+    Turns successive counter snapshots into per-interface rate windows
+
+    Interfaces that appear are picked up on their first sample; ones that
+    disappear are dropped. A counter going backwards (interface reset or
+    wrap) restarts the interface's baseline without producing a sample.
+    """
+
+    def __init__(self, windows=WINDOWS):
+        self.windows = windows
+        self._previous = {}
+        self._windows = {}
+
+    def update(self, stats, now):
+        """
+        Add a snapshot taken at monotonic time `now`
+        Returns: list of (interface, window length, counters, summary) for windows that closed
+        """
+        closed = []
+        for name in list(self._previous):
+            if name not in stats:
+                del self._previous[name]
+                del self._windows[name]
+
+        for name, counters in stats.items():
+            previous = self._previous.get(name)
+            self._previous[name] = (now, counters)
+            if previous is None:
+                self._windows[name] = [RateWindow(length, now) for length in self.windows]
+                continue
+
+            then, last = previous
+            dt = now - then
+            if dt <= 0:
+                continue
+            deltas = {counter: counters[counter] - last[counter] for counter in COUNTER_COLUMNS}
+            if any(delta < 0 for delta in deltas.values()):
+                for window in self._windows[name]:
+                    window.reset(now)
+                continue
+            rates = {rate: deltas[counter] * multiplier / dt for rate, (counter, multiplier) in RATES.items()}
+
+            for window in self._windows[name]:
+                window.add(deltas, rates, dt)
+                if window.due(now):
+                    summary = window.summary()
+                    if summary:
+                        closed.append((name, window.length, counters, summary))
+                    window.reset(now)
+        return closed
+
+
+class BufferedLogWriter:
+    """
+    Append-only log writer with one persistent buffered handle
+
+    Lines are buffered in memory and flushed every `flush_interval` seconds
+    (fsync every `fsync_interval`). On each flush the path is stat'ed and the
+    file reopened if logrotate renamed or removed it; copytruncate needs no
+    special handling since the handle is opened in append mode.
+    """
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL, fsync_interval=FSYNC_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._last_flush = self._last_fsync = time.monotonic()
+        self._open()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._file = open(self.path, 'a', buffering=WRITE_BUFFER_SIZE)
+
+    def _rotated(self):
+        """True if the path no longer refers to the file we hold open"""
+        try:
+            on_disk = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        held = os.fstat(self._file.fileno())
+        return (on_disk.st_dev, on_disk.st_ino) != (held.st_dev, held.st_ino)
+
+    def write(self, line):
+        self._file.write(line + '\n')
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self.flush(now)
+
+    def flush(self, now=None):
+        """Flush buffered lines, fsync if due and reopen after rotation"""
+        now = time.monotonic() if now is None else now
+        self._file.flush()
+        self._last_flush = now
+        if self.fsync_interval > 0 and now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+        if self._rotated():
+            self._file.close()
+            self._open()
+
+    def close(self):
+        if self._file and not self._file.closed:
+            self._file.flush()
+            if self.fsync_interval > 0:
+                os.fsync(self._file.fileno())
+            self._file.close()
+
+
+def format_window(length):
+    return f"{length:g}s"
+
+
+class NetworkMetricsCollector:
+    """
+    Prometheus collector serving the latest sample
+
+    Interface counters are exported as counters straight from /proc/net/dev.
+    Closed windows are merged per reader (the /metrics endpoint and the
+    Pushgateway pusher each get one) until that reader next collects: the
+    gauges carry the min/max of every window closed since the previous
+    scrape or push and the mean of their averages, so a 1s burst between two
+    10s pushes is not lost. A reader that saw no new window repeats its last
+    values. Interfaces that disappear are dropped from the next collection.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._pending = {}
+        self._last = {}
+
+    def reader(self, name):
+        """A collector with its own since-last-collect window state, to register in one registry"""
+        with self._lock:
+            self._pending[name] = {}
+            self._last[name] = {}
+        return WindowReader(self, name)
+
+    def update(self, stats):
+        with self._lock:
+            self._counters = stats
+            for windows in (*self._pending.values(), *self._last.values()):
+                for key in [key for key in windows if key[0] not in stats]:
+                    del windows[key]
+
+    def record_window(self, interface, window, summary):
+        key = (interface, format_window(window))
+        with self._lock:
+            for pending in self._pending.values():
+                merged = pending.get(key)
+                if merged is None:
+                    pending[key] = {name: summary[name] for name in WINDOW_FIELDS}
+                    pending[key]['windows'] = 1
+                    continue
+                count = merged['windows']
+                for name in WINDOW_FIELDS:
+                    if name.endswith('_min'):
+                        merged[name] = min(merged[name], summary[name])
+                    elif name.endswith('_max'):
+                        merged[name] = max(merged[name], summary[name])
+                    else:
+                        merged[name] = (merged[name] * count + summary[name]) / (count + 1)
+                merged['windows'] = count + 1
+
+    def collect_for(self, name):
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+        with self._lock:
+            counters = self._counters
+            last = self._last[name]
+            last.update(self._pending[name])
+            self._pending[name] = {}
+            windows = dict(last)
+
+        for counter, (metric, documentation) in COUNTER_METRICS.items():
+            family = CounterMetricFamily(metric, documentation, labels=['interface'])
+            for interface, values in counters.items():
+                family.add_metric([interface], values[counter])
+            yield family
+
+        labels = ['interface', 'direction', 'window', 'stat']
+        bits = GaugeMetricFamily('network_monitor_window_bits_per_second',
+                                 'Bit rate over the windows closed since the last scrape or push', labels=labels)
+        packets = GaugeMetricFamily('network_monitor_window_packets_per_second',
+                                    'Packet rate over the windows closed since the last scrape or push',
+                                    labels=labels)
+        for (interface, window), summary in windows.items():
+            for prefix, direction in (('rx', 'receive'), ('tx', 'transmit')):
+                for stat in ('min', 'max', 'avg'):
+                    bits.add_metric([interface, direction, window, stat], round(summary[f"{prefix}_bps_{stat}"], 3))
+                    packets.add_metric([interface, direction, window, stat],
+                                       round(summary[f"{prefix}_pps_{stat}"], 3))
+        yield bits
+        yield packets
+
+
+class WindowReader:
+    """One consumer's view of a NetworkMetricsCollector; collecting resets its window peaks"""
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        return self.metrics.collect_for(self.name)
+
+
+def start_exporter(collector, port=EXPORTER_PORT):
+    """Serve the collector on /metrics (exporter mode)"""
+    from prometheus_client import REGISTRY, start_http_server
+
+    REGISTRY.register(collector.reader('exporter'))
+    start_http_server(port)
+    print(f"Metrics server started on port {port}")
+
+
+class PushgatewayPusher:
+    """Pushes the collector to the Pushgateway from a background thread (push mode)"""
+
+    def __init__(self, collector, gateway=PUSHGATEWAY, interval=PUSH_INTERVAL, instance=INSTANCE):
+        from prometheus_client import CollectorRegistry
+
+        self.gateway = gateway
+        self.interval = interval
+        self.grouping_key = {'instance': instance}
+        self.registry = CollectorRegistry()
+        self.registry.register(collector.reader('push'))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pushgateway", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        print(f"Pushing metrics to {self.gateway} every {self.interval:g}s (instance={self.grouping_key['instance']})")
+
+    def push(self):
+        from prometheus_client import push_to_gateway
+
+        try:
+            push_to_gateway(self.gateway, job=PUSH_JOB, registry=self.registry,
+                            grouping_key=self.grouping_key, timeout=5)
+        except Exception as e:
+            print(f"Error pushing to Pushgateway {self.gateway}: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.push()
+
+    def stop(self):
+        """Stop pushing and delete this instance's group so its series do not go stale in place"""
+        from prometheus_client import delete_from_gateway
+
+        self._stop.set()
+        self._thread.join(timeout=self.interval)
+        try:
+            delete_from_gateway(self.gateway, job=PUSH_JOB, grouping_key=self.grouping_key, timeout=5)
+        except Exception as e:
+            print(f"Error deleting Pushgateway group: {e}")
+
+
+def write_network_log(interface, window, counters, summary, writer):
+    """
+    Write one interface window to the log file in JSON format
     """
-    if not stats:
-        return
-    
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-    
+
     log_entry = {
         "timestamp": timestamp,
-        "interface": "enp86s0",
-        "rx_bytes": stats['rx_bytes'],
-        "rx_packets": stats['rx_packets'],
-        "tx_bytes": stats['tx_bytes'],
-        "tx_packets": stats['tx_packets'],
-        "rx_bits": stats['rx_bits'],
-        "tx_bits": stats['tx_bits']
+        "interface": interface,
+        "window": format_window(window),
+        "rx_bytes": counters['rx_bytes'],
+        "rx_packets": counters['rx_packets'],
+        "tx_bytes": counters['tx_bytes'],
+        "tx_packets": counters['tx_packets'],
+        "rx_bits": counters['rx_bytes'] * 8,
+        "tx_bits": counters['tx_bytes'] * 8,
     }
-    
-    # Create log file if it doesn't exist
-    os.makedirs(os.path.dirname(log_file), exist_ok=True)
-    
+    log_entry.update(summary)
+
     try:
-        with open(log_file, 'a') as f:
-            f.write(json.dumps(log_entry) + '\n')
+        writer.write(json.dumps(log_entry))
     except Exception as e:
         print(f"Error writing to log file: {e}")
 
@@ -73,21 +512,64 @@ def main():
     Main monitoring loop
     """
     print("Starting network interface monitoring...")
-    print("Interface: enp86s0")
-    print("Log file: /home/rnd/telemetry/logs/network_stats.log")
+    print(f"Interfaces: {', '.join(INTERFACE_PATTERNS)} (excluding: {', '.join(EXCLUDE_PATTERNS) or 'none'})")
+    print(f"Sample interval: {SAMPLE_INTERVAL}s, windows: {', '.join(format_window(w) for w in WINDOWS)}")
+    print(f"Mode: {', '.join(sorted(MODES))}")
+    if 'log' in MODES:
+        print(f"Log file: {LOG_FILE}")
     print("Press Ctrl+C to stop")
-    
+
+    unknown = MODES - {'log', 'exporter', 'push'}
+    if unknown or not MODES:
+        print(f"Unknown NETWORK_MONITOR_MODE: {', '.join(sorted(unknown)) or '(empty)'}")
+        sys.exit(1)
+
+    # Exit through the finally block on SIGTERM (stop-network-monitor.sh) so buffered lines are written
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    reader = NetDevReader()
+    selector = InterfaceSelector()
+    collector = RateCollector()
+    writer = BufferedLogWriter(LOG_FILE) if 'log' in MODES else None
+    metrics = NetworkMetricsCollector() if MODES & {'exporter', 'push'} else None
+    pusher = None
+    if 'exporter' in MODES:
+        start_exporter(metrics)
+    if 'push' in MODES:
+        pusher = PushgatewayPusher(metrics)
+        pusher.start()
+    next_sample = time.monotonic()
     try:
         while True:
-            stats = get_network_stats()
-            if stats:
-                write_network_log(stats)
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] RX: {stats['rx_bits']:,} bits, TX: {stats['tx_bits']:,} bits")
-            
-            time.sleep(1)  # Collect every second
-            
+            stats = get_network_stats(reader, selector)
+            if metrics:
+                metrics.update(stats)
+            for interface, window, counters, summary in collector.update(stats, time.monotonic()):
+                if writer:
+                    write_network_log(interface, window, counters, summary, writer)
+                if metrics:
+                    metrics.record_window(interface, window, summary)
+                if window == WINDOWS[0]:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] {interface} "
+                          f"RX: {summary['rx_bps_avg']:,.0f} bps (max {summary['rx_bps_max']:,.0f}), "
+                          f"TX: {summary['tx_bps_avg']:,.0f} bps (max {summary['tx_bps_max']:,.0f})")
+
+            # Sample on a fixed monotonic schedule, without drifting by the time spent sampling
+            next_sample += SAMPLE_INTERVAL
+            delay = next_sample - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_sample = time.monotonic()
+
     except KeyboardInterrupt:
         print("\nMonitoring stopped.")
+    finally:
+        if pusher:
+            pusher.stop()
+        if writer:
+            writer.close()
+        reader.close()
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,7 @@
 #!/usr/bin/env python3
-import requests
 import time
-import json
-from datetime import datetime
+
+from loki_client import LokiClient, spill_dir
 
 def push_sdp_log_to_loki():
     """Push SDP error log directly to Loki server"""
@@ -12,43 +11,30 @@ def push_sdp_log_to_loki():
     current_time = int(time.time() * 1000000000)  # nanoseconds
     log_message = "SDP Error in SPEED_ROULETTE - Table: Speed Roulette - Error Code: SENSOR_STUCK - Error: SENSOR ERROR - Detected warning_flag=4 in *X;6 message"
     
-    # Prepare the payload
-    stream = {
-        "stream": {
-            "job": "sdp",
-            "instance": "GC-aro12-agent",
-            "service": "sdp_service",
-            "level": "ERROR",
-            "logger": "SDP",
-            "game_type": "SPEED_ROULETTE",
-            "table_name": "Speed Roulette",
-            "error_code": "SENSOR_STUCK"
-        },
-        "values": [
-            [str(current_time), log_message]
-        ]
+    labels = {
+        "job": "sdp",
+        "instance": "GC-aro12-agent",
+        "service": "sdp_service",
+        "level": "ERROR",
+        "logger": "SDP",
+        "game_type": "SPEED_ROULETTE",
+        "table_name": "Speed Roulette",
+        "error_code": "SENSOR_STUCK"
     }
     
-    payload = {"streams": [stream]}
+    # Failed pushes are kept on disk and replayed by the next run
+    client = LokiClient(loki_url, spill_dir=spill_dir("push_sdp_to_loki"))
+    client.push(log_message, labels, current_time)
+    result = client.close(drain_timeout=10)
     
-    try:
-        response = requests.post(
-            loki_url,
-            headers={"Content-Type": "application/json"},
-            json=payload,
-            timeout=10
-        )
-        
-        print(f"Response status: {response.status_code}")
-        print(f"Response text: {response.text}")
-        
-        if response.status_code == 204:
-            print("✅ Successfully pushed SDP log to Loki!")
-        else:
-            print("❌ Failed to push SDP log to Loki")
-            
-    except Exception as e:
-        print(f"❌ Error pushing SDP log: {e}")
+    # Judge this run's own batch; replays of earlier runs' backlog do not make it delivered
+    print(f"Response status: {result.status_code}")
+    if result.ok:
+        print("✅ Successfully pushed SDP log to Loki!")
+    elif result.spilled:
+        print(f"⚠️ Loki unavailable, SDP log saved to {client.spill.directory} for replay: {result.error}")
+    else:
+        print(f"❌ Failed to push SDP log to Loki: {result.error}")
 
 if __name__ == "__main__":
     push_sdp_log_to_loki()
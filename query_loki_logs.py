@@ -1,76 +1,118 @@
 #!/usr/bin/env python3
-import requests
+"""
+Query logs from the remote Loki server
+
+Summaries count entries server-side with a count_over_time query and fetch
+only a few sample lines; --output streams entries page by page through
+loki_query.LokiQueryClient, so a full day of logs can be exported without
+holding them in memory. Closed time buckets are cached under
+LOKI_QUERY_CACHE_DIR, so re-running an investigation only fetches new data.
+
+Usage:
+  python3 query_loki_logs.py                                   # summary of the default queries, last hour
+  python3 query_loki_logs.py -q '{job="sdp"}' --since 24 --output sdp.jsonl
+  python3 query_loki_logs.py -q '{job="sdp"}' --follow         # live tail
+"""
+
+import argparse
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
+
+from loki_query import DEFAULT_CACHE_DIR, LokiQueryClient, LokiQueryError
+
+LOKI_URL = "http://100.64.0.113:3100"
+
+DEFAULT_QUERIES = [
+    "{job=\"test_agent\"}",  # Our test logs
+    "{instance=\"GC-aro12-agent\"}",  # All logs from our agent
+    "{job=~\"mock_sicbo|server|tmux_client\"}",  # Specific jobs
+    "{level=\"INFO\"}",  # INFO level logs
+    "{level=\"ERROR\"}"  # ERROR level logs
+]
+# Entries fetched for the per-stream samples; totals come from count_over_time
+SAMPLE_LIMIT = 10
+
+def summarize_query(client, query, since):
+    """Count entries and streams server-side and show the first entry of up to 2 streams"""
+    counts = client.count_over_time(query, since=since)
+    total_entries = sum(counts.values())
+    if not total_entries:
+        print("❌ No logs found")
+        return
+
+    first_entries = {}
+    for entry in client.query_range(query, since=since, limit=SAMPLE_LIMIT):
+        key = tuple(sorted(entry.labels.items()))
+        if key not in first_entries:
+            first_entries[key] = entry
+            if len(first_entries) == 2:
+                break
+
+    print(f"✅ Found {len(counts)} stream(s)")
+    print(f"📊 Total log entries: {total_entries}")
+    for entry in first_entries.values():
+        readable_time = datetime.fromtimestamp(entry.timestamp / 1000000000)
+        print(f"   🏷️  Labels: {entry.labels}")
+        print(f"   ⏰ First: {readable_time} - {entry.line[:80]}...")
+
+def export_query(client, query, since, output):
+    """Write every entry of a query to a JSONL file, one entry per line"""
+    count = 0
+    with open(output, "w") as f:
+        for entry in client.query_range(query, since=since):
+            f.write(json.dumps({"timestamp": str(entry.timestamp), "labels": entry.labels, "line": entry.line}) + "\n")
+            count += 1
+    print(f"✅ Wrote {count} entries to {output}")
+
+def follow_query(client, query):
+    """Print entries of a query as they arrive"""
+    print("🛑 Press Ctrl+C to stop")
+    try:
+        for entry in client.tail(query):
+            readable_time = datetime.fromtimestamp(entry.timestamp / 1000000000)
+            print(f"{readable_time} {entry.labels} {entry.line}")
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped by user")
 
 def query_loki_logs():
     """Query logs from remote Loki server"""
-    loki_url = "http://100.64.0.113:3100/loki/api/v1/query_range"
-    
-    # Query parameters
-    end_time = int(time.time() * 1000000000)  # nanoseconds
-    start_time = end_time - (3600 * 1000000000)  # 1 hour ago
-    
-    queries = [
-        "{job=\"test_agent\"}",  # Our test logs
-        "{instance=\"GC-aro12-agent\"}",  # All logs from our agent
-        "{job=~\"mock_sicbo|server|tmux_client\"}",  # Specific jobs
-        "{level=\"INFO\"}",  # INFO level logs
-        "{level=\"ERROR\"}"  # ERROR level logs
-    ]
-    
+    parser = argparse.ArgumentParser(description="Query logs from the remote Loki server")
+    parser.add_argument("-q", "--query", action="append", help="LogQL query (repeatable; default: built-in queries)")
+    parser.add_argument("--since", type=float, default=1, help="Time range in hours (default: 1)")
+    parser.add_argument("--url", default=LOKI_URL, help=f"Loki base URL (default: {LOKI_URL})")
+    parser.add_argument("--output", help="Export the first query's entries to this JSONL file")
+    parser.add_argument("--follow", action="store_true", help="Live tail the first query")
+    parser.add_argument("--no-cache", action="store_true", help=f"Bypass the local query cache ({DEFAULT_CACHE_DIR})")
+    args = parser.parse_args()
+
+    client = LokiQueryClient(args.url, cache_dir=None if args.no_cache else DEFAULT_CACHE_DIR)
+    queries = args.query or DEFAULT_QUERIES
+    since = args.since * 3600
+
     print("🔍 Querying logs from Loki server...")
-    print(f"📡 Target: {loki_url}")
-    print(f"⏰ Time range: Last 1 hour")
+    print(f"📡 Target: {args.url}")
+    if args.follow:
+        follow_query(client, queries[0])
+        return
+    print(f"⏰ Time range: Last {args.since:g} hour(s)")
     print("-" * 50)
-    
+
+    if args.output:
+        try:
+            export_query(client, queries[0], since, args.output)
+        except LokiQueryError as e:
+            print(f"❌ {e}")
+        return
+
     for i, query in enumerate(queries, 1):
         print(f"\n📋 Query {i}: {query}")
-        
         try:
-            params = {
-                "query": query,
-                "start": str(start_time),
-                "end": str(end_time),
-                "limit": 10
-            }
-            
-            response = requests.get(loki_url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                if data.get("status") == "success":
-                    streams = data.get("data", {}).get("result", [])
-                    
-                    if streams:
-                        print(f"✅ Found {len(streams)} stream(s)")
-                        total_entries = sum(len(stream.get("values", [])) for stream in streams)
-                        print(f"📊 Total log entries: {total_entries}")
-                        
-                        # Show first few entries
-                        for stream in streams[:2]:  # Show first 2 streams
-                            labels = stream.get("stream", {})
-                            values = stream.get("values", [])
-                            
-                            print(f"   🏷️  Labels: {labels}")
-                            print(f"   📝 Entries: {len(values)}")
-                            
-                            # Show first entry
-                            if values:
-                                timestamp, message = values[0]
-                                readable_time = datetime.fromtimestamp(int(timestamp) / 1000000000)
-                                print(f"   ⏰ Latest: {readable_time} - {message[:80]}...")
-                    else:
-                        print("❌ No logs found")
-                else:
-                    print(f"❌ Query failed: {data}")
-            else:
-                print(f"❌ HTTP Error: {response.status_code}")
-                
-        except Exception as e:
-            print(f"❌ Error querying: {e}")
+            summarize_query(client, query, since)
+        except LokiQueryError as e:
+            print(f"❌ {e}")
+
+    if client.cache:
+        print(f"\n🗄️  Cache: {client.cache_hits} bucket hit(s), {client.cache_misses} miss(es)")
 
 if __name__ == "__main__":
-    import time
     query_loki_logs()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Generate telegraf/telegraf-zcam.conf from the ZCAM device inventory
+
+The hand-written config had one [[inputs.http_response]] block per camera
+endpoint (four per camera), each a separately scheduled plugin with its own
+HTTP client, all firing on the same tick. This generator builds the config
+from zabbix/zcam_devices.conf instead:
+
+  - one http_response input per camera with all of its endpoint URLs, so a
+    camera is polled by one client over one keep-alive connection
+  - the HTTP client settings (timeout, method, redirects) defined once here
+    and rendered identically into every input
+  - each camera gets its own slot of the interval: collection_offset starts
+    it at slot * index and collection_jitter spreads it inside the slot, so
+    cameras are not all hit in the same millisecond
+  - endpoint_type is derived from the URL by a regex processor, so the
+    series keep their device_name / agent_name / device_ip / endpoint_type tags
+
+scripts/zcam-values-exporter.py already exports the same http_response_*
+series; use the generated config only where Telegraf is preferred, not
+alongside the exporter.
+
+Usage:
+  python3 scripts/generate-telegraf-zcam.py            # rewrite telegraf/telegraf-zcam.conf
+  python3 scripts/generate-telegraf-zcam.py --check    # validate and diff, exit 1 when the file is stale
+  python3 scripts/generate-telegraf-zcam.py --stdout
+"""
+
+import argparse
+import difflib
+import ipaddress
+import json
+import os
+import re
+import sys
+import tomllib
+from typing import Dict, List, NamedTuple
+
+REPO_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+DEVICES_FILE = os.environ.get("ZCAM_DEVICES_FILE", os.path.join(REPO_DIR, "zabbix", "zcam_devices.conf"))
+OUTPUT_FILE = os.path.join(REPO_DIR, "telegraf", "telegraf-zcam.conf")
+
+INTERVAL_SECONDS = 30
+LISTEN = ":9273"
+
+# endpoint_type -> request path, in request order within a camera's input
+ENDPOINTS = {
+    "rtmp_status": "/ctrl/rtmp?action=query&index=0",
+    "battery": "/ctrl/get?k=battery",
+    "camera_mode": "/ctrl/mode",
+    "temperature": "/ctrl/temperature",
+}
+
+# Shared by every camera input
+HTTP_CLIENT = {
+    "response_timeout": "5s",
+    "method": "GET",
+    "follow_redirects": False,
+}
+
+HOSTNAME = re.compile(r"^[A-Za-z0-9]([A-Za-z0-9.-]*[A-Za-z0-9])?$")
+
+
+class Device(NamedTuple):
+    name: str
+    ip: str
+    agent: str
+
+
+def load_devices(path: str) -> List[Device]:
+    """DEVICE_NAME|IP_ADDRESS|AGENT_NAME|... lines of zcam_devices.conf"""
+    devices = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = [field.strip() for field in line.split("|")]
+            if len(fields) < 3 or not all(fields[:3]):
+                raise ValueError(f"{path}:{line_number}: expected DEVICE_NAME|IP_ADDRESS|AGENT_NAME|...")
+            devices.append(Device(*fields[:3]))
+    return devices
+
+
+def validate_devices(devices: List[Device]) -> List[str]:
+    """Inventory problems that would produce a broken or duplicated config"""
+    errors = []
+    if not devices:
+        errors.append("no devices in the inventory")
+    for field in ("name", "ip"):
+        seen: Dict[str, int] = {}
+        for device in devices:
+            value = getattr(device, field)
+            seen[value] = seen.get(value, 0) + 1
+        errors.extend(f"duplicate device {field}: {value}" for value, count in seen.items() if count > 1)
+    for device in devices:
+        try:
+            ipaddress.ip_address(device.ip)
+        except ValueError:
+            if not HOSTNAME.match(device.ip):
+                errors.append(f"{device.name}: invalid address {device.ip!r}")
+    return errors
+
+
+def duration(seconds: float) -> str:
+    return f"{round(seconds * 1000)}ms"
+
+
+def toml_value(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list):
+        return "[\n" + "".join(f"    {toml_value(item)},\n" for item in value) + "  ]"
+    return json.dumps(value)
+
+
+def render(devices: List[Device], source: str, interval: float = INTERVAL_SECONDS) -> str:
+    """The complete Telegraf config for the inventory"""
+    slot = interval / max(len(devices), 1)
+    lines = [
+        "# Telegraf Configuration for ZCAM API Monitoring",
+        f"# GENERATED by scripts/generate-telegraf-zcam.py from {source}; do not edit by hand.",
+        "# Regenerate after changing the inventory:  python3 scripts/generate-telegraf-zcam.py",
+        "#",
+        "# DEPRECATED: scripts/zcam-values-exporter.py now exports the same",
+        '# http_response_* series (job "zcam-values") from the requests it already makes.',
+        "# Do not run this alongside the exporter, or every camera is polled twice.",
+        "",
+        "[global_tags]",
+        '  environment = "production"',
+        '  service = "zcam-monitoring"',
+        "",
+        "[agent]",
+        f'  interval = "{interval:g}s"',
+        "  round_interval = true",
+        "  metric_batch_size = 1000",
+        "  metric_buffer_limit = 10000",
+        '  collection_jitter = "0s"',
+        '  flush_interval = "10s"',
+        '  flush_jitter = "0s"',
+        '  precision = ""',
+        '  hostname = ""',
+        "  omit_hostname = false",
+        "",
+        "# Output plugin - send metrics to Prometheus",
+        "[[outputs.prometheus_client]]",
+        f'  listen = "{LISTEN}"',
+        "  metric_version = 2",
+        "",
+        "# endpoint_type from the request URL (the server tag), as the per-endpoint blocks used to set it",
+        "[[processors.regex]]",
+        '  namepass = ["http_response"]',
+    ]
+    for endpoint_type, path in ENDPOINTS.items():
+        lines += [
+            "  [[processors.regex.tags]]",
+            '    key = "server"',
+            f"    pattern = '^https?://[^/]+{re.escape(path)}$'",
+            f'    replacement = "{endpoint_type}"',
+            '    result_key = "endpoint_type"',
+        ]
+
+    for index, device in enumerate(devices):
+        lines += [
+            "",
+            "[[inputs.http_response]]",
+            f"  # {device.name} ({device.agent}) - slot {index + 1}/{len(devices)} of the {interval:g}s interval",
+            f"  urls = {toml_value([f'http://{device.ip}{path}' for path in ENDPOINTS.values()])}",
+            *(f"  {name} = {toml_value(value)}" for name, value in HTTP_CLIENT.items()),
+            f'  collection_offset = "{duration(slot * index)}"',
+            f'  collection_jitter = "{duration(slot)}"',
+            "  [inputs.http_response.tags]",
+            f"    device_name = {toml_value(device.name)}",
+            f"    agent_name = {toml_value(device.agent)}",
+            f"    device_ip = {toml_value(device.ip)}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def validate_config(text: str, devices: List[Device]) -> List[str]:
+    """Parse the rendered TOML and check it has one input per device and every URL exactly once"""
+    try:
+        config = tomllib.loads(text)
+    except tomllib.TOMLDecodeError as e:
+        return [f"generated config is not valid TOML: {e}"]
+    errors = []
+    inputs = config.get("inputs", {}).get("http_response", [])
+    if len(inputs) != len(devices):
+        errors.append(f"{len(inputs)} http_response inputs for {len(devices)} devices")
+    urls = [url for block in inputs for url in block.get("urls", [])]
+    duplicates = sorted({url for url in urls if urls.count(url) > 1})
+    errors.extend(f"URL polled more than once: {url}" for url in duplicates)
+    for block in inputs:
+        missing = [tag for tag in ("device_name", "agent_name", "device_ip") if tag not in block.get("tags", {})]
+        if missing:
+            errors.append(f"input for {block.get('urls')} lacks tags {missing}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the ZCAM Telegraf config from zcam_devices.conf")
+    parser.add_argument("--devices", default=DEVICES_FILE, help="Device inventory (zcam_devices.conf)")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Config file to write or check")
+    parser.add_argument("--interval", type=float, default=INTERVAL_SECONDS,
+                        help=f"Collection interval in seconds (default: {INTERVAL_SECONDS})")
+    parser.add_argument("--check", action="store_true", help="Validate and diff against --output without writing")
+    parser.add_argument("--stdout", action="store_true", help="Print the config instead of writing it")
+    args = parser.parse_args()
+
+    devices = load_devices(args.devices)
+    source = os.path.relpath(args.devices, REPO_DIR) if os.path.abspath(args.devices).startswith(
+        os.path.abspath(REPO_DIR)) else args.devices
+    text = render(devices, source, args.interval)
+
+    errors = validate_devices(devices) + validate_config(text, devices)
+    if errors:
+        for error in errors:
+            print(f"❌ {error}", file=sys.stderr)
+        sys.exit(2)
+
+    if args.stdout:
+        sys.stdout.write(text)
+        return
+
+    try:
+        with open(args.output) as f:
+            current = f.read()
+    except FileNotFoundError:
+        current = ""
+
+    if args.check:
+        diff = list(difflib.unified_diff(current.splitlines(keepends=True), text.splitlines(keepends=True),
+                                         fromfile=args.output, tofile="generated"))
+        if diff:
+            sys.stdout.writelines(diff)
+            print(f"⚠️  {args.output} is out of date; run without --check to regenerate")
+            sys.exit(1)
+        print(f"✅ {args.output} matches {len(devices)} device(s) in {source}")
+        return
+
+    if current == text:
+        print(f"✅ {args.output} already up to date ({len(devices)} devices)")
+        return
+    tmp = f"{args.output}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, args.output)
+    print(f"✅ Wrote {args.output}: {len(devices)} device(s), {len(devices)} http_response input(s), "
+          f"{len(devices) * len(ENDPOINTS)} URL(s)")
+
+
+if __name__ == "__main__":
+    main()
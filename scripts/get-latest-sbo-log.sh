@@ -14,8 +14,16 @@ if [ ! -d "$LOG_DIR" ]; then
     exit 1
 fi
 
-# Find the latest SBO001_*.log file based on modification time
-LATEST_LOG=$(find "$LOG_DIR" -name "SBO001_*.log" -type f -printf "%T@ %p\n" 2>/dev/null | sort -n | tail -1 | cut -d' ' -f2-)
+# Find the latest SBO001_*.log file based on modification time. studio_log_index.py
+# answers from its index while the directory is unchanged; fall back to a find walk
+INDEX_TOOL="$(dirname "$0")/../studio_log_index.py"
+LATEST_LOG=""
+if command -v python3 >/dev/null 2>&1 && [ -f "$INDEX_TOOL" ]; then
+    LATEST_LOG=$(python3 "$INDEX_TOOL" latest "$LOG_DIR" 2>/dev/null)
+fi
+if [ -z "$LATEST_LOG" ]; then
+    LATEST_LOG=$(find "$LOG_DIR" -name "SBO001_*.log" -type f -printf "%T@ %p\n" 2>/dev/null | sort -n | tail -1 | cut -d' ' -f2-)
+fi
 
 if [ -z "$LATEST_LOG" ]; then
     echo "Error: No SBO001_*.log files found in $LOG_DIR"
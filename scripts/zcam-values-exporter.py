@@ -2,122 +2,713 @@
 """
 ZCAM Values Exporter
 Exports actual ZCAM device values (battery, camera mode, temperature) as Prometheus metrics
+
+All device/endpoint pairs are polled concurrently with asyncio, so a collection
+cycle takes about as long as the slowest single request instead of the sum of all.
+Endpoints are declared in ENDPOINT_REGISTRY; each one is requested once per
+interval and may feed several metrics from the same response. Every request also
+updates the http_response_* series that Telegraf's http_response checks used to
+export (same metric names, device_name/agent_name/device_ip/endpoint_type
+labels), so each camera is polled by this process only.
+
+Devices are loaded from ZCAM_DEVICES_FILE, either zabbix/zcam_devices.conf
+(DEVICE_NAME|IP_ADDRESS|...) or a Prometheus file_sd-style JSON list, and the
+file is re-read whenever it changes. Series of removed devices are dropped.
+
+Modes (ZCAM_EXPORTER_MODE):
+  poll   - refresh each endpoint on its own interval (default)
+  scrape - fetch values when /metrics is scraped, through a per-endpoint TTL cache
 """
 
+import asyncio
 import json
+import os
+import random
+import threading
 import time
-import requests
-from prometheus_client import start_http_server, Gauge, Counter
-from typing import Dict, Any
-
-# ZCAM device configuration
-ZCAM_DEVICES = {
-    "zcam-aro11": "192.168.88.10",
-    "zcam-aro12": "192.168.10.11", 
-    "zcam-aro21": "192.168.88.12",
-    "zcam-aro22": "192.168.10.13",
-    "zcam-asb11": "192.168.88.14",
-    "zcam-tpe": "192.168.20.8"
-}
+import aiohttp
+from prometheus_client import start_http_server, Gauge, Counter, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+from typing import Dict, Any, Callable, List, NamedTuple, Optional, Tuple
+
+# ZCAM device configuration: device name -> IP, loaded from DEVICES_FILE
+ZCAM_DEVICES: Dict[str, str] = {}
+# Device name -> agent it belongs to (AGENT_NAME column / agent_name label), "" when unknown
+DEVICE_AGENTS: Dict[str, str] = {}
+
+DEVICES_FILE = os.environ.get(
+    "ZCAM_DEVICES_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "zabbix", "zcam_devices.conf")
+)
+DEVICES_RELOAD_INTERVAL = float(os.environ.get("ZCAM_DEVICES_RELOAD_INTERVAL", "10"))
+
+# Polling configuration (overridable from the environment)
+POLL_INTERVAL = float(os.environ.get("ZCAM_POLL_INTERVAL", "30"))
+REQUEST_TIMEOUT = float(os.environ.get("ZCAM_REQUEST_TIMEOUT", "5"))
+MAX_CONCURRENCY = int(os.environ.get("ZCAM_MAX_CONCURRENCY", "32"))
+CONNECTIONS_PER_DEVICE = int(os.environ.get("ZCAM_CONNECTIONS_PER_DEVICE", "4"))
+
+# Collect-on-scrape configuration
+EXPORTER_MODE = os.environ.get("ZCAM_EXPORTER_MODE", "poll")
+STALE_TTL = float(os.environ.get("ZCAM_STALE_TTL", "300"))
+# Must stay below the Prometheus scrape_timeout for the zcam-values job (10s)
+SCRAPE_DEADLINE = float(os.environ.get("ZCAM_SCRAPE_DEADLINE", "6"))
+
+# Circuit breaker configuration: a device is skipped after BREAKER_THRESHOLD
+# consecutive connection failures and re-probed after an exponential backoff
+BREAKER_THRESHOLD = int(os.environ.get("ZCAM_BREAKER_THRESHOLD", "1"))
+BREAKER_BASE_BACKOFF = float(os.environ.get("ZCAM_BREAKER_BASE_BACKOFF", "60"))
+BREAKER_MAX_BACKOFF = float(os.environ.get("ZCAM_BREAKER_MAX_BACKOFF", "600"))
 
 # Prometheus metrics
 battery_level = Gauge('zcam_battery_level', 'ZCAM device battery level percentage', ['device_name', 'device_ip'])
 camera_mode = Gauge('zcam_camera_mode', 'ZCAM device camera mode (1=rec, 0=photo)', ['device_name', 'device_ip'])
 temperature = Gauge('zcam_temperature', 'ZCAM device temperature in Celsius', ['device_name', 'device_ip'])
 bitrate = Gauge('zcam_bitrate', 'ZCAM device RTMP stream bitrate in Mbps', ['device_name', 'device_ip'])
+rtmp_streaming = Gauge('zcam_rtmp_streaming', 'ZCAM device RTMP stream status (1=busy/streaming, 0=idle)', ['device_name', 'device_ip'])
 api_requests_total = Counter('zcam_api_requests_total', 'Total API requests made', ['device_name', 'endpoint', 'status'])
+api_request_duration = Histogram(
+    'zcam_api_request_duration_seconds', 'Latency of a single ZCAM API request',
+    ['device_name', 'endpoint'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+collection_cycle_duration = Histogram(
+    'zcam_collection_cycle_duration_seconds', 'Time taken to poll all ZCAM devices in one cycle',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30)
+)
+device_up = Gauge('zcam_device_up', 'Whether the ZCAM device answered its last request (1=up, 0=down)', ['device_name', 'device_ip'])
+breaker_state = Gauge('zcam_breaker_state', 'ZCAM device circuit breaker state (0=closed, 1=open, 2=half-open)', ['device_name', 'device_ip'])
+devices_configured = Gauge('zcam_devices_configured', 'Number of ZCAM devices loaded from the device file')
+device_reloads_total = Counter('zcam_device_reloads_total', 'Device file reloads', ['status'])
 
-def get_zcam_value(device_ip: str, endpoint: str) -> Dict[str, Any]:
-    """Get value from ZCAM device API"""
-    try:
-        if endpoint == "battery":
-            url = f"http://{device_ip}/ctrl/get?k=battery"
-        elif endpoint == "camera_mode":
-            url = f"http://{device_ip}/ctrl/mode"
-        elif endpoint == "temperature":
-            url = f"http://{device_ip}/ctrl/temperature"
-        elif endpoint == "bitrate":
-            url = f"http://{device_ip}/ctrl/rtmp?action=query&index=0"
-        else:
-            raise ValueError(f"Unknown endpoint: {endpoint}")
-        
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        # Parse response based on endpoint
-        if endpoint == "battery":
-            value = data.get("value", 0)
-        elif endpoint == "camera_mode":
-            mode = data.get("msg", "unknown")
-            value = 1 if mode == "rec" else 0
-        elif endpoint == "temperature":
-            value = float(data.get("msg", "0"))
-        elif endpoint == "bitrate":
-            value = float(data.get("bw", 0))  # bw is the bitrate field
-        
-        return {"success": True, "value": value, "raw_data": data}
-        
-    except Exception as e:
-        print(f"Error getting {endpoint} from {device_ip}: {e}")
-        return {"success": False, "value": None, "error": str(e)}
-
-def update_metrics():
-    """Update all Prometheus metrics with current ZCAM values"""
-    for device_name, device_ip in ZCAM_DEVICES.items():
-        # Battery level
-        result = get_zcam_value(device_ip, "battery")
-        if result["success"]:
-            battery_level.labels(device_name=device_name, device_ip=device_ip).set(result["value"])
-            api_requests_total.labels(device_name=device_name, endpoint="battery", status="success").inc()
-        else:
-            api_requests_total.labels(device_name=device_name, endpoint="battery", status="error").inc()
-        
-        # Camera mode
-        result = get_zcam_value(device_ip, "camera_mode")
-        if result["success"]:
-            camera_mode.labels(device_name=device_name, device_ip=device_ip).set(result["value"])
-            api_requests_total.labels(device_name=device_name, endpoint="camera_mode", status="success").inc()
+# Same metric names as Telegraf's http_response plugin, labelled with the device tags the Telegraf
+# config set. Telegraf's server/method/result/status_code tags are not exported: the codes are the
+# values of http_response_http_response_code and http_response_result_code.
+HTTP_LABELS = ['device_name', 'agent_name', 'device_ip', 'endpoint_type']
+http_response_time = Gauge('http_response_response_time', 'ZCAM API response time in seconds', HTTP_LABELS)
+http_response_code = Gauge('http_response_http_response_code', 'ZCAM API HTTP status code', HTTP_LABELS)
+http_result_code = Gauge(
+    'http_response_result_code',
+    'ZCAM API check result (0=success, 2=body_read_error, 3=connection_failed, 4=timeout)',
+    HTTP_LABELS
+)
+http_content_length = Gauge('http_response_content_length', 'ZCAM API response body length in bytes', HTTP_LABELS)
+
+RESULT_SUCCESS = 0
+RESULT_BODY_READ_ERROR = 2
+RESULT_CONNECTION_FAILED = 3
+RESULT_TIMEOUT = 4
+
+
+class ZcamEndpoint(NamedTuple):
+    """A ZCAM API endpoint and the metrics parsed from its response"""
+    name: str
+    path: str
+    interval: float
+    values: Dict[Gauge, Callable[[Dict[str, Any]], float]]
+
+
+# Endpoint registry: name -> endpoint definition
+ENDPOINT_REGISTRY: Dict[str, ZcamEndpoint] = {}
+
+
+def register_endpoint(name: str, path: str, values: Dict[Gauge, Callable[[Dict[str, Any]], float]],
+                      interval: Optional[float] = None):
+    """
+    Add an endpoint to the registry
+
+    Args:
+        name: Endpoint name, used as the endpoint/endpoint_type label
+        path: Request path on the device, including the query string
+        values: Gauge -> parser that extracts the gauge value from the JSON response
+        interval: Seconds between polls; ZCAM_INTERVAL_<NAME> overrides it
+    """
+    default = POLL_INTERVAL if interval is None else interval
+    interval = float(os.environ.get(f"ZCAM_INTERVAL_{name.upper()}", default))
+    ENDPOINT_REGISTRY[name] = ZcamEndpoint(name, path, interval, values)
+
+
+register_endpoint("battery", "/ctrl/get?k=battery", {
+    battery_level: lambda data: data.get("value", 0),
+}, interval=300)
+register_endpoint("camera_mode", "/ctrl/mode", {
+    camera_mode: lambda data: 1 if data.get("msg", "unknown") == "rec" else 0,
+})
+register_endpoint("temperature", "/ctrl/temperature", {
+    temperature: lambda data: float(data.get("msg", "0")),
+}, interval=10)
+# One RTMP query answers both the bitrate (bw) and stream status
+register_endpoint("rtmp_status", "/ctrl/rtmp?action=query&index=0", {
+    bitrate: lambda data: float(data.get("bw", 0)),
+    rtmp_streaming: lambda data: 1 if data.get("status") == "busy" else 0,
+})
+
+
+def value_gauges() -> List[Gauge]:
+    """All gauges fed by registered endpoints"""
+    gauges: List[Gauge] = []
+    for endpoint in ENDPOINT_REGISTRY.values():
+        gauges.extend(gauge for gauge in endpoint.values if gauge not in gauges)
+    return gauges
+
+
+# One keep-alive session per device, reused across cycles
+_sessions: Dict[str, aiohttp.ClientSession] = {}
+
+
+def is_current_device(device_name: str, device_ip: str) -> bool:
+    """Whether the device is still configured with this IP"""
+    return ZCAM_DEVICES.get(device_name) == device_ip
+
+
+def load_devices(path: str) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Load ZCAM devices from a device file
+
+    Two formats are supported:
+      zcam_devices.conf - DEVICE_NAME|IP_ADDRESS|AGENT_NAME|RTMP_SERVER|STREAM_KEY per line
+      *.json            - file_sd-style [{"targets": ["ip"], "labels": {"device_name": "...", "agent_name": "..."}}]
+
+    Returns:
+        tuple: (device name -> IP address, device name -> agent name)
+    """
+    devices: Dict[str, str] = {}
+    agents: Dict[str, str] = {}
+    with open(path) as f:
+        if path.endswith(".json"):
+            for group in json.load(f):
+                targets = group.get("targets", [])
+                name = group.get("labels", {}).get("device_name")
+                if name and len(targets) != 1:
+                    raise ValueError(f"device_name {name} must label exactly one target")
+                for target in targets:
+                    devices[name or target] = target
+                    agents[name or target] = group.get("labels", {}).get("agent_name", "")
         else:
-            api_requests_total.labels(device_name=device_name, endpoint="camera_mode", status="error").inc()
-        
-        # Temperature
-        result = get_zcam_value(device_ip, "temperature")
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                fields = [field.strip() for field in line.split("|")]
+                if len(fields) < 2 or not fields[0] or not fields[1]:
+                    raise ValueError(f"{path}:{line_number}: expected DEVICE_NAME|IP_ADDRESS|...")
+                devices[fields[0]] = fields[1]
+                agents[fields[0]] = fields[2] if len(fields) > 2 else ""
+    return devices, agents
+
+
+def remove_series(metric, *labelvalues: str):
+    """Remove one labelled child from a metric, if it exists"""
+    try:
+        metric.remove(*labelvalues)
+    except KeyError:
+        pass
+
+
+def drop_device_series(device_name: str, device_ip: str, agent_name: str, name_removed: bool):
+    """Drop all series of a removed (or re-addressed) device from the registry"""
+    for gauge in value_gauges() + [device_up, breaker_state]:
+        remove_series(gauge, device_name, device_ip)
+    for endpoint in ENDPOINT_REGISTRY:
+        for gauge in (http_response_time, http_response_code, http_result_code, http_content_length):
+            remove_series(gauge, device_name, agent_name, device_ip, endpoint)
+        if name_removed:
+            remove_series(api_request_duration, device_name, endpoint)
+            for status in ("success", "error", "skipped"):
+                remove_series(api_requests_total, device_name, endpoint, status)
+    _breakers.pop((device_name, device_ip), None)
+
+
+def apply_devices(devices: Dict[str, str], agents: Dict[str, str]) -> List[str]:
+    """
+    Replace the configured devices and drop series of removed ones
+
+    Returns:
+        list: names of devices that are no longer configured
+    """
+    changed = [(name, ip, DEVICE_AGENTS.get(name, "")) for name, ip in ZCAM_DEVICES.items()
+               if devices.get(name) != ip or agents.get(name, "") != DEVICE_AGENTS.get(name, "")]
+    added = [name for name, ip in devices.items()
+             if ZCAM_DEVICES.get(name) != ip or agents.get(name, "") != DEVICE_AGENTS.get(name, "")]
+    ZCAM_DEVICES.clear()
+    ZCAM_DEVICES.update(devices)
+    DEVICE_AGENTS.clear()
+    DEVICE_AGENTS.update(agents)
+    devices_configured.set(len(devices))
+
+    removed_names = []
+    for name, ip, agent in changed:
+        name_removed = name not in devices
+        drop_device_series(name, ip, agent, name_removed)
+        if name_removed:
+            removed_names.append(name)
+    if changed or added:
+        print(f"Devices updated: added/changed {added or '-'}, removed {removed_names or '-'}")
+    return removed_names
+
+
+class DeviceFileWatcher:
+    """Reloads ZCAM_DEVICES when the device file's inode, mtime or size changes"""
+
+    def __init__(self, path: str = DEVICES_FILE, interval: float = DEVICES_RELOAD_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._signature: Optional[Tuple[int, int, int]] = None
+
+    def check(self) -> List[str]:
+        """Reload the device file if it changed; returns names of removed devices"""
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            if self._signature != (0, 0, 0):
+                print(f"Device file unavailable, keeping {len(ZCAM_DEVICES)} devices: {e}")
+                self._signature = (0, 0, 0)
+            return []
+
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return []
+        self._signature = signature
+
+        try:
+            devices, agents = load_devices(self.path)
+        except (OSError, ValueError) as e:
+            print(f"Error loading devices from {self.path}, keeping previous list: {e}")
+            device_reloads_total.labels(status="error").inc()
+            return []
+        device_reloads_total.labels(status="success").inc()
+        return apply_devices(devices, agents)
+
+    async def watch(self):
+        """Poll the device file and close sessions of removed devices"""
+        while True:
+            await asyncio.sleep(self.interval)
+            for name in self.check():
+                session = _sessions.pop(name, None)
+                if session is not None:
+                    await session.close()
+
+
+class DeviceBreaker:
+    """Closed/open/half-open health state machine for one ZCAM device"""
+
+    CLOSED = 0
+    OPEN = 1
+    HALF_OPEN = 2
+    STATE_NAMES = {CLOSED: "closed", OPEN: "open", HALF_OPEN: "half-open"}
+
+    def __init__(self, device_name: str, device_ip: str, threshold: int = BREAKER_THRESHOLD,
+                 base_backoff: float = BREAKER_BASE_BACKOFF, max_backoff: float = BREAKER_MAX_BACKOFF):
+        self.device_name = device_name
+        self.device_ip = device_ip
+        self.threshold = threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state = self.CLOSED
+        self.failures = 0
+        self.backoff = base_backoff
+        self.open_until = 0.0
+        self._export(breaker_state, self.state)
+
+    def allow_request(self) -> bool:
+        """Whether a request may be sent; an expired open breaker admits a single probe"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() >= self.open_until:
+            self._set_state(self.HALF_OPEN)
+            return True
+        return False
+
+    def record_result(self, result: Dict[str, Any]):
+        """Update the breaker from a get_zcam_value() result"""
+        if result.get("skipped"):
+            return
+        if not result.get("device_down"):
+            # Any HTTP answer, even an error status, means the device is reachable
+            self._export(device_up, 1)
+            self.failures = 0
+            self.backoff = self.base_backoff
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED)
+            return
+
+        self._export(device_up, 0)
+        if self.state == self.HALF_OPEN:
+            self.backoff = min(self.backoff * 2, self.max_backoff)
+            self._trip()
+        elif self.state == self.CLOSED:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self._trip()
+
+    def _trip(self):
+        # Jitter keeps probes for devices that failed together from lining up
+        self.open_until = time.monotonic() + self.backoff * random.uniform(0.8, 1.2)
+        self._set_state(self.OPEN)
+
+    def _set_state(self, state: int):
+        print(f"Breaker for {self.device_name} ({self.device_ip}): "
+              f"{self.STATE_NAMES[self.state]} -> {self.STATE_NAMES[state]}"
+              + (f", next probe in {self.backoff:.0f}s" if state == self.OPEN else ""))
+        self.state = state
+        self._export(breaker_state, state)
+
+    def _export(self, gauge: Gauge, value: float):
+        # Requests still in flight when the device was removed must not recreate its series
+        if is_current_device(self.device_name, self.device_ip):
+            gauge.labels(device_name=self.device_name, device_ip=self.device_ip).set(value)
+
+
+_breakers: Dict[Tuple[str, str], DeviceBreaker] = {}
+
+
+def get_breaker(device_name: str, device_ip: str) -> DeviceBreaker:
+    """Return the circuit breaker for a device, creating it on first use"""
+    breaker = _breakers.get((device_name, device_ip))
+    if breaker is None:
+        breaker = DeviceBreaker(device_name, device_ip)
+        _breakers[(device_name, device_ip)] = breaker
+    return breaker
+
+
+def get_session(device_name: str) -> aiohttp.ClientSession:
+    """Return the keep-alive session for a device, creating it on first use"""
+    session = _sessions.get(device_name)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=CONNECTIONS_PER_DEVICE, keepalive_timeout=POLL_INTERVAL * 2)
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        )
+        _sessions[device_name] = session
+    return session
+
+
+async def close_sessions():
+    """Close all device sessions"""
+    for session in _sessions.values():
+        await session.close()
+    _sessions.clear()
+
+
+def record_http_check(device_name: str, device_ip: str, endpoint: str, elapsed: float, result_code: int,
+                      status: Optional[int] = None, content_length: Optional[int] = None):
+    """Export the http_response_* series for one request"""
+    if not is_current_device(device_name, device_ip):
+        return
+    labels = {"device_name": device_name, "agent_name": DEVICE_AGENTS.get(device_name, ""),
+              "device_ip": device_ip, "endpoint_type": endpoint}
+    http_response_time.labels(**labels).set(elapsed)
+    http_result_code.labels(**labels).set(result_code)
+    if status is not None:
+        http_response_code.labels(**labels).set(status)
+    if content_length is not None:
+        http_content_length.labels(**labels).set(content_length)
+
+
+async def get_zcam_value(session: aiohttp.ClientSession, device_name: str, device_ip: str,
+                         endpoint: ZcamEndpoint, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    """Get the values of one registered endpoint from a ZCAM device"""
+    async with semaphore:
+        start = time.monotonic()
+        status = None
+        content_length = None
+        try:
+            async with session.get(f"http://{device_ip}{endpoint.path}") as response:
+                status = response.status
+                body = await response.read()
+                content_length = len(body)
+                response.raise_for_status()
+                # ZCAM firmware does not always send application/json
+                data = await response.json(content_type=None)
+
+            values = {gauge: parse(data) for gauge, parse in endpoint.values.items()}
+            record_http_check(device_name, device_ip, endpoint.name, time.monotonic() - start,
+                              RESULT_SUCCESS, status, content_length)
+            api_requests_total.labels(device_name=device_name, endpoint=endpoint.name, status="success").inc()
+            return {"success": True, "values": values, "raw_data": data}
+
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            result_code = RESULT_TIMEOUT if isinstance(e, asyncio.TimeoutError) else RESULT_CONNECTION_FAILED
+            record_http_check(device_name, device_ip, endpoint.name, time.monotonic() - start, result_code)
+            print(f"Error getting {endpoint.name} from {device_ip}: {e!r}")
+            api_requests_total.labels(device_name=device_name, endpoint=endpoint.name, status="error").inc()
+            return {"success": False, "values": None, "error": str(e), "device_down": True}
+        except Exception as e:
+            record_http_check(device_name, device_ip, endpoint.name, time.monotonic() - start,
+                              RESULT_BODY_READ_ERROR, status, content_length)
+            print(f"Error getting {endpoint.name} from {device_ip}: {e!r}")
+            api_requests_total.labels(device_name=device_name, endpoint=endpoint.name, status="error").inc()
+            return {"success": False, "values": None, "error": str(e)}
+        finally:
+            api_request_duration.labels(device_name=device_name, endpoint=endpoint.name).observe(time.monotonic() - start)
+
+
+def skipped_result(device_name: str, endpoint: ZcamEndpoint) -> Dict[str, Any]:
+    """Result for an endpoint that was not requested because its device's breaker is open"""
+    api_requests_total.labels(device_name=device_name, endpoint=endpoint.name, status="skipped").inc()
+    return {"success": False, "values": None, "skipped": True}
+
+
+async def poll_device(device_name: str, device_ip: str, endpoints: List[ZcamEndpoint],
+                      semaphore: asyncio.Semaphore) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch endpoints of one device concurrently, honouring its circuit breaker
+
+    A half-open device is probed with a single endpoint first, and the first
+    connection failure cancels the device's other in-flight requests.
+    """
+    breaker = get_breaker(device_name, device_ip)
+    if not breaker.allow_request():
+        return {endpoint.name: skipped_result(device_name, endpoint) for endpoint in endpoints}
+
+    session = get_session(device_name)
+    results: Dict[str, Dict[str, Any]] = {}
+    remaining = list(endpoints)
+
+    if breaker.state == DeviceBreaker.HALF_OPEN and remaining:
+        probe = remaining.pop(0)
+        results[probe.name] = await get_zcam_value(session, device_name, device_ip, probe, semaphore)
+        breaker.record_result(results[probe.name])
+        if results[probe.name].get("device_down"):
+            results.update({endpoint.name: skipped_result(device_name, endpoint) for endpoint in remaining})
+            return results
+
+    tasks = {
+        asyncio.ensure_future(get_zcam_value(session, device_name, device_ip, endpoint, semaphore)): endpoint
+        for endpoint in remaining
+    }
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            results[tasks[task].name] = task.result()
+            breaker.record_result(task.result())
+        if pending and breaker.state == DeviceBreaker.OPEN:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            results.update({tasks[task].name: skipped_result(device_name, tasks[task]) for task in pending})
+            pending = set()
+    return results
+
+
+def record_result(device_name: str, device_ip: str, result: Dict[str, Any]):
+    """Apply a polling result to the Prometheus metrics"""
+    if result["success"] and is_current_device(device_name, device_ip):
+        for gauge, value in result["values"].items():
+            gauge.labels(device_name=device_name, device_ip=device_ip).set(value)
+
+
+async def update_metrics(semaphore: asyncio.Semaphore, due: Optional[Dict[str, List[ZcamEndpoint]]] = None):
+    """
+    Update Prometheus metrics with current ZCAM values
+
+    Args:
+        semaphore: Bounds the number of concurrent requests
+        due: device name -> endpoints to poll; all registered endpoints of every device if omitted
+    """
+    if due is None:
+        due = {device_name: list(ENDPOINT_REGISTRY.values()) for device_name in ZCAM_DEVICES}
+    devices = [(device_name, ZCAM_DEVICES[device_name]) for device_name, endpoints in due.items() if endpoints]
+    with collection_cycle_duration.time():
+        device_results = await asyncio.gather(*(
+            poll_device(device_name, device_ip, due[device_name], semaphore)
+            for device_name, device_ip in devices
+        ))
+    for (device_name, device_ip), results in zip(devices, device_results):
+        for result in results.values():
+            record_result(device_name, device_ip, result)
+
+
+async def run():
+    """Poll every device endpoint on its own interval"""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    next_due: Dict[Tuple[str, str], float] = {}
+    watcher = asyncio.ensure_future(DeviceFileWatcher().watch())
+    try:
+        while True:
+            now = time.monotonic()
+            # Forget schedules of devices removed by a reload
+            next_due = {key: due_at for key, due_at in next_due.items() if key[0] in ZCAM_DEVICES}
+            due: Dict[str, List[ZcamEndpoint]] = {}
+            for device_name in ZCAM_DEVICES:
+                for endpoint in ENDPOINT_REGISTRY.values():
+                    if next_due.get((device_name, endpoint.name), 0.0) <= now:
+                        due.setdefault(device_name, []).append(endpoint)
+                        next_due[(device_name, endpoint.name)] = now + endpoint.interval
+            try:
+                if due:
+                    print(f"Updating metrics at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+                    await update_metrics(semaphore, due)
+            except Exception as e:
+                print(f"Error in main loop: {e}")
+            await asyncio.sleep(max(0.0, min(next_due.values(), default=now + POLL_INTERVAL) - time.monotonic()))
+    finally:
+        watcher.cancel()
+        await close_sessions()
+
+
+class ScrapeCache:
+    """
+    Per-endpoint TTL cache used in scrape mode
+
+    Each entry lives for its endpoint's interval. Concurrent lookups of the same
+    key share a single in-flight fetch, so an HA Prometheus pair scraping at the
+    same time costs one request per endpoint. Entries younger than the stale TTL
+    are served when a refresh fails or misses the scrape deadline.
+    """
+
+    def __init__(self, semaphore: asyncio.Semaphore, stale_ttl: float = STALE_TTL):
+        self.semaphore = semaphore
+        self.stale_ttl = stale_ttl
+        # (device_name, device_ip, endpoint) -> (values, fetched_at)
+        self._entries: Dict[Tuple[str, str, str], Tuple[Dict[Gauge, float], float]] = {}
+        self._inflight: Dict[Tuple[str, str, str], asyncio.Task] = {}
+
+    async def _fetch(self, key: Tuple[str, str, str]) -> Dict[str, Any]:
+        device_name, device_ip, endpoint_name = key
+        endpoint = ENDPOINT_REGISTRY[endpoint_name]
+        breaker = get_breaker(device_name, device_ip)
+        if not breaker.allow_request():
+            # Serve the stale entry instead of waiting out a dead device's timeout
+            return skipped_result(device_name, endpoint)
+        result = await get_zcam_value(get_session(device_name), device_name, device_ip, endpoint, self.semaphore)
+        breaker.record_result(result)
         if result["success"]:
-            temperature.labels(device_name=device_name, device_ip=device_ip).set(result["value"])
-            api_requests_total.labels(device_name=device_name, endpoint="temperature", status="success").inc()
-        else:
-            api_requests_total.labels(device_name=device_name, endpoint="temperature", status="error").inc()
-        
-        # Bitrate
-        result = get_zcam_value(device_ip, "bitrate")
+            self._entries[key] = (result["values"], time.monotonic())
+        return result
+
+    def _start_fetch(self, key: Tuple[str, str, str]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def get(self, device_name: str, device_ip: str, endpoint: ZcamEndpoint,
+                  deadline: float) -> Optional[Tuple[Dict[Gauge, float], float, bool]]:
+        """Return (values, age_seconds, stale) for an endpoint, or None if nothing usable is cached"""
+        key = (device_name, device_ip, endpoint.name)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] < endpoint.interval:
+            return entry[0], time.monotonic() - entry[1], False
+
+        task = self._start_fetch(key)
+        try:
+            # shield() keeps the shared fetch alive for other waiters and the cache
+            result = await asyncio.wait_for(asyncio.shield(task), timeout=deadline)
+        except asyncio.TimeoutError:
+            result = {"success": False}
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        age = time.monotonic() - entry[1]
         if result["success"]:
-            bitrate.labels(device_name=device_name, device_ip=device_ip).set(result["value"])
-            api_requests_total.labels(device_name=device_name, endpoint="bitrate", status="success").inc()
-        else:
-            api_requests_total.labels(device_name=device_name, endpoint="bitrate", status="error").inc()
+            return entry[0], age, False
+        if age < self.stale_ttl:
+            return entry[0], age, True
+        return None
+
+    async def collect_all(self, deadline: float) -> Dict[Tuple[str, str, str], Optional[Tuple[Dict[Gauge, float], float, bool]]]:
+        """Look up every device/endpoint pair concurrently"""
+        for key in [key for key in self._entries if not is_current_device(key[0], key[1])]:
+            del self._entries[key]
+        keys = [
+            (device_name, device_ip, endpoint)
+            for device_name, device_ip in ZCAM_DEVICES.items()
+            for endpoint in ENDPOINT_REGISTRY.values()
+        ]
+        with collection_cycle_duration.time():
+            values = await asyncio.gather(*(self.get(*key, deadline=deadline) for key in keys))
+        return {(device_name, device_ip, endpoint.name): value
+                for (device_name, device_ip, endpoint), value in zip(keys, values)}
+
+
+class ZcamScrapeCollector:
+    """prometheus_client collector that reads ZCAM values when /metrics is scraped"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, cache: ScrapeCache, deadline: float = SCRAPE_DEADLINE):
+        self.loop = loop
+        self.cache = cache
+        self.deadline = deadline
+
+    def describe(self):
+        # Avoid a device fetch when the collector is registered
+        return []
+
+    def collect(self):
+        future = asyncio.run_coroutine_threadsafe(self.cache.collect_all(self.deadline), self.loop)
+        try:
+            values = future.result(timeout=self.deadline + 1)
+        except Exception as e:
+            print(f"Error collecting ZCAM values on scrape: {e!r}")
+            values = {}
+
+        families = {}
+        for gauge in value_gauges():
+            desc = gauge.describe()[0]
+            families[gauge] = GaugeMetricFamily(desc.name, desc.documentation, labels=['device_name', 'device_ip'])
+        stale = GaugeMetricFamily('zcam_value_stale', 'Whether the value was served from the stale cache (1=stale)',
+                                  labels=['device_name', 'device_ip', 'endpoint'])
+        age = GaugeMetricFamily('zcam_value_age_seconds', 'Age of the served ZCAM value in seconds',
+                                labels=['device_name', 'device_ip', 'endpoint'])
+
+        for (device_name, device_ip, endpoint), cached in values.items():
+            if cached is None:
+                continue
+            endpoint_values, value_age, is_stale = cached
+            for gauge, value in endpoint_values.items():
+                families[gauge].add_metric([device_name, device_ip], value)
+            stale.add_metric([device_name, device_ip, endpoint], 1 if is_stale else 0)
+            age.add_metric([device_name, device_ip, endpoint], value_age)
+
+        yield from families.values()
+        yield stale
+        yield age
+
+
+def start_scrape_mode():
+    """Serve ZCAM values fetched on demand from an event loop running in a background thread"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="zcam-scrape-loop", daemon=True).start()
+
+    # The scrape collector exposes the value gauges itself
+    for gauge in value_gauges():
+        REGISTRY.unregister(gauge)
+
+    REGISTRY.register(ZcamScrapeCollector(loop, ScrapeCache(asyncio.Semaphore(MAX_CONCURRENCY))))
+    asyncio.run_coroutine_threadsafe(DeviceFileWatcher().watch(), loop)
+    return loop
+
 
 def main():
     """Main function"""
-    print("Starting ZCAM Values Exporter...")
-    
+    print(f"Starting ZCAM Values Exporter ({EXPORTER_MODE} mode)...")
+    DeviceFileWatcher().check()
+    print(f"Loaded {len(ZCAM_DEVICES)} devices from {DEVICES_FILE}")
+    for endpoint in ENDPOINT_REGISTRY.values():
+        print(f"  {endpoint.name}: {endpoint.path} every {endpoint.interval:g}s")
+
+    if EXPORTER_MODE == "scrape":
+        loop = start_scrape_mode()
+
     # Start Prometheus metrics server
     start_http_server(9274)
     print("Metrics server started on port 9274")
-    
-    # Update metrics every 30 seconds
-    while True:
-        try:
-            print(f"Updating metrics at {time.strftime('%Y-%m-%d %H:%M:%S')}")
-            update_metrics()
-            time.sleep(30)
-        except KeyboardInterrupt:
-            print("Shutting down...")
-            break
-        except Exception as e:
-            print(f"Error in main loop: {e}")
-            time.sleep(30)
+
+    try:
+        if EXPORTER_MODE == "scrape":
+            while True:
+                time.sleep(3600)
+        else:
+            asyncio.run(run())
+    except KeyboardInterrupt:
+        print("Shutting down...")
+        if EXPORTER_MODE == "scrape":
+            asyncio.run_coroutine_threadsafe(close_sessions(), loop).result(timeout=5)
 
 if __name__ == "__main__":
     main()
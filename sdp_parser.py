@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+SDP error log parser
+
+Recognizes both SDP error formats in one pass over the log text:
+
+  Block format (generate_sdp_logs.py):
+    :rotating_light: SDP Error in SPEED_ROULETTE
+    Table: Speed Roulette
+    Error Code: SENSOR_STUCK
+    Error: SENSOR ERROR - Detected warning_flag=4 in *X;6 message
+    Time: 2025-09-12 08:43:13
+
+  Single-line format (simple_sdp_log.py):
+    2025-09-12 08:43:13 - SDP - ERROR - SPEED_ROULETTE - Speed Roulette - SENSOR_STUCK - SENSOR ERROR - ...
+
+Text is read in large chunks and scanned with str.find for "SDP"; the
+precompiled pattern for the matching format runs only at those hits, so
+unrelated lines are skipped at C speed instead of being looped over in
+Python or scanned with a DOTALL regex.
+
+Usage:
+  python3 sdp_parser.py sdp.log              # summary by game type and error code
+  python3 sdp_parser.py sdp.log --json       # one JSON record per line
+"""
+
+import argparse
+import json
+import re
+import sys
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+BLOCK_HEADER = ":rotating_light: SDP Error in "
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+CHUNK_SIZE = 4 * 1024 * 1024
+# Lines kept back at a chunk boundary so a block is never split (a block spans 5 lines)
+BLOCK_LINES = 5
+
+BLOCK_PATTERN = re.compile(
+    r':rotating_light: SDP Error in (?P<game_type>\w+)[ \t]*\r?\n'
+    r'Table: (?P<table_name>[^\r\n]*?)[ \t]*\r?\n'
+    r'Error Code: (?P<error_code>\w+)[ \t]*\r?\n'
+    r'(?:Error: (?P<error_message>[^\r\n]*?)[ \t]*\r?\n)?'
+    r'Time: (?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})'
+)
+SINGLE_LINE_PATTERN = re.compile(
+    r'(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) - SDP - (?P<level>\w+) - (?P<game_type>\w+)'
+    r' - (?P<table_name>[^\r\n]+?) - (?P<error_code>[A-Z0-9_]+) - (?P<error_message>[^\r\n]*)'
+)
+# Offset from "SDP" back to the timestamp in "<timestamp> - SDP - "
+SINGLE_LINE_OFFSET = len("2025-01-01 00:00:00 - ")
+
+
+class SdpRecord(NamedTuple):
+    """One parsed SDP error"""
+    game_type: str
+    table_name: str
+    error_code: str
+    error_message: str
+    timestamp: str
+    level: str
+    format: str
+    line_number: int
+
+    def time(self) -> datetime:
+        """The timestamp as a naive datetime"""
+        return datetime.strptime(self.timestamp, TIME_FORMAT)
+
+
+def parse_chunks(chunks: Iterable[str]) -> Iterator[SdpRecord]:
+    """
+    Yield SDP records from consecutive pieces of log text
+
+    Each piece is scanned with str.find for "SDP", which both formats
+    contain, and the compiled pattern for the format is matched only at
+    those hits. The last few lines of a piece are carried into the next one
+    so records spanning a boundary are parsed whole.
+    """
+    carry = ""
+    line_number = 1
+    chunks = iter(chunks)
+    final = False
+    while not final:
+        chunk = next(chunks, None)
+        if chunk is None:
+            final = True
+            text = carry
+        else:
+            text = carry + chunk
+
+        # Only start records before `limit`; everything from there on is carried over
+        limit = len(text)
+        if not final:
+            for _ in range(BLOCK_LINES):
+                limit = text.rfind("\n", 0, limit)
+                if limit < 0:
+                    break
+            if limit < 0:
+                carry = text
+                continue
+            limit += 1
+
+        counted = 0
+        pos = 0
+        find = text.find
+        while True:
+            hit = find("SDP", pos, limit)
+            if hit < 0:
+                break
+            line_start = text.rfind("\n", 0, hit) + 1
+            match = None
+            if text.startswith(BLOCK_HEADER, line_start):
+                match = BLOCK_PATTERN.match(text, line_start)
+                if match:
+                    line_number += text.count("\n", counted, line_start)
+                    counted = line_start
+                    yield SdpRecord(match["game_type"], match["table_name"], match["error_code"],
+                                    match["error_message"] or "", match["timestamp"], "ERROR", "block",
+                                    line_number)
+            elif hit - SINGLE_LINE_OFFSET >= line_start:
+                match = SINGLE_LINE_PATTERN.match(text, hit - SINGLE_LINE_OFFSET)
+                if match:
+                    line_number += text.count("\n", counted, line_start)
+                    counted = line_start
+                    yield SdpRecord(match["game_type"], match["table_name"], match["error_code"],
+                                    match["error_message"], match["timestamp"], match["level"], "line",
+                                    line_number)
+            pos = match.end() if match else hit + 3
+
+        line_number += text.count("\n", counted, limit)
+        carry = text[limit:]
+
+
+def parse_lines(lines: Iterable[str], batch: int = 10000) -> Iterator[SdpRecord]:
+    """Yield SDP records from a stream of log lines (with or without line endings)"""
+    def chunks():
+        buffer = []
+        for line in lines:
+            buffer.append(line if line.endswith("\n") else line + "\n")
+            if len(buffer) >= batch:
+                yield "".join(buffer)
+                buffer = []
+        if buffer:
+            yield "".join(buffer)
+    return parse_chunks(chunks())
+
+
+def parse_file(path: str, encoding: str = "utf-8") -> Iterator[SdpRecord]:
+    """Yield SDP records from a log file, reading it in CHUNK_SIZE pieces"""
+    with open(path, encoding=encoding, errors="replace") as f:
+        yield from parse_chunks(iter(lambda: f.read(CHUNK_SIZE), ""))
+
+
+def parse_text(text: str) -> Iterator[SdpRecord]:
+    """Yield SDP records from a string"""
+    return parse_chunks([text])
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Parse SDP error logs (block and single-line formats)")
+    parser.add_argument("files", nargs="+", help="Log files to parse ('-' for stdin)")
+    parser.add_argument("--json", action="store_true", help="Print each record as JSON")
+    args = parser.parse_args(argv)
+
+    counts = Counter()
+    total = 0
+    for path in args.files:
+        records = parse_chunks(iter(lambda: sys.stdin.read(CHUNK_SIZE), "")) if path == "-" else parse_file(path)
+        for record in records:
+            total += 1
+            if args.json:
+                print(json.dumps(record._asdict()))
+            else:
+                counts[(record.game_type, record.error_code)] += 1
+
+    if not args.json:
+        print(f"📊 {total} SDP error(s)")
+        for (game_type, error_code), count in counts.most_common():
+            print(f"   {game_type:<16} {error_code:<20} {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for sdp_parser
+Generates a corpus mixing both SDP formats with unrelated log noise, then
+times sdp_parser.parse_file over it and reports lines/s and MB/s. With
+--compare-regex it also times the original multi-line DOTALL pattern from
+test_sdp_regex.py applied per block.
+
+Usage:
+  python3 sdp_parser_benchmark.py --size-mb 2048                 # multi-GB corpus in /tmp
+  python3 sdp_parser_benchmark.py --corpus sdp_corpus.log --keep --compare-regex
+"""
+
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from generate_sdp_logs import generate_sdp_error_log
+from sdp_parser import parse_file
+
+LEGACY_PATTERN = re.compile(
+    r'^:rotating_light: SDP Error in (?P<game_type>\w+)\s*Table: (?P<table_name>.*?)\s*Error Code: (?P<error_code>\w+)'
+    r'\s*Error: (?P<error_message>.*?)\s*Time: (?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})',
+    re.MULTILINE | re.DOTALL
+)
+
+NOISE_LINES = [
+    "{time} - GameServer - INFO - Round {n} started on table ARO-001",
+    "{time} - GameServer - DEBUG - Received *X;{n} message from sensor",
+    "{time} - WebSocket - INFO - Client connected from 10.0.0.{n}",
+    "{time} - GameServer - WARNING - Result delayed by {n}ms",
+]
+
+
+def build_chunk(entries: int, sdp_ratio: float, seed: int) -> str:
+    """Build a block of log text with roughly `sdp_ratio` of entries being SDP errors"""
+    rng = random.Random(seed)
+    start = datetime(2025, 9, 12, 8, 0, 0)
+    lines = []
+    for i in range(entries):
+        now = (start + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S")
+        roll = rng.random()
+        if roll < sdp_ratio / 2:
+            block = generate_sdp_error_log(rng)
+            lines.append(re.sub(r"Time: .*", f"Time: {now}", block))
+            lines.append("")
+        elif roll < sdp_ratio:
+            lines.append(f"{now} - SDP - ERROR - SPEED_ROULETTE - Speed Roulette - SENSOR_STUCK - "
+                         f"SENSOR ERROR - Detected warning_flag={rng.randint(1, 8)} in *X;{rng.randint(1, 10)} message")
+        else:
+            lines.append(rng.choice(NOISE_LINES).format(time=now, n=rng.randint(1, 999)))
+    return "\n".join(lines) + "\n"
+
+
+def generate_corpus(path: str, size_mb: float, sdp_ratio: float):
+    """Write ~size_mb of log text by repeating a set of pre-built chunks"""
+    chunks = [build_chunk(5000, sdp_ratio, seed) for seed in range(8)]
+    target = int(size_mb * 1024 * 1024)
+    written = 0
+    with open(path, "w", buffering=4 * 1024 * 1024) as f:
+        i = 0
+        while written < target:
+            chunk = chunks[i % len(chunks)]
+            f.write(chunk)
+            written += len(chunk.encode())
+            i += 1
+
+
+def count_lines(path: str) -> int:
+    lines = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(4 * 1024 * 1024), b""):
+            lines += block.count(b"\n")
+    return lines
+
+
+def run_parser(path: str) -> int:
+    return sum(1 for _ in parse_file(path))
+
+
+def run_legacy(path: str) -> int:
+    """Blank-line separated blocks searched with the original DOTALL pattern (block format only)"""
+    records = 0
+    block = []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line.strip():
+                block.append(line)
+                continue
+            if block:
+                records += sum(1 for _ in LEGACY_PATTERN.finditer("".join(block)))
+                block = []
+    if block:
+        records += sum(1 for _ in LEGACY_PATTERN.finditer("".join(block)))
+    return records
+
+
+def report(name: str, records: int, elapsed: float, lines: int, size: int):
+    print(f"{name:<10} {records:>12,} records  {elapsed:8.2f}s  "
+          f"{lines / elapsed:>14,.0f} lines/s  {size / elapsed / 1024 / 1024:8.1f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SDP log parser")
+    parser.add_argument("--size-mb", type=float, default=256, help="Corpus size to generate in MB (default: 256)")
+    parser.add_argument("--corpus", help="Corpus path (default: a temporary file); reused if it exists")
+    parser.add_argument("--sdp-ratio", type=float, default=0.2, help="Fraction of entries that are SDP errors")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated corpus")
+    parser.add_argument("--compare-regex", action="store_true", help="Also time the legacy DOTALL regex")
+    args = parser.parse_args()
+
+    path = args.corpus or os.path.join(tempfile.gettempdir(), f"sdp_corpus_{os.getpid()}.log")
+    generated = not os.path.exists(path)
+    if generated:
+        print(f"📝 Generating {args.size_mb:g} MB corpus at {path}...")
+        started = time.perf_counter()
+        generate_corpus(path, args.size_mb, args.sdp_ratio)
+        print(f"   done in {time.perf_counter() - started:.1f}s")
+
+    try:
+        size = os.path.getsize(path)
+        lines = count_lines(path)
+        print(f"📊 Corpus: {size / 1024 / 1024:.1f} MB, {lines:,} lines")
+        print("-" * 80)
+
+        started = time.perf_counter()
+        records = run_parser(path)
+        report("sdp_parser", records, time.perf_counter() - started, lines, size)
+
+        if args.compare_regex:
+            started = time.perf_counter()
+            records = run_legacy(path)
+            report("legacy", records, time.perf_counter() - started, lines, size)
+    finally:
+        if generated and not args.keep:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+#!/bin/bash
+
+# Host Metrics Daemon Startup Script
+# Writes the Zabbix system/network/power keys to /run/host-metrics once per interval,
+# so the agent's UserParameters (zabbix/agent2-host-metrics.conf) only read a file
+
+echo "Starting Host Metrics Daemon..."
+
+export HOST_METRICS_DIR="${HOST_METRICS_DIR:-/run/host-metrics}"
+export HOST_METRICS_INTERVAL="${HOST_METRICS_INTERVAL:-10}"
+# Also serve interval CPU and PSI metrics for Prometheus (0 disables)
+export HOST_METRICS_EXPORTER_PORT="${HOST_METRICS_EXPORTER_PORT:-9276}"
+
+mkdir -p "$HOST_METRICS_DIR"
+
+python3 /home/rnd/telemetry/zabbix/scripts/host_metrics_daemon.py &
+
+HOST_METRICS_PID=$!
+echo "Host Metrics Daemon PID: $HOST_METRICS_PID"
+echo $HOST_METRICS_PID > /tmp/host_metrics_daemon.pid
+
+echo "Host metrics daemon started successfully!"
+echo "Output: $HOST_METRICS_DIR (every ${HOST_METRICS_INTERVAL}s)"
+echo "Prometheus: :$HOST_METRICS_EXPORTER_PORT/metrics"
+echo "To stop: kill $HOST_METRICS_PID"
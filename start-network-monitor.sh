@@ -9,8 +9,19 @@ echo "Starting Network Interface Monitor..."
 mkdir -p /home/rnd/telemetry/logs
 touch /home/rnd/telemetry/logs/network_stats.log
 
+# Push interface counters to the central Pushgateway by default; add "log" to also
+# write JSON lines for Promtail/Loki, or use "exporter" to serve /metrics on :9275
+export NETWORK_MONITOR_MODE="${NETWORK_MONITOR_MODE:-push}"
+export NETWORK_MONITOR_PUSHGATEWAY="${NETWORK_MONITOR_PUSHGATEWAY:-100.64.0.113:9091}"
+export NETWORK_MONITOR_INSTANCE="${NETWORK_MONITOR_INSTANCE:-GC-aro12-agent}"
+
+if ! python3 -c "import prometheus_client" &> /dev/null; then
+    echo "Installing prometheus-client..."
+    pip3 install prometheus-client
+fi
+
 # Start the network monitor in background
-echo "Starting network_monitor.py..."
+echo "Starting network_monitor.py (mode: $NETWORK_MONITOR_MODE)..."
 python3 /home/rnd/telemetry/network_monitor.py &
 
 # Get the PID
@@ -21,6 +32,7 @@ echo "Network Monitor PID: $NETWORK_MONITOR_PID"
 echo $NETWORK_MONITOR_PID > /tmp/network_monitor.pid
 
 echo "Network monitoring started successfully!"
-echo "Log file: /home/rnd/telemetry/logs/network_stats.log"
+echo "Log file: /home/rnd/telemetry/logs/network_stats.log (mode log only)"
+echo "Pushgateway: $NETWORK_MONITOR_PUSHGATEWAY (mode push)"
 echo "To stop: kill $NETWORK_MONITOR_PID"
 echo "Or run: ./stop-network-monitor.sh"
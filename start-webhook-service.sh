@@ -19,9 +19,9 @@ if ! command -v python3 &> /dev/null; then
 fi
 
 # Check if Flask is installed
-if ! python3 -c "import flask" &> /dev/null; then
+if ! python3 -c "import flask, yaml" &> /dev/null; then
     echo "Flask is not installed. Installing..."
-    pip3 install flask requests
+    pip3 install flask requests prometheus-client gunicorn pyyaml
 fi
 
 # Check if service is already running
@@ -40,9 +40,15 @@ fi
 # Make webhook service executable
 chmod +x "$WEBHOOK_SERVICE"
 
-# Start the service in background
+# Start the service in background (gunicorn if available, else the Flask development server)
 echo "Starting webhook service..."
-nohup python3 "$WEBHOOK_SERVICE" >> "$LOG_FILE" 2>&1 &
+if command -v gunicorn &> /dev/null; then
+    nohup gunicorn -c "$SCRIPT_DIR/webhook_gunicorn_conf.py" --chdir "$SCRIPT_DIR" \
+        grafana_webhook_service:app >> "$LOG_FILE" 2>&1 &
+else
+    echo "gunicorn not found, using the Flask development server"
+    nohup python3 "$WEBHOOK_SERVICE" >> "$LOG_FILE" 2>&1 &
+fi
 SERVICE_PID=$!
 
 # Save PID
@@ -61,6 +67,7 @@ if ps -p "$SERVICE_PID" > /dev/null 2>&1; then
     echo "- PID: $SERVICE_PID"
     echo "- Webhook URL: http://localhost:5000/webhook/grafana"
     echo "- Health Check: http://localhost:5000/health"
+    echo "- Metrics: http://localhost:5000/metrics"
     echo "- Log File: $LOG_FILE"
     echo ""
     echo "Useful commands:"
@@ -18,8 +18,8 @@ if ps -p "$PID" > /dev/null 2>&1; then
     echo "Stopping service (PID: $PID)..."
     kill "$PID"
     
-    # Wait for process to stop
-    for i in {1..10}; do
+    # Wait for process to stop (queued status updates are drained for up to 20s)
+    for i in {1..30}; do
         if ! ps -p "$PID" > /dev/null 2>&1; then
             echo "✓ Webhook service stopped successfully!"
             rm -f "$PID_FILE"
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Sparse time index for large studio-sdp-roulette logs
+
+Keeps a persistent index with the byte offset of the first line of every
+minute in self-test-2api.log and the SBO001_*.log files, so a time range
+query seeks straight to its start instead of scanning the file. The index
+is updated incrementally from the last indexed offset; a file whose inode
+changed, that shrank, or whose first bytes no longer match (rotated, or
+truncated by copytruncate and regrown past the indexed size) is re-indexed
+from the start.
+
+Lines start with "[2025-09-19 11:57:22.362]". Timestamps are assumed to be
+non-decreasing, which lets the indexer find minute boundaries inside each
+chunk it reads by bisection rather than by looking at every line.
+
+The index also remembers the mtimes of a log directory and its
+subdirectories along with the matching files found under them (like
+`find DIR -name PATTERN`), so finding the latest SBO001 log costs one stat
+per directory and per matching file while no files were created or removed
+since the last lookup.
+
+Usage:
+  python3 studio_log_index.py update                          # index the default logs
+  python3 studio_log_index.py range /home/rnd/studio-sdp-roulette/self-test-2api.log --from 11:57 --to 12:03
+  python3 studio_log_index.py latest /home/rnd/studio-sdp-roulette/logs
+  python3 studio_log_index.py status
+
+Environment:
+  STUDIO_LOG_INDEX_FILE  index location (default ~/.cache/telemetry/studio-log-index.json)
+"""
+
+import argparse
+import bisect
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+SELF_TEST_LOG = "/home/rnd/studio-sdp-roulette/self-test-2api.log"
+SBO_LOG_DIR = "/home/rnd/studio-sdp-roulette/logs"
+SBO_LOG_PATTERN = "SBO001_*.log"
+INDEX_FILE = os.environ.get("STUDIO_LOG_INDEX_FILE",
+                            os.path.expanduser("~/.cache/telemetry/studio-log-index.json"))
+
+CHUNK_SIZE = 8 * 1024 * 1024
+# Leading bytes checksummed to recognise a file that was truncated in place and rewritten
+HEAD_BYTES = 4096
+# "[YYYY-MM-DD HH:MM" - the minute key is the 16 characters after the bracket
+MINUTE_PATTERN = re.compile(rb"\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2})")
+MINUTE_LENGTH = 17
+
+
+def minute_at(buffer: bytes, pos: int, end: int) -> Tuple[int, Optional[str]]:
+    """Offset and minute of the first timestamped line starting at or after `pos`, or (end, None)"""
+    if pos > 0 and buffer[pos - 1] != 0x0A:
+        pos = buffer.find(b"\n", pos, end) + 1 or end
+    while pos < end:
+        match = MINUTE_PATTERN.match(buffer, pos, pos + MINUTE_LENGTH)
+        if match:
+            return pos, match.group(1).decode()
+        pos = buffer.find(b"\n", pos, end) + 1 or end
+    return end, None
+
+
+def last_minute(buffer: bytes, end: int) -> Optional[str]:
+    """Minute of the last timestamped line in buffer[:end]"""
+    pos = end
+    while pos > 0:
+        start = buffer.rfind(b"\n", 0, pos - 1) + 1
+        match = MINUTE_PATTERN.match(buffer, start, start + MINUTE_LENGTH)
+        if match:
+            return match.group(1).decode()
+        pos = start
+    return None
+
+
+def minute_boundaries(buffer: bytes, end: int, current: Optional[str]) -> List[Tuple[str, int]]:
+    """
+    (minute, offset) for every line in buffer[:end] whose minute differs from the line before
+
+    `current` is the minute in effect before the buffer starts. Each boundary
+    is found by bisecting on byte offsets between the previous boundary and
+    the end of the buffer, so a chunk that stays within one minute costs a
+    single lookup of its last line.
+    """
+    boundaries = []
+    pos = 0
+    final = last_minute(buffer, end)
+    while final is not None and final != current:
+        # Smallest offset whose next timestamped line is in another minute; past the
+        # last timestamped line counts as another minute since `final` differs
+        lo, hi = pos, end
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if minute_at(buffer, mid, end)[1] != current:
+                hi = mid
+            else:
+                lo = mid + 1
+        start, minute = minute_at(buffer, lo, end)
+        if minute is None:
+            break
+        boundaries.append((minute, start))
+        current = minute
+        pos = start + 1
+    return boundaries
+
+
+class FileIndex:
+    """Index entry for one log file"""
+
+    def __init__(self, path: str, data: Optional[dict] = None):
+        data = data or {}
+        self.path = path
+        self.inode = data.get("inode")
+        self.offset = data.get("offset", 0)
+        self.head = data.get("head")
+        self.minutes: List[str] = data.get("minutes", [])
+        self.offsets: List[int] = data.get("offsets", [])
+
+    def to_dict(self) -> dict:
+        return {"inode": self.inode, "offset": self.offset, "head": self.head,
+                "minutes": self.minutes, "offsets": self.offsets}
+
+    def reset(self, inode: int):
+        self.inode = inode
+        self.offset = 0
+        self.head = None
+        self.minutes = []
+        self.offsets = []
+
+    @staticmethod
+    def head_digest(f, length: int) -> str:
+        """Checksum of the first `length` bytes of an open file"""
+        f.seek(0)
+        return hashlib.sha1(f.read(length)).hexdigest()
+
+    def update(self) -> int:
+        """Index bytes appended since the last update; returns how many were read"""
+        st = os.stat(self.path)
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            self.reset(st.st_ino)
+        read = 0
+        with open(self.path, "rb") as f:
+            if self.offset and self.head != self.head_digest(f, min(self.offset, HEAD_BYTES)):
+                self.reset(st.st_ino)
+            f.seek(self.offset)
+            while self.offset < st.st_size:
+                buffer = f.read(min(CHUNK_SIZE, st.st_size - self.offset))
+                if not buffer:
+                    break
+                # Only index complete lines; a partial last line is picked up next time
+                end = buffer.rfind(b"\n") + 1
+                if end == 0:
+                    if len(buffer) < CHUNK_SIZE:
+                        break
+                    end = len(buffer)
+                current = self.minutes[-1] if self.minutes else None
+                for minute, start in minute_boundaries(buffer, end, current):
+                    self.minutes.append(minute)
+                    self.offsets.append(self.offset + start)
+                self.offset += end
+                read += end
+                f.seek(self.offset)
+            if read and self.offset - read < HEAD_BYTES:
+                self.head = self.head_digest(f, min(self.offset, HEAD_BYTES))
+        return read
+
+    def span(self, start: Optional[str], end: Optional[str]) -> Tuple[int, int]:
+        """Byte range covering minutes start..end inclusive ("YYYY-MM-DD HH:MM" keys)"""
+        first = bisect.bisect_left(self.minutes, start) if start else 0
+        last = bisect.bisect_right(self.minutes, end) if end else len(self.minutes)
+        begin = self.offsets[first] if first < len(self.offsets) else self.offset
+        stop = self.offsets[last] if last < len(self.offsets) else self.offset
+        return begin, max(begin, stop)
+
+
+class LogIndex:
+    """Persistent index over log files and log directories, stored as one JSON file"""
+
+    def __init__(self, path: str = INDEX_FILE):
+        self.path = path
+        self.files: Dict[str, FileIndex] = {}
+        self.dirs: Dict[str, dict] = {}
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            self.files = {p: FileIndex(p, d) for p, d in data.get("files", {}).items()}
+            self.dirs = data.get("dirs", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring unreadable index {path}: {e}", file=sys.stderr)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", prefix=".index-")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"files": {p: i.to_dict() for p, i in self.files.items()}, "dirs": self.dirs}, f)
+        os.replace(tmp, self.path)
+
+    def file(self, path: str) -> FileIndex:
+        """Up-to-date index for a log file"""
+        path = os.path.abspath(path)
+        index = self.files.setdefault(path, FileIndex(path))
+        index.update()
+        return index
+
+    def latest(self, directory: str, pattern: str = SBO_LOG_PATTERN) -> Optional[str]:
+        """
+        Newest file under `directory` (recursively) matching `pattern`, by modification time
+
+        The tree is only listed again when the mtime of the directory or one
+        of its subdirectories changed since the last lookup (a file was
+        created, removed or renamed); otherwise the remembered matching files
+        are re-stat'ed, since appending to a file changes its own mtime but
+        not its directory's.
+        """
+        directory = os.path.abspath(directory)
+        key = f"{directory}/{pattern}"
+        cached = self.dirs.get(key)
+        matches = None
+        if cached and "mtimes" in cached and "files" in cached:
+            try:
+                if all(os.stat(path).st_mtime_ns == mtime for path, mtime in cached["mtimes"].items()):
+                    matches = [(path, os.stat(path).st_mtime_ns) for path in cached["files"]]
+            except OSError:
+                matches = None
+
+        if matches is None:
+            mtimes = {}
+            matches = list(find_files(directory, pattern, mtimes))
+            cached = self.dirs[key] = {"mtimes": mtimes, "files": sorted(path for path, _ in matches)}
+        newest = max(matches, key=lambda match: match[1])[0] if matches else None
+        cached["latest"] = newest
+        return newest
+
+
+def find_files(directory: str, pattern: str, mtimes: Optional[Dict[str, int]] = None):
+    """
+    (path, mtime_ns) of every file under `directory` whose name matches `pattern`
+
+    Walks subdirectories like `find` (without following directory symlinks);
+    the mtime of each directory listed is recorded in `mtimes` when given.
+    """
+    pending = [directory]
+    while pending:
+        current = pending.pop()
+        try:
+            if mtimes is not None:
+                mtimes[current] = os.stat(current).st_mtime_ns
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file() and fnmatch.fnmatch(entry.name, pattern):
+                        yield entry.path, entry.stat().st_mtime_ns
+        except OSError:
+            # The top directory must exist; vanished or unreadable subdirectories are skipped like find does
+            if current == directory:
+                raise
+
+
+def resolve_minute(text: Optional[str], index: FileIndex) -> Optional[str]:
+    """Turn "HH:MM" or "YYYY-MM-DD HH:MM[:SS]" into a minute key; bare times use the file's latest day"""
+    if not text:
+        return None
+    text = text.strip()
+    if re.fullmatch(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}(:\d{2})?", text):
+        return text[:16]
+    if re.fullmatch(r"\d{1,2}:\d{2}(:\d{2})?", text):
+        if not index.minutes:
+            raise ValueError("the file has no timestamped lines to take the date from")
+        hours, minutes = text.split(":")[:2]
+        return f"{index.minutes[-1][:10]} {int(hours):02d}:{minutes}"
+    raise ValueError(f"unrecognized time {text!r} (use HH:MM or 'YYYY-MM-DD HH:MM')")
+
+
+def default_paths() -> List[str]:
+    paths = [SELF_TEST_LOG] if os.path.exists(SELF_TEST_LOG) else []
+    if os.path.isdir(SBO_LOG_DIR):
+        paths += sorted(path for path, _ in find_files(SBO_LOG_DIR, SBO_LOG_PATTERN))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sparse time index for studio-sdp-roulette logs")
+    parser.add_argument("--index", default=INDEX_FILE, help=f"Index file (default: {INDEX_FILE})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    update = commands.add_parser("update", help="Index new data in log files")
+    update.add_argument("paths", nargs="*", help=f"Log files (default: {SELF_TEST_LOG} and {SBO_LOG_DIR}/{SBO_LOG_PATTERN})")
+
+    span = commands.add_parser("range", help="Print the lines of a time range")
+    span.add_argument("path", help="Log file")
+    span.add_argument("--from", dest="start", help="First minute, HH:MM or 'YYYY-MM-DD HH:MM' (default: start of file)")
+    span.add_argument("--to", dest="end", help="Last minute, inclusive (default: end of file)")
+
+    latest = commands.add_parser("latest", help="Print the newest log file under a directory")
+    latest.add_argument("directory", nargs="?", default=SBO_LOG_DIR, help=f"Log directory (default: {SBO_LOG_DIR})")
+    latest.add_argument("--pattern", default=SBO_LOG_PATTERN, help=f"File name pattern (default: {SBO_LOG_PATTERN})")
+
+    commands.add_parser("status", help="Show indexed files")
+    args = parser.parse_args()
+
+    index = LogIndex(args.index)
+    if args.command == "update":
+        for path in args.paths or default_paths():
+            try:
+                entry = index.files.setdefault(os.path.abspath(path), FileIndex(os.path.abspath(path)))
+                read = entry.update()
+                print(f"✅ {path}: indexed {read / 1024 / 1024:.1f} MB new, {len(entry.minutes)} minute(s), "
+                      f"{entry.offset / 1024 / 1024:.1f} MB total")
+            except OSError as e:
+                print(f"❌ {path}: {e}")
+    elif args.command == "range":
+        try:
+            entry = index.file(args.path)
+            begin, stop = entry.span(resolve_minute(args.start, entry), resolve_minute(args.end, entry))
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}", file=sys.stderr)
+            sys.exit(1)
+        with open(entry.path, "rb") as f:
+            f.seek(begin)
+            remaining = stop - begin
+            while remaining > 0:
+                block = f.read(min(CHUNK_SIZE, remaining))
+                if not block:
+                    break
+                sys.stdout.buffer.write(block)
+                remaining -= len(block)
+        sys.stdout.flush()
+    elif args.command == "latest":
+        try:
+            path = index.latest(args.directory, args.pattern)
+        except OSError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            sys.exit(1)
+        if not path:
+            print(f"❌ No {args.pattern} files found in {args.directory}", file=sys.stderr)
+            index.save()
+            sys.exit(1)
+        print(path)
+    else:
+        for path, entry in sorted(index.files.items()):
+            covered = f"{entry.minutes[0]} .. {entry.minutes[-1]}" if entry.minutes else "no timestamps"
+            print(f"📄 {path}: {entry.offset / 1024 / 1024:.1f} MB indexed, {len(entry.minutes)} minute(s), {covered}")
+        for key, cached in sorted(index.dirs.items()):
+            print(f"📁 {key}: latest {cached['latest']}")
+    index.save()
+
+
+if __name__ == "__main__":
+    main()
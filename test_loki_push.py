@@ -1,9 +1,9 @@
 #!/usr/bin/env python3
-import requests
 import time
-import json
 from datetime import datetime
 
+from loki_client import LokiClient
+
 def push_log_to_loki():
     """Push test logs to remote Loki server"""
     loki_url = "http://100.64.0.113:3100/loki/api/v1/push"
@@ -17,42 +17,24 @@ def push_log_to_loki():
         f"Test log entry 3 from agent side - {datetime.now()}",
     ]
     
-    # Prepare the payload
-    streams = []
-    for i, log_entry in enumerate(log_entries):
-        stream = {
-            "stream": {
-                "job": "test_agent",
-                "instance": "GC-aro12-agent",
-                "level": "INFO",
-                "logger": "test_logger"
-            },
-            "values": [
-                [str(current_time + i * 1000000000), log_entry]
-            ]
-        }
-        streams.append(stream)
+    # All entries share one label set, so they go out as a single stream in one request
+    labels = {
+        "job": "test_agent",
+        "instance": "GC-aro12-agent",
+        "level": "INFO",
+        "logger": "test_logger"
+    }
     
-    payload = {"streams": streams}
+    client = LokiClient(loki_url)
+    for i, log_entry in enumerate(log_entries):
+        client.push(log_entry, labels, current_time + i * 1000000000)
+    result = client.close()
     
-    try:
-        response = requests.post(
-            loki_url,
-            headers={"Content-Type": "application/json"},
-            json=payload,
-            timeout=10
-        )
-        
-        print(f"Response status: {response.status_code}")
-        print(f"Response text: {response.text}")
-        
-        if response.status_code == 204:
-            print("✅ Successfully pushed logs to Loki!")
-        else:
-            print("❌ Failed to push logs to Loki")
-            
-    except Exception as e:
-        print(f"❌ Error pushing logs: {e}")
+    print(f"Response status: {result.status_code}")
+    if result.ok:
+        print(f"✅ Successfully pushed {result.entries} logs to Loki!")
+    else:
+        print(f"❌ Failed to push logs to Loki: {result.error}")
 
 if __name__ == "__main__":
     push_log_to_loki()
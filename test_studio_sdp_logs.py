@@ -4,11 +4,12 @@ Test script to verify Studio SDP Roulette log collection
 Tests the new Promtail configuration for aro11 agent
 """
 
-import requests
-import json
-import time
 import subprocess
-from datetime import datetime, timedelta
+from datetime import datetime
+
+from loki_query import LokiQueryClient, LokiQueryError
+
+loki = LokiQueryClient('http://100.64.0.113:3100', timeout=10)
 
 def check_promtail_status():
     """Check if Promtail container is running and healthy"""
@@ -27,66 +28,42 @@ def check_promtail_status():
 
 def check_loki_connection():
     """Check if Loki server is accessible"""
-    try:
-        response = requests.get('http://100.64.0.113:3100/ready', timeout=5)
-        if response.status_code == 200:
-            print("✅ Loki server is ready")
-            return True
-        else:
-            print(f"⚠️  Loki server returned status: {response.status_code}")
-            return False
-    except requests.RequestException as e:
-        print(f"❌ Cannot connect to Loki server: {e}")
-        return False
+    if loki.ready():
+        print("✅ Loki server is ready")
+        return True
+    print("❌ Loki server is not ready or cannot be reached")
+    return False
 
 def query_studio_sdp_logs():
     """Query Loki for Studio SDP Roulette logs"""
     try:
-        # Query for logs from the last hour
-        end_time = datetime.now()
-        start_time = end_time - timedelta(hours=1)
-        
-        query_params = {
-            'query': '{job="studio_sdp_roulette", instance="GC-aro11-agent"}',
-            'start': int(start_time.timestamp() * 1000000000),  # nanoseconds
-            'end': int(end_time.timestamp() * 1000000000),
-            'limit': 100
-        }
-        
-        response = requests.get(
-            'http://100.64.0.113:3100/loki/api/v1/query_range',
-            params=query_params,
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('data', {}).get('result'):
-                log_count = sum(len(stream.get('values', [])) for stream in data['data']['result'])
-                print(f"✅ Found {log_count} Studio SDP Roulette log entries in the last hour")
-                
-                # Show sample logs
-                if log_count > 0:
-                    print("\n📋 Sample log entries:")
-                    for stream in data['data']['result'][:2]:  # Show first 2 streams
-                        labels = stream.get('stream', {})
-                        print(f"   Labels: {labels}")
-                        for value in stream.get('values', [])[:3]:  # Show first 3 entries
-                            timestamp, log_line = value
-                            # Convert nanosecond timestamp to readable format
-                            dt = datetime.fromtimestamp(int(timestamp) / 1000000000)
-                            print(f"   {dt.strftime('%Y-%m-%d %H:%M:%S')}: {log_line[:100]}...")
-                        print()
-                return True
-            else:
-                print("⚠️  No Studio SDP Roulette logs found in the last hour")
-                return False
-        else:
-            print(f"❌ Loki query failed with status: {response.status_code}")
-            print(f"Response: {response.text}")
+        # Count the last hour server-side; fetch only enough entries for up to 3 samples from 2 streams
+        query = '{job="studio_sdp_roulette", instance="GC-aro11-agent"}'
+        log_count = sum(loki.count_over_time(query, since=3600).values())
+        if not log_count:
+            print("⚠️  No Studio SDP Roulette logs found in the last hour")
             return False
+
+        samples = {}
+        for entry in loki.query_range(query, since=3600, limit=100):
+            key = tuple(sorted(entry.labels.items()))
+            if key in samples or len(samples) < 2:
+                stream_samples = samples.setdefault(key, [])
+                if len(stream_samples) < 3:
+                    stream_samples.append(entry)
+        
+        print(f"✅ Found {log_count} Studio SDP Roulette log entries in the last hour")
+        print("\n📋 Sample log entries:")
+        for key, entries in samples.items():
+            print(f"   Labels: {dict(key)}")
+            for entry in entries:
+                # Convert nanosecond timestamp to readable format
+                dt = datetime.fromtimestamp(entry.timestamp / 1000000000)
+                print(f"   {dt.strftime('%Y-%m-%d %H:%M:%S')}: {entry.line[:100]}...")
+            print()
+        return True
             
-    except requests.RequestException as e:
+    except LokiQueryError as e:
         print(f"❌ Error querying Loki: {e}")
         return False
 
@@ -105,6 +82,14 @@ def check_log_file_exists():
             with open(log_path, 'r') as f:
                 f.readline()
             print("✅ Log file is readable")
+
+            # Incremental: only bytes appended since the last run are read
+            from studio_log_index import LogIndex
+            index = LogIndex()
+            entry = index.file(log_path)
+            index.save()
+            if entry.minutes:
+                print(f"   Covers: {entry.minutes[0]} .. {entry.minutes[-1]} ({len(entry.minutes)} indexed minute(s))")
             return True
         except Exception as e:
             print(f"❌ Error reading log file: {e}")
@@ -0,0 +1,27 @@
+"""
+Gunicorn configuration for the Grafana webhook service
+Usage: gunicorn -c webhook_gunicorn_conf.py grafana_webhook_service:app
+
+The per-table state cache, dispatch queue and /metrics are held in process
+memory, so deduplication and metrics are only exact with a single worker
+process. Scale request handling with WEBHOOK_THREADS first; WEBHOOK_WORKERS > 1
+gives each process its own state and metrics.
+"""
+
+import os
+
+bind = os.environ.get("WEBHOOK_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEBHOOK_WORKERS", "1"))
+worker_class = "gthread"
+threads = int(os.environ.get("WEBHOOK_THREADS", "8"))
+timeout = 30
+keepalive = 5
+
+# Leave time for drain_dispatch_queue() (WEBHOOK_DRAIN_TIMEOUT, default 20s)
+graceful_timeout = int(os.environ.get("WEBHOOK_GRACEFUL_TIMEOUT", "25"))
+
+
+def worker_exit(server, worker):
+    """Send queued status updates before the worker process exits"""
+    from grafana_webhook_service import drain_dispatch_queue
+    drain_dispatch_queue()
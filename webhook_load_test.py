@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Load test for the Grafana webhook service
+Replays recorded Grafana alert payloads against /webhook/grafana and reports
+latency percentiles and throughput.
+
+Usage:
+  python3 webhook_load_test.py --payloads recorded_alerts.jsonl --requests 2000 --concurrency 20
+  python3 webhook_load_test.py --tables 10 --alerts-per-payload 20     # synthetic payloads
+
+Payload files may be a single JSON payload, a JSON list of payloads, or JSONL
+(one payload per line). Without --payloads, Grafana-shaped payloads are generated.
+
+The service PATCHes the status API for every table it sees, so synthetic payloads
+use fake table ids (LOADTEST-001...) by default. Only pass --table-prefix ARO, or
+recorded payloads with real table ids, against a service whose status API is not
+production.
+"""
+
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import requests
+
+DEFAULT_URL = "http://localhost:5000/webhook/grafana"
+DEFAULT_TABLE_PREFIX = "LOADTEST"
+
+
+def load_payloads(paths: List[str]) -> List[dict]:
+    """Load recorded Grafana payloads from JSON or JSONL files"""
+    payloads = []
+    for path in paths:
+        with open(path) as f:
+            text = f.read()
+        try:
+            data = json.loads(text)
+            payloads.extend(data if isinstance(data, list) else [data])
+        except json.JSONDecodeError:
+            payloads.extend(json.loads(line) for line in text.splitlines() if line.strip())
+    return payloads
+
+
+def synthetic_payloads(tables: int, alerts_per_payload: int, table_prefix: str = DEFAULT_TABLE_PREFIX) -> List[dict]:
+    """Generate Grafana-shaped payloads mixing SRS and ZCAM alerts for tables <table_prefix>-001..."""
+    payloads = []
+    for status in ("firing", "resolved"):
+        for i in range(tables):
+            table_id = f"{table_prefix}-{i + 1:03d}"
+            alerts = []
+            for j in range(alerts_per_payload):
+                if j % 2:
+                    labels = {"alertname": "SRS okbps zero", "service": "srs", "rulename": "okbps"}
+                else:
+                    labels = {"alertname": "ZCAM frame stuck", "device": "zcam", "alert_type": "frame_stuck"}
+                labels["instance"] = f"agent-{j}"
+                alerts.append({
+                    "status": status,
+                    "labels": labels,
+                    "annotations": {"table_id": table_id},
+                    "fingerprint": f"{table_id}-{j}",
+                })
+            payloads.append({"status": status, "alerts": alerts})
+    return payloads
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_load_test(url: str, payloads: List[dict], total: int, concurrency: int, timeout: float) -> dict:
+    """Send `total` requests with `concurrency` threads and collect per-request latency"""
+    bodies = [json.dumps(payload).encode() for payload in payloads]
+    body_iter = itertools.cycle(bodies)
+    iter_lock = threading.Lock()
+    local = threading.local()
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    results_lock = threading.Lock()
+
+    def send_one(_):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        with iter_lock:
+            body = next(body_iter)
+        start = time.perf_counter()
+        try:
+            response = local.session.post(url, data=body, timeout=timeout,
+                                          headers={"Content-Type": "application/json"})
+            status = str(response.status_code)
+        except requests.exceptions.RequestException as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - start
+        with results_lock:
+            latencies.append(elapsed)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send_one, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "wall_seconds": wall,
+        "throughput_rps": total / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        "statuses": dict(statuses),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay Grafana payloads against the webhook service")
+    parser.add_argument("--url", default=DEFAULT_URL, help=f"Webhook URL (default: {DEFAULT_URL})")
+    parser.add_argument("--payloads", nargs="*", default=[], help="Recorded payload files (JSON or JSONL)")
+    parser.add_argument("--requests", type=int, default=1000, help="Total requests to send")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent client threads")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--tables", type=int, default=5, help="Synthetic payloads: number of tables")
+    parser.add_argument("--alerts-per-payload", type=int, default=20, help="Synthetic payloads: alerts per payload")
+    parser.add_argument("--table-prefix", default=DEFAULT_TABLE_PREFIX,
+                        help=f"Synthetic payloads: table id prefix (default: {DEFAULT_TABLE_PREFIX}, not a real table)")
+    parser.add_argument("--shuffle", action="store_true", help="Shuffle payload order")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if args.payloads:
+        payloads = load_payloads(args.payloads)
+    else:
+        payloads = synthetic_payloads(args.tables, args.alerts_per_payload, args.table_prefix)
+    if not payloads:
+        parser.error("no payloads to send")
+    if args.shuffle:
+        random.shuffle(payloads)
+
+    print(f"Sending {args.requests} requests ({len(payloads)} distinct payloads) "
+          f"to {args.url} with concurrency {args.concurrency}...")
+    report = run_load_test(args.url, payloads, args.requests, args.concurrency, args.timeout)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print("-" * 50)
+    print(f"Wall time:   {report['wall_seconds']:.2f}s")
+    print(f"Throughput:  {report['throughput_rps']:.1f} req/s")
+    print(f"Latency p50: {report['p50_ms']:.1f} ms")
+    print(f"Latency p90: {report['p90_ms']:.1f} ms")
+    print(f"Latency p99: {report['p99_ms']:.1f} ms")
+    print(f"Latency max: {report['max_ms']:.1f} ms")
+    print(f"Responses:   {report['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Compare a full Zabbix key sweep through the legacy scripts with the host metrics daemon
+
+Reads the UserParameter lines of an agent2 conf, keeps the keys that
+host_metrics_daemon.py serves, and runs every one of them the way the
+agent does (sh -c "<command>") once through the conf's script command and
+once through the daemon's snapshot-file command. For each sweep it reports
+the wall time and the number of processes created, taken from the
+system-wide "processes" counter in /proc/stat, so run it on an otherwise
+quiet host. Values that differ between the two paths are listed at the end.
+
+Usage:
+  python3 host_metrics_benchmark.py                                   # agent2-GC-aro12-agent.conf
+  python3 host_metrics_benchmark.py --conf ../agent2-GC-ARO-001-1-agent.conf --sweeps 20
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import tempfile
+import time
+
+from host_metrics_daemon import HostCollector, SnapshotWriter, userparameters
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONF = os.path.join(SCRIPTS_DIR, "..", "agent2-GC-aro12-agent.conf")
+AGENT_SCRIPTS_DIR = "/var/lib/zabbix/scripts"
+USERPARAMETER = re.compile(r"^UserParameter=([^,\[]+)(\[\*\])?,(.*)$")
+
+
+def parse_userparameters(text: str) -> dict:
+    """key -> (flexible, command)"""
+    params = {}
+    for line in text.splitlines():
+        match = USERPARAMETER.match(line.strip())
+        if match:
+            params[match.group(1)] = (bool(match.group(2)), match.group(3))
+    return params
+
+
+def forks() -> int:
+    with open("/proc/stat") as f:
+        for line in f:
+            if line.startswith("processes "):
+                return int(line.split()[1])
+    return 0
+
+
+def default_interface() -> str:
+    """The default route's interface, else the first non-loopback one"""
+    with open("/proc/net/route") as f:
+        for line in f.readlines()[1:]:
+            fields = line.split()
+            if len(fields) > 1 and fields[1] == "00000000":
+                return fields[0]
+    with open("/proc/net/dev") as f:
+        names = [line.split(":", 1)[0].strip() for line in f.readlines()[2:]]
+    return next((name for name in names if name != "lo"), "lo")
+
+
+def sweep(commands: list) -> tuple:
+    """Run every command through sh -c; returns (seconds, processes created, outputs)"""
+    outputs = []
+    before = forks()
+    started = time.perf_counter()
+    for command in commands:
+        result = subprocess.run(["sh", "-c", command], capture_output=True, text=True)
+        outputs.append(result.stdout.strip())
+    elapsed = time.perf_counter() - started
+    return elapsed, forks() - before, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark legacy UserParameter scripts against the host metrics daemon")
+    parser.add_argument("--conf", default=DEFAULT_CONF, help="agent2 conf with the legacy UserParameters")
+    parser.add_argument("--sweeps", type=int, default=10, help="Full key sweeps per approach (default: 10)")
+    parser.add_argument("--interface", default=default_interface(), help="Interface for [*] network keys")
+    parser.add_argument("--mount", default="/", help="Mount point for system.disk.usage.mount[*]")
+    args = parser.parse_args()
+
+    with open(args.conf) as f:
+        legacy = parse_userparameters(f.read())
+
+    with tempfile.TemporaryDirectory(prefix="host-metrics-") as directory:
+        SnapshotWriter(directory).write(HostCollector(default_interface=args.interface).snapshot(), time.time())
+        daemon = parse_userparameters(userparameters(directory))
+
+        keys = [key for key in legacy if key in daemon]
+        if not keys:
+            print(f"❌ No keys in {args.conf} are served by the daemon")
+            return
+
+        def command(table, key):
+            flexible, template = table[key]
+            if not flexible:
+                return template
+            param = args.mount if key.startswith("system.disk.usage.mount") else args.interface
+            return template.replace("$1", param)
+
+        legacy_commands = [command(legacy, key).replace(AGENT_SCRIPTS_DIR, SCRIPTS_DIR) for key in keys]
+        daemon_commands = [command(daemon, key) for key in keys]
+
+        print(f"📋 {len(keys)} key(s) from {os.path.basename(args.conf)}, interface {args.interface}, "
+              f"{args.sweeps} sweep(s) each")
+        print("-" * 80)
+        results = {}
+        for name, commands in (("scripts", legacy_commands), ("daemon", daemon_commands)):
+            total_time = total_forks = 0
+            for _ in range(args.sweeps):
+                elapsed, created, outputs = sweep(commands)
+                total_time += elapsed
+                total_forks += created
+            results[name] = outputs
+            print(f"{name:<8} {total_time / args.sweeps * 1000:9.1f} ms/sweep  "
+                  f"{total_forks / args.sweeps:8.1f} processes/sweep  "
+                  f"{total_forks / args.sweeps / len(keys):6.1f} per key")
+
+    differences = [(key, old, new) for key, old, new in zip(keys, results["scripts"], results["daemon"]) if old != new]
+    if differences:
+        print("-" * 80)
+        print(f"⚠️  {len(differences)} value(s) differ (CPU and load move between sweeps):")
+        for key, old, new in differences:
+            print(f"   {key:<32} scripts={old!r:<12} daemon={new!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,534 @@
+#!/usr/bin/env python3
+"""
+Host metrics daemon for the Zabbix agent
+
+The UserParameters in agent2-*.conf used to run system_monitor.sh,
+network_monitor.sh or power_monitor.sh for every key, and each of those
+forks grep/awk/sed/df/cat several times: about six processes per key, or
+~150 for one poll of a host's 25 keys. This daemon reads /proc and /sys once per interval,
+computes every key the scripts provide from that one snapshot and writes
+each value to a small file under HOST_METRICS_DIR:
+
+  /run/host-metrics/system.cpu.usage                      plain keys
+  /run/host-metrics/custom.net.if.in/enp86s0/.value        keys with a parameter
+  /run/host-metrics/custom.net.if.in/.value                ... with an empty parameter
+  /run/host-metrics/system.disk.usage.mount/var/.value     mount points keep their path
+  /run/host-metrics/host.cpu.util/cpu3/iowait/.value       host.cpu.util[cpu3,iowait]
+  /run/host-metrics/system.pressure/io/some/avg10/.value   system.pressure[io,some,avg10]
+  /run/host-metrics/snapshot.json                          everything, plus the snapshot time
+
+The matching UserParameters (python3 host_metrics_daemon.py --userparameters)
+read those files with the shell's `read` builtin, so a key costs the one
+`sh -c` the agent spawns anyway. Files are replaced atomically and only
+when their value changed; the directory itself is never replaced so it can
+be bind-mounted read-only into the agent container.
+
+Values follow the scripts (df-style disk percentages, 0/1/2 warning
+levels with the same thresholds) except CPU usage, which is measured over
+the last interval from the difference between two /proc/stat samples
+rather than averaged since boot. Per-core and per-mode utilization
+(user, system, iowait, softirq, steal, ...) and PSI stall percentages from
+/proc/pressure are served from the same sample, as Zabbix keys and, with
+HOST_METRICS_EXPORTER_PORT set, as Prometheus metrics. UPS state (upsc) and the
+`sensors` temperature fallback are queried once per interval when those
+tools exist; upower is not consulted.
+
+Environment:
+  HOST_METRICS_DIR        output directory (default /run/host-metrics)
+  HOST_METRICS_INTERVAL   seconds between snapshots (default 10)
+  HOST_METRICS_INTERFACE  interface for keys called without one (default enp86s0)
+  HOST_METRICS_SYSFS      sysfs root (default /host/sys when present, else /sys)
+  HOST_METRICS_EXPORTER_PORT  serve Prometheus metrics on this port (default: off)
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger("host_metrics")
+
+OUTPUT_DIR = os.environ.get("HOST_METRICS_DIR", "/run/host-metrics")
+INTERVAL = float(os.environ.get("HOST_METRICS_INTERVAL", "10"))
+DEFAULT_INTERFACE = os.environ.get("HOST_METRICS_INTERFACE", "enp86s0")
+SYSFS = os.environ.get("HOST_METRICS_SYSFS", "/host/sys" if os.path.isdir("/host/sys/class/net") else "/sys")
+EXPORTER_PORT = int(os.environ.get("HOST_METRICS_EXPORTER_PORT", "0"))
+VALUE_FILE = ".value"
+
+# Thresholds from system_monitor.sh: (warning, critical)
+USAGE_THRESHOLDS = (80, 90)
+TEMPERATURE_THRESHOLDS = (70, 80)
+
+# Zabbix key -> value name in the per-interface counters
+NET_DEV_KEYS = {
+    "custom.net.if.in": "rx_bytes",
+    "custom.net.if.out": "tx_bytes",
+    "custom.net.if.in.packets": "rx_packets",
+    "custom.net.if.out.packets": "tx_packets",
+    "custom.net.if.in.errors": "rx_errors",
+    "custom.net.if.out.errors": "tx_errors",
+    "custom.net.if.in.dropped": "rx_dropped",
+    "custom.net.if.out.dropped": "tx_dropped",
+    "custom.net.if.speed": "speed",
+    "custom.net.if.status": "status",
+    "system.network.in": "sys_rx_bytes",
+    "system.network.out": "sys_tx_bytes",
+    "system.network.status": "status",
+}
+# system.uptime is left to the agent's built-in key: a UserParameter with that name stops agent2 from starting
+PLAIN_KEYS = [
+    "system.cpu.usage", "system.memory.usage", "system.disk.usage", "system.load.average",
+    "system.temperature", "system.health.score", "system.cpu.warning", "system.memory.warning",
+    "system.disk.warning", "system.temperature.warning", "system.high.load",
+    "power.battery.status", "power.battery.charge",
+]
+MOUNT_KEY = "system.disk.usage.mount"
+# Not system.cpu.util: that is a built-in agent key, and a UserParameter with its name stops agent2 from starting
+CPU_KEY = "host.cpu.util"
+PRESSURE_KEY = "system.pressure"
+
+# /proc/stat columns counted in the total; guest time is already included in user/nice
+CPU_MODES = ("user", "nice", "system", "idle", "iowait", "irq", "softirq", "steal")
+PRESSURE_RESOURCES = ("cpu", "memory", "io")
+PRESSURE_WINDOWS = ("avg10", "avg60", "avg300")
+
+
+class ProcFile:
+    """A /proc file kept open and re-read from the start on each sample"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.f = open(path, "rb", buffering=0)
+
+    def read(self) -> str:
+        self.f.seek(0)
+        chunks = []
+        while True:
+            chunk = self.f.read(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks).decode()
+
+
+def read_text(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def warning_level(value: float, thresholds) -> int:
+    warning, critical = thresholds
+    return 2 if value >= critical else 1 if value >= warning else 0
+
+
+def df_percent(mount: str) -> Optional[int]:
+    """Use% as df prints it: used / (used + available), rounded up; None for pseudo filesystems"""
+    try:
+        st = os.statvfs(mount)
+    except OSError:
+        return None
+    if st.f_blocks == 0:
+        return None
+    used = st.f_blocks - st.f_bfree
+    total = used + st.f_bavail
+    return math.ceil(used * 100 / total) if total else 0
+
+
+def run_tool(*command: str) -> str:
+    try:
+        return subprocess.run(command, capture_output=True, text=True, timeout=5).stdout
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+class CpuSampler:
+    """
+    CPU utilization over the interval between two /proc/stat reads
+
+    sample() returns {"cpu": {...}, "cpu0": {...}, ...} with a percentage per
+    mode plus "busy" (everything but idle and iowait). The first sample, and
+    any CPU that was not present last time, is computed since boot.
+    """
+
+    def __init__(self):
+        self.stat = ProcFile("/proc/stat")
+        self.previous: Dict[str, List[int]] = {}
+        self.last: Dict[str, Dict[str, float]] = {}
+
+    def sample(self) -> Dict[str, Dict[str, float]]:
+        current = {}
+        for line in self.stat.read().splitlines():
+            if not line.startswith("cpu"):
+                break
+            fields = line.split()
+            current[fields[0]] = [int(v) for v in fields[1:len(CPU_MODES) + 1]]
+
+        usage = {}
+        for cpu, counters in current.items():
+            previous = self.previous.get(cpu, [0] * len(counters))
+            deltas = [max(0, now - before) for now, before in zip(counters, previous)]
+            total = sum(deltas)
+            if total == 0:
+                # No ticks since the last read (sampled twice in a row); keep the last result
+                if cpu in self.last:
+                    usage[cpu] = self.last[cpu]
+                continue
+            modes = {mode: delta * 100 / total for mode, delta in zip(CPU_MODES, deltas)}
+            modes["busy"] = 100 - modes["idle"] - modes.get("iowait", 0)
+            usage[cpu] = modes
+        self.previous = current
+        self.last = usage
+        return usage
+
+
+def read_pressure(root: str = "/proc/pressure") -> Dict[str, Dict[str, Dict[str, float]]]:
+    """PSI as {resource: {"some"|"full": {"avg10": %, ..., "total": stalled seconds}}}; empty without PSI"""
+    pressure = {}
+    for resource in PRESSURE_RESOURCES:
+        text = read_text(os.path.join(root, resource))
+        if not text:
+            continue
+        kinds = {}
+        for line in text.splitlines():
+            kind, *pairs = line.split()
+            values = dict(pair.split("=", 1) for pair in pairs)
+            kinds[kind] = {window: float(values.get(window, 0)) for window in PRESSURE_WINDOWS}
+            kinds[kind]["total"] = int(values.get("total", 0)) / 1_000_000
+        pressure[resource] = kinds
+    return pressure
+
+
+class HostCollector:
+    """Builds one snapshot of every key from /proc and /sys"""
+
+    def __init__(self, sysfs: str = SYSFS, default_interface: str = DEFAULT_INTERFACE):
+        self.sysfs = sysfs
+        self.default_interface = default_interface
+        self.cpu = CpuSampler()
+        self.meminfo = ProcFile("/proc/meminfo")
+        self.loadavg = ProcFile("/proc/loadavg")
+        self.net_dev = ProcFile("/proc/net/dev")
+        self.mounts = ProcFile("/proc/mounts")
+        self.route = ProcFile("/proc/net/route")
+        self.cpu_count = os.cpu_count() or 1
+        self.has_sensors = shutil.which("sensors") is not None
+        self.has_upsc = shutil.which("upsc") is not None
+        # Latest structured CPU and PSI sample, shared with the Prometheus collector
+        self.lock = threading.Lock()
+        self.cpu_sample: Dict[str, Dict[str, float]] = {}
+        self.pressure_sample: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+    def memory_usage(self) -> int:
+        info = {}
+        for line in self.meminfo.read().splitlines():
+            name, _, rest = line.partition(":")
+            info[name] = int(rest.split()[0]) if rest.split() else 0
+        total = info.get("MemTotal", 0)
+        available = info.get("MemAvailable")
+        if available is None:
+            available = info.get("MemFree", 0) + info.get("Buffers", 0) + info.get("Cached", 0)
+        return (total - available) * 100 // total if total else 0
+
+    def temperature(self) -> int:
+        thermal = os.path.join(self.sysfs, "class", "thermal")
+        try:
+            zones = sorted(name for name in os.listdir(thermal) if name.startswith("thermal_zone"))
+        except OSError:
+            zones = []
+        for zone in zones:
+            value = read_text(os.path.join(thermal, zone, "temp"))
+            if value and value.lstrip("-").isdigit() and int(value) > 0:
+                return int(value) // 1000
+        if self.has_sensors:
+            for line in run_tool("sensors").splitlines():
+                if line.startswith(("Core 0", "Package id 0")) and "°C" in line:
+                    value = line.split("+", 1)[-1].split("°C", 1)[0]
+                    try:
+                        return int(float(value))
+                    except ValueError:
+                        pass
+        return 0
+
+    def power(self):
+        """(on battery, charge percent) from /sys/class/power_supply, then upsc"""
+        supplies = os.path.join(self.sysfs, "class", "power_supply")
+        on_battery, charge = 0, None
+        try:
+            names = sorted(os.listdir(supplies))
+        except OSError:
+            names = []
+        for name in names:
+            if read_text(os.path.join(supplies, name, "type")) != "Battery":
+                continue
+            if read_text(os.path.join(supplies, name, "status")) == "Discharging":
+                on_battery = 1
+            capacity = read_text(os.path.join(supplies, name, "capacity"))
+            if charge is None and capacity:
+                charge = capacity
+        if self.has_upsc and (not on_battery or charge is None):
+            for ups in run_tool("upsc", "-l").split():
+                values = dict(line.split(": ", 1) for line in run_tool("upsc", ups).splitlines() if ": " in line)
+                status = values.get("ups.status", "").split()
+                if any(flag in ("OB", "OLB", "LB") for flag in status):
+                    on_battery = 1
+                if charge is None and values.get("battery.charge"):
+                    charge = values["battery.charge"]
+        return on_battery, charge or "0"
+
+    def default_route_interface(self) -> Optional[str]:
+        for line in self.route.read().splitlines()[1:]:
+            fields = line.split()
+            if len(fields) > 1 and fields[1] == "00000000":
+                return fields[0]
+        return None
+
+    def interfaces(self) -> Dict[str, Dict[str, str]]:
+        """Per-interface values; bytes/packets from /proc/net/dev, the rest from sysfs like network_monitor.sh"""
+        result = {}
+        for line in self.net_dev.read().splitlines()[2:]:
+            name, _, data = line.partition(":")
+            name = name.strip()
+            fields = data.split()
+            if not name or len(fields) < 16:
+                continue
+            stats = os.path.join(self.sysfs, "class", "net", name)
+            values = {
+                "rx_bytes": fields[0], "rx_packets": fields[1],
+                "tx_bytes": fields[8], "tx_packets": fields[9],
+            }
+            for counter in ("rx_errors", "tx_errors", "rx_dropped", "tx_dropped", "rx_bytes", "tx_bytes"):
+                value = read_text(os.path.join(stats, "statistics", counter)) or "0"
+                values["sys_" + counter if counter.endswith("_bytes") else counter] = value
+            speed = read_text(os.path.join(stats, "speed"))
+            values["speed"] = speed if speed and speed.lstrip("-").isdigit() else "0"
+            values["status"] = "1" if read_text(os.path.join(stats, "operstate")) == "up" else "0"
+            result[name] = values
+        return result
+
+    def mount_points(self):
+        mounts = []
+        for line in self.mounts.read().splitlines():
+            fields = line.split()
+            if len(fields) > 1:
+                mounts.append(fields[1].replace("\\040", " "))
+        return mounts
+
+    def snapshot(self) -> Dict[str, str]:
+        """Every served key as a relative output path -> value"""
+        values = {}
+        cpu_sample = self.cpu.sample()
+        pressure = read_pressure()
+        with self.lock:
+            self.cpu_sample, self.pressure_sample = cpu_sample, pressure
+        cpu = round(cpu_sample.get("cpu", {}).get("busy", 0))
+        memory = self.memory_usage()
+        disk = df_percent("/") or 0
+        load_text = self.loadavg.read().split()[0]
+        load = float(load_text)
+        temperature = self.temperature()
+
+        health = 100 - cpu // 2 - memory // 2 - disk // 2
+        ratio = load / self.cpu_count
+        health -= 20 if ratio > 2 else 10 if ratio > 1 else 0
+
+        on_battery, charge = self.power()
+        values.update({
+            "system.cpu.usage": cpu,
+            "system.memory.usage": memory,
+            "system.disk.usage": disk,
+            "system.load.average": load_text,
+            "system.temperature": temperature,
+            "system.health.score": max(0, health),
+            "system.cpu.warning": warning_level(cpu, USAGE_THRESHOLDS),
+            "system.memory.warning": warning_level(memory, USAGE_THRESHOLDS),
+            "system.disk.warning": warning_level(disk, USAGE_THRESHOLDS),
+            "system.temperature.warning": warning_level(temperature, TEMPERATURE_THRESHOLDS),
+            "system.high.load": 1 if load > self.cpu_count * 2 else 0,
+            "power.battery.status": on_battery,
+            "power.battery.charge": charge,
+        })
+
+        for name, modes in cpu_sample.items():
+            # "cpu" is the all-CPU line; it is served as host.cpu.util[total] and with an empty parameter
+            targets = [f"{CPU_KEY}/total", CPU_KEY] if name == "cpu" else [f"{CPU_KEY}/{name}"]
+            for target in targets:
+                values[f"{target}/{VALUE_FILE}"] = f"{modes['busy']:.2f}"
+                for mode, percent in modes.items():
+                    values[f"{target}/{mode}/{VALUE_FILE}"] = f"{percent:.2f}"
+
+        for resource, kinds in pressure.items():
+            for kind, windows in kinds.items():
+                for window, value in windows.items():
+                    values[f"{PRESSURE_KEY}/{resource}/{kind}/{window}/{VALUE_FILE}"] = (
+                        f"{value:.6f}" if window == "total" else f"{value:.2f}")
+
+        for mount in self.mount_points():
+            percent = df_percent(mount)
+            if percent is not None:
+                values[f"{MOUNT_KEY}{mount.rstrip('/')}/{VALUE_FILE}"] = percent
+
+        interfaces = self.interfaces()
+        route_interface = self.default_route_interface()
+        for key, field in NET_DEV_KEYS.items():
+            for name, stats in interfaces.items():
+                values[f"{key}/{name}/{VALUE_FILE}"] = stats[field]
+            # An empty parameter means the default interface (the default route's for system.network.status)
+            default = route_interface if key == "system.network.status" else self.default_interface
+            values[f"{key}/{VALUE_FILE}"] = interfaces.get(default, {}).get(field, "0")
+        return {path: str(value) for path, value in values.items()}
+
+
+class SampleCollector:
+    """Prometheus collector exposing the CPU and PSI values of the latest snapshot (never reads /proc itself)"""
+
+    def __init__(self, host: HostCollector):
+        self.host = host
+
+    def collect(self):
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+        with self.host.lock:
+            cpu_sample, pressure = self.host.cpu_sample, self.host.pressure_sample
+        utilization = GaugeMetricFamily("host_cpu_utilization_percent",
+                                        "CPU time share over the last sampling interval",
+                                        labels=["cpu", "mode"])
+        for name, modes in cpu_sample.items():
+            for mode, percent in modes.items():
+                utilization.add_metric(["total" if name == "cpu" else name, mode], percent)
+        yield utilization
+
+        stall = GaugeMetricFamily("host_pressure_stall_percent", "PSI stall share over the kernel's averaging window",
+                                  labels=["resource", "kind", "window"])
+        stalled = CounterMetricFamily("host_pressure_stalled_seconds", "PSI total stall time",
+                                      labels=["resource", "kind"])
+        for resource, kinds in pressure.items():
+            for kind, windows in kinds.items():
+                for window in PRESSURE_WINDOWS:
+                    stall.add_metric([resource, kind, window], windows[window])
+                stalled.add_metric([resource, kind], windows["total"])
+        yield stall
+        yield stalled
+
+
+class SnapshotWriter:
+    """Writes a snapshot as one file per key, touching only files whose value changed"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.written: Dict[str, str] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _replace(self, relative: str, content: str):
+        path = os.path.join(self.directory, relative)
+        parent = os.path.dirname(path)
+        os.makedirs(parent, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=parent, prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+
+    def write(self, snapshot: Dict[str, str], timestamp: float):
+        for relative, value in snapshot.items():
+            if self.written.get(relative) != value:
+                self._replace(relative, value + "\n")
+                self.written[relative] = value
+        # Interfaces or mounts that went away: remove their files so the items become unsupported
+        for relative in set(self.written) - set(snapshot):
+            try:
+                os.remove(os.path.join(self.directory, relative))
+            except OSError:
+                pass
+            del self.written[relative]
+        self._replace("snapshot.json", json.dumps({"timestamp": timestamp, "values": snapshot}, sort_keys=True))
+
+
+def key_parameter(value: str) -> str:
+    """Quote an item key parameter when Zabbix would otherwise split or misread it"""
+    if value and not value.startswith((" ", '"')) and not any(c in value for c in ',]'):
+        return value
+    return '"' + value.replace('"', '\\"') + '"'
+
+
+def item_key(relative: str) -> str:
+    """Zabbix item key for a snapshot path (custom.net.if.in/enp86s0/.value -> custom.net.if.in[enp86s0])"""
+    if not relative.endswith("/" + VALUE_FILE):
+        return relative
+    path = relative[:-len(VALUE_FILE) - 1]
+    if path.startswith(MOUNT_KEY):
+        key, params = MOUNT_KEY, [path[len(MOUNT_KEY):] or "/"]
+    else:
+        key, _, rest = path.partition("/")
+        params = rest.split("/") if rest else []
+    return f"{key}[{','.join(key_parameter(p) for p in params)}]" if params else key
+
+
+def userparameters(directory: str = OUTPUT_DIR) -> str:
+    """UserParameter lines serving every key from the snapshot files"""
+    lines = [
+        f"# Served by zabbix/scripts/host_metrics_daemon.py from {directory}",
+        "# Replace the matching system_monitor.sh / network_monitor.sh / power_monitor.sh lines",
+        "# with these; the agent refuses to start when a key is defined twice.",
+    ]
+    for key in PLAIN_KEYS:
+        lines.append(f'UserParameter={key},read -r v < {directory}/{key} && echo "$v"')
+    lines.append(f'UserParameter={MOUNT_KEY}[*],read -r v < {directory}/{MOUNT_KEY}$1/{VALUE_FILE} && echo "$v"')
+    for key in NET_DEV_KEYS:
+        lines.append(f'UserParameter={key}[*],read -r v < {directory}/{key}/$1/{VALUE_FILE} && echo "$v"')
+    lines.append(f'UserParameter={CPU_KEY}[*],read -r v < {directory}/{CPU_KEY}/$1/$2/{VALUE_FILE} && echo "$v"')
+    lines.append(f'UserParameter={PRESSURE_KEY}[*],read -r v < {directory}/{PRESSURE_KEY}/$1/$2/$3/{VALUE_FILE} && echo "$v"')
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot host metrics for the Zabbix agent")
+    parser.add_argument("--dir", default=OUTPUT_DIR, help=f"Output directory (default: {OUTPUT_DIR})")
+    parser.add_argument("--interval", type=float, default=INTERVAL, help=f"Seconds between snapshots (default: {INTERVAL:g})")
+    parser.add_argument("--once", action="store_true", help="Write one snapshot and exit")
+    parser.add_argument("--exporter-port", type=int, default=EXPORTER_PORT,
+                        help="Serve CPU and PSI metrics for Prometheus on this port (default: off)")
+    parser.add_argument("--userparameters", action="store_true", help="Print the agent UserParameter lines and exit")
+    args = parser.parse_args()
+
+    if args.userparameters:
+        sys.stdout.write(userparameters(args.dir))
+        return
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    collector = HostCollector()
+    writer = SnapshotWriter(args.dir)
+    logger.info(f"Writing host metrics to {args.dir} every {args.interval:g}s (sysfs: {collector.sysfs})")
+    if args.exporter_port and not args.once:
+        from prometheus_client import REGISTRY, start_http_server
+        REGISTRY.register(SampleCollector(collector))
+        start_http_server(args.exporter_port)
+        logger.info(f"Serving CPU and PSI metrics on :{args.exporter_port}/metrics")
+
+    next_run = time.monotonic()
+    while True:
+        try:
+            snapshot = collector.snapshot()
+            writer.write(snapshot, time.time())
+        except Exception as e:
+            logger.error(f"Snapshot failed: {e}")
+        if args.once:
+            break
+        next_run += args.interval
+        time.sleep(max(0.0, next_run - time.monotonic()))
+
+
+if __name__ == "__main__":
+    main()
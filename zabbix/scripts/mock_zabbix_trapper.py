@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Mock Zabbix trapper for testing zabbix_bulk_sender.py without a server
+
+Listens like the server's trapper (port 10051), decodes sender-protocol
+batches, answers "processed: N; failed: M; ..." the way the server does
+and prints one line per batch. With --items only the listed host/key
+pairs count as processed; everything else fails, as items that do not
+exist (or are not trapper items) on the server would. Batches can also be
+appended to a JSON lines file for inspection.
+
+Usage:
+  python3 mock_zabbix_trapper.py                                  # 127.0.0.1:10051
+  python3 mock_zabbix_trapper.py --port 10151 --output /tmp/batches.jsonl -v
+  python3 mock_zabbix_trapper.py --items items.txt                # "host key" per line
+"""
+
+import argparse
+import json
+import socketserver
+import threading
+import time
+from typing import List, Optional, Set, Tuple
+
+from zabbix_bulk_sender import DEFAULT_PORT, pack, read_packet
+
+
+class TrapperHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        started = time.perf_counter()
+        try:
+            request = read_packet(self.request)
+        except (ValueError, ConnectionError) as e:
+            self.request.sendall(pack({"response": "failed", "info": f"cannot parse request: {e}"}))
+            return
+        if request.get("request") != "sender data" or not isinstance(request.get("data"), list):
+            self.request.sendall(pack({"response": "failed", "info": "expected a sender data request"}))
+            return
+
+        items = request["data"]
+        known = self.server.known_items
+        processed = sum(1 for item in items if known is None or (item.get("host"), item.get("key")) in known)
+        self.server.record(self.client_address[0], items, processed)
+        info = (f"processed: {processed}; failed: {len(items) - processed}; total: {len(items)}; "
+                f"seconds spent: {time.perf_counter() - started:.6f}")
+        self.request.sendall(pack({"response": "success", "info": info}))
+
+
+class MockTrapper(socketserver.ThreadingTCPServer):
+    """Trapper listener that keeps every batch it received (in .batches) for tests"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], known_items: Optional[Set[Tuple[str, str]]] = None,
+                 output: Optional[str] = None, verbose: bool = False):
+        super().__init__(address, TrapperHandler)
+        self.known_items = known_items
+        self.output = output
+        self.verbose = verbose
+        self.batches: List[List[dict]] = []
+        self.lock = threading.Lock()
+
+    def record(self, client: str, items: List[dict], processed: int):
+        with self.lock:
+            self.batches.append(items)
+            hosts = sorted({item.get("host", "") for item in items})
+            print(f"📥 {client}: {len(items)} item(s) for {', '.join(hosts)}, "
+                  f"{processed} processed, {len(items) - processed} failed", flush=True)
+            if self.verbose:
+                for item in items:
+                    print(f"   {item.get('host')} {item.get('key')} = {item.get('value')!r}")
+            if self.output:
+                with open(self.output, "a") as f:
+                    f.write(json.dumps({"received": time.time(), "client": client, "data": items}) + "\n")
+
+
+def load_items(path: str) -> Set[Tuple[str, str]]:
+    """"host key" pairs, one per line"""
+    items = set()
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                host, _, key = line.partition(" ")
+                items.add((host, key.strip()))
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Zabbix trapper that prints received sender batches")
+    parser.add_argument("--bind", default="127.0.0.1", help="Listen address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Listen port (default: {DEFAULT_PORT})")
+    parser.add_argument("--items", help='File of "host key" lines; other items are reported as failed')
+    parser.add_argument("--output", help="Append every batch to this JSON lines file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every item")
+    args = parser.parse_args()
+
+    known = load_items(args.items) if args.items else None
+    with MockTrapper((args.bind, args.port), known, args.output, args.verbose) as server:
+        print(f"🚀 Mock Zabbix trapper listening on {args.bind}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
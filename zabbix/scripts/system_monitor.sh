@@ -9,19 +9,43 @@ log_message() {
     echo "$(date '+%Y-%m-%d %H:%M:%S') - $1" >&2
 }
 
+# Previous /proc/stat sample, so CPU usage covers the time since the last call
+CPU_STATE_FILE="${ZBX_CPU_STATE_FILE:-/tmp/zabbix_system_monitor_cpu.state}"
+
 # Function to get CPU usage percentage
 get_cpu_usage() {
-    # Get CPU usage from /proc/stat
-    local cpu_info=$(grep '^cpu ' /proc/stat)
-    local idle=$(echo $cpu_info | awk '{print $5}')
-    local total=0
-    
-    for val in $cpu_info; do
-        total=$((total + val))
-    done
-    
-    # Calculate usage percentage
-    local usage=$((100 - (idle * 100) / total))
+    # Usage since the previous call from the difference of two /proc/stat samples
+    # (idle and iowait count as not busy); the first call falls back to the since-boot average
+    local label user nice system idle iowait irq softirq steal rest
+    read -r label user nice system idle iowait irq softirq steal rest < /proc/stat
+    local total=$((user + nice + system + idle + iowait + irq + softirq + steal))
+    local not_busy=$((idle + iowait))
+    # Microseconds without forking date (bash 5); older shells fall back to date
+    local now_us="${EPOCHREALTIME/[.,]/}"
+    [ -n "$now_us" ] || now_us=$(date +%s%6N)
+
+    local prev_total=0 prev_not_busy=0 prev_usage="" prev_us=""
+    if [ -r "$CPU_STATE_FILE" ]; then
+        read -r prev_total prev_not_busy prev_usage prev_us < "$CPU_STATE_FILE"
+    fi
+
+    # cpu_usage, cpu_warning and system_health run back to back in one poll; reuse the last
+    # result for a second instead of measuring a few milliseconds. Wall time rather than
+    # jiffies, which add up over all cores and pass any fixed threshold quickly on large hosts
+    if [ -n "$prev_usage" ] && [ -n "$prev_us" ] && [ "$now_us" -ge "$prev_us" ] && \
+       [ $((now_us - prev_us)) -lt 1000000 ]; then
+        echo "$prev_usage"
+        return
+    fi
+
+    local delta_total=$((total - prev_total))
+    local usage
+    if [ -n "$prev_usage" ] && [ "$delta_total" -gt 0 ]; then
+        usage=$(( (delta_total - (not_busy - prev_not_busy)) * 100 / delta_total ))
+    else
+        usage=$(( (total - not_busy) * 100 / total ))
+    fi
+    echo "$total $not_busy $usage $now_us" > "$CPU_STATE_FILE" 2>/dev/null
     echo $usage
 }
 
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Zabbix bulk sender for ZCAM and host metrics
+
+Every item in the agent confs is a passive check: a server poller connects
+to the agent once per item and the agent runs one script per item
+(check_zcam_status.sh curls the camera, system_monitor.sh forks
+grep/awk/df, ...). configure_active_checks.sh only moves the agent
+interface; the items are still fetched one at a time. This collector
+gathers the same values in one pass per interval - every camera endpoint
+requested once and concurrently, the system keys from one
+host_metrics_daemon.HostCollector snapshot - and pushes them with the
+Zabbix sender protocol as one trapper batch per host. The server takes
+each batch on a single trapper connection instead of scheduling a poller
+per item, and all values of a batch share one clock.
+
+Items sent (create them as "Zabbix trapper" items on the server):
+  --host        every key host_metrics_daemon.py serves (system.*, host.*, power.*, custom.net.*),
+                e.g. host.cpu.util[cpu3,iowait], system.disk.usage.mount[/var]
+  --host        zcam.status (the value check_zcam_status.sh / check_zcam_detailed.sh print),
+                zcam.rtmp.bandwidth, zcam.rtmp.code, zcam.rtmp.autorestart, zcam.rtmp.url
+  --fleet-host  zcam.<agent>.rtmp.status, .battery.level, .camera.mode, .rtmp.bandwidth,
+                .health.score, .resolution, .iso for every device in zcam_devices.conf
+                (the keys of zabbix_zcam_items.conf); only with --fleet-host
+
+Values of a camera endpoint that did not answer are left out of the batch,
+so the items go stale (nodata triggers) instead of receiving "ERROR";
+zcam.status still reports connection_error / empty_response / invalid_json
+like the scripts do.
+
+Environment:
+  ZABBIX_SERVER            trapper address, host[:port] (default: ServerActive of --agent-conf, else 127.0.0.1)
+  ZABBIX_HOSTNAME          host name of the batch (default: Hostname of --agent-conf, else the system host name)
+  ZABBIX_SENDER_INTERVAL   seconds between batches (default 30)
+  ZABBIX_SENDER_KEYS       comma-separated key patterns to send (default: all)
+  ZCAM_IP                  the host's camera (default 192.168.88.175, as in check_zcam_status.sh)
+  ZCAM_DEVICES_FILE        device inventory for --fleet-host (default ../zcam_devices.conf)
+
+Test locally against the mock trapper:
+  python3 mock_zabbix_trapper.py &
+  python3 zabbix_bulk_sender.py --server 127.0.0.1 --once
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import sys
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+from host_metrics_daemon import HostCollector, item_key
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger("zabbix_bulk_sender")
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PORT = 10051
+SERVER = os.environ.get("ZABBIX_SERVER", "")
+HOSTNAME = os.environ.get("ZABBIX_HOSTNAME", "")
+INTERVAL = float(os.environ.get("ZABBIX_SENDER_INTERVAL", "30"))
+KEY_PATTERNS = os.environ.get("ZABBIX_SENDER_KEYS", "*")
+ZCAM_IP = os.environ.get("ZCAM_IP", "192.168.88.175")
+DEVICES_FILE = os.environ.get("ZCAM_DEVICES_FILE", os.path.join(SCRIPTS_DIR, "..", "zcam_devices.conf"))
+REQUEST_TIMEOUT = 5
+SEND_TIMEOUT = 10
+# Minimum gap between the priming /proc/stat read and the first batch's CPU sample
+CPU_PRIME_SECONDS = 1.0
+
+# Zabbix protocol header: "ZBXD", flags, then data length and reserved (uncompressed length)
+PROTOCOL = b"ZBXD"
+FLAG_ZABBIX = 0x01
+FLAG_COMPRESSED = 0x02
+FLAG_LARGE = 0x04
+
+RTMP_PATH = "/ctrl/rtmp?action=query&index=0"
+# Fleet item suffix -> (endpoint path, response field), as in zcam_single_check.sh
+FLEET_ITEMS = {
+    "rtmp.status": (RTMP_PATH, "status"),
+    "battery.level": ("/ctrl/get?k=battery", "value"),
+    "camera.mode": ("/ctrl/mode", "msg"),
+    "rtmp.bandwidth": (RTMP_PATH, "bw"),
+    "resolution": ("/ctrl/get?k=resolution", "value"),
+    "iso": ("/ctrl/get?k=iso", "value"),
+}
+# Local camera keys from the RTMP query (zcam.status comes from the same response)
+RTMP_ITEMS = {
+    "zcam.rtmp.bandwidth": "bw",
+    "zcam.rtmp.code": "code",
+    "zcam.rtmp.autorestart": "autoRestart",
+    "zcam.rtmp.url": "url",
+}
+
+
+def pack(payload: dict) -> bytes:
+    """Frame a JSON payload as a Zabbix protocol packet"""
+    data = json.dumps(payload, separators=(",", ":")).encode()
+    return PROTOCOL + bytes([FLAG_ZABBIX]) + struct.pack("<Q", len(data)) + data
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise ConnectionError("connection closed mid-packet")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_packet(sock: socket.socket) -> dict:
+    """Read one Zabbix protocol packet (plain, compressed or large) and decode its JSON body"""
+    header = _recv_exactly(sock, 5)
+    if header[:4] != PROTOCOL:
+        raise ValueError(f"not a Zabbix protocol packet: {header!r}")
+    flags = header[4]
+    if flags & FLAG_LARGE:
+        length, _ = struct.unpack("<QQ", _recv_exactly(sock, 16))
+    else:
+        length, _ = struct.unpack("<II", _recv_exactly(sock, 8))
+    body = _recv_exactly(sock, length)
+    if flags & FLAG_COMPRESSED:
+        body = zlib.decompress(body)
+    return json.loads(body)
+
+
+def parse_info(info: str) -> Dict[str, float]:
+    """Server reply info ("processed: 3; failed: 0; total: 3; seconds spent: 0.000069") as a dict"""
+    result = {}
+    for part in info.split(";"):
+        name, _, value = part.partition(":")
+        try:
+            result[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return result
+
+
+class ZabbixSender:
+    """Sends item batches to a Zabbix server (or proxy) trapper"""
+
+    def __init__(self, server: str, port: int = DEFAULT_PORT, timeout: float = SEND_TIMEOUT):
+        self.server = server
+        self.port = port
+        self.timeout = timeout
+
+    def send(self, items: List[dict]) -> Dict[str, float]:
+        """
+        Send one batch over one connection
+
+        Args:
+            items: {"host", "key", "value", "clock", "ns"} dicts
+
+        Returns:
+            dict: processed / failed / total / seconds spent, as reported by the server
+        """
+        now = time.time()
+        request = {"request": "sender data", "data": items, "clock": int(now), "ns": int(now % 1 * 1e9)}
+        with socket.create_connection((self.server, self.port), timeout=self.timeout) as sock:
+            sock.sendall(pack(request))
+            reply = read_packet(sock)
+        if reply.get("response") != "success":
+            raise RuntimeError(f"server rejected the batch: {reply.get('info', reply)}")
+        return parse_info(reply.get("info", ""))
+
+
+def batch(host: str, values: Dict[str, str], timestamp: float) -> List[dict]:
+    """Items of one host, all stamped with the collection time"""
+    clock, ns = int(timestamp), int(timestamp % 1 * 1e9)
+    return [{"host": host, "key": key, "value": str(value), "clock": clock, "ns": ns}
+            for key, value in values.items()]
+
+
+def load_devices(path: str) -> List[Tuple[str, str, str]]:
+    """(device name, IP, agent name) per line of zcam_devices.conf"""
+    devices = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = [field.strip() for field in line.split("|")]
+            if len(fields) >= 3:
+                devices.append((fields[0], fields[1], fields[2]))
+    return devices
+
+
+def read_agent_conf(path: str) -> Dict[str, str]:
+    """Hostname and ServerActive of an agent2 conf"""
+    settings = {}
+    with open(path) as f:
+        for line in f:
+            name, _, value = line.strip().partition("=")
+            if name in ("Hostname", "ServerActive") and value:
+                settings[name] = value.strip()
+    return settings
+
+
+async def fetch_json(session: aiohttp.ClientSession, ip: str, path: str) -> Tuple[Optional[dict], str]:
+    """(response JSON, "") or (None, the scripts' error value)"""
+    try:
+        async with session.get(f"http://{ip}{path}") as response:
+            text = await response.text()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        return None, "connection_error"
+    if not text.strip():
+        return None, "empty_response"
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None, "invalid_json"
+    if not isinstance(data, dict):
+        return None, "invalid_json"
+    return data, ""
+
+
+def fleet_values(agent: str, responses: Dict[str, Tuple[Optional[dict], str]]) -> Dict[str, str]:
+    """zcam.<agent>.* values of one device from its endpoint responses"""
+    values = {}
+    for suffix, (path, field) in FLEET_ITEMS.items():
+        data = responses[path][0]
+        if data is not None and field in data:
+            values[f"zcam.{agent}.{suffix}"] = data[field]
+
+    # Health score as in zcam_single_check.sh: streaming, battery >= 30, recording mode
+    checks = [(RTMP_PATH, "status", lambda v: v == "busy"),
+              ("/ctrl/get?k=battery", "value", lambda v: float(v) >= 30),
+              ("/ctrl/mode", "msg", lambda v: v == "rec")]
+    if any(responses[path][0] is not None for path, _, _ in checks):
+        passed = 0
+        for path, field, check in checks:
+            data = responses[path][0]
+            try:
+                passed += bool(data is not None and check(data.get(field)))
+            except (TypeError, ValueError):
+                pass
+        values[f"zcam.{agent}.health.score"] = passed * 100 // len(checks)
+    return values
+
+
+class BulkCollector:
+    """One collection pass: host snapshot plus every camera endpoint, grouped into per-host item values"""
+
+    def __init__(self, host: str, zcam_ip: str, fleet_host: str = "", devices_file: str = DEVICES_FILE,
+                 key_patterns: str = KEY_PATTERNS):
+        self.host = host
+        self.zcam_ip = zcam_ip
+        self.fleet_host = fleet_host
+        self.devices_file = devices_file
+        self.patterns = [pattern.strip() for pattern in key_patterns.split(",") if pattern.strip()]
+        self.collector = HostCollector()
+        # The first CPU sample is the average since boot; take it now so the first batch measures a real interval
+        self.collector.cpu.sample()
+        self.primed_at = time.monotonic()
+
+    def wanted(self, key: str) -> bool:
+        return any(fnmatch.fnmatchcase(key, pattern) for pattern in self.patterns)
+
+    def system_values(self) -> Dict[str, str]:
+        return {item_key(relative): value for relative, value in self.collector.snapshot().items()}
+
+    async def collect(self, session: aiohttp.ClientSession) -> Dict[str, Dict[str, str]]:
+        """host -> key -> value for one interval"""
+        devices = load_devices(self.devices_file) if self.fleet_host else []
+
+        # Each (ip, path) is requested once even when several items (or the local camera) use it
+        requests = set()
+        if self.zcam_ip:
+            requests.add((self.zcam_ip, RTMP_PATH))
+        for _, ip, _ in devices:
+            requests.update((ip, path) for path, _ in FLEET_ITEMS.values())
+        requests = sorted(requests)
+
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(max(0.0, self.primed_at + CPU_PRIME_SECONDS - time.monotonic()))
+        system = loop.run_in_executor(None, self.system_values)
+        responses = await asyncio.gather(*(fetch_json(session, ip, path) for ip, path in requests))
+        by_request = dict(zip(requests, responses))
+
+        values = {self.host: dict(await system)}
+        if self.zcam_ip:
+            data, error = by_request[(self.zcam_ip, RTMP_PATH)]
+            local = values[self.host]
+            local["zcam.status"] = error or data.get("status", "parse_error")
+            if data is not None:
+                local.update({key: data[field] for key, field in RTMP_ITEMS.items() if field in data})
+        for _, ip, agent in devices:
+            fleet = fleet_values(agent, {path: by_request[(ip, path)] for path, _ in FLEET_ITEMS.values()})
+            values.setdefault(self.fleet_host, {}).update(fleet)
+
+        return {host: {key: value for key, value in items.items() if self.wanted(key)}
+                for host, items in values.items()}
+
+
+async def run(args, collector: BulkCollector, sender: ZabbixSender):
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=0)
+    loop = asyncio.get_running_loop()
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        next_run = time.monotonic()
+        while True:
+            started = time.perf_counter()
+            try:
+                per_host = await collector.collect(session)
+            except Exception as e:
+                logger.error(f"Collection failed: {e}")
+                per_host = {}
+            collected = time.perf_counter() - started
+            # Stamped once collected: the first pass waits out CPU_PRIME_SECONDS before sampling
+            timestamp = time.time()
+
+            for host, values in per_host.items():
+                if not values:
+                    # e.g. the fleet host while every camera is down; nothing to send
+                    continue
+                items = batch(host, values, timestamp)
+                if args.dry_run:
+                    print(json.dumps({"request": "sender data", "data": items}, indent=2))
+                    continue
+                try:
+                    result = await loop.run_in_executor(None, sender.send, items)
+                except (OSError, ValueError, RuntimeError) as e:
+                    logger.error(f"{host}: sending {len(items)} item(s) to {sender.server}:{sender.port} failed: {e}")
+                    continue
+                message = (f"{host}: {int(result.get('processed', 0))} processed, {int(result.get('failed', 0))} failed "
+                           f"of {len(items)} (collected in {collected * 1000:.0f}ms)")
+                if result.get("failed"):
+                    # Keys with no trapper item on that host (or a host the server does not know) count as failed
+                    logger.warning(message)
+                else:
+                    logger.info(message)
+
+            if args.once:
+                break
+            next_run += args.interval
+            await asyncio.sleep(max(0.0, next_run - time.monotonic()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Push ZCAM and host metrics to Zabbix trappers in one batch per host")
+    parser.add_argument("--agent-conf", help="agent2 conf to take Hostname and ServerActive from")
+    parser.add_argument("--server", default=SERVER, help="Zabbix server/proxy trapper, host[:port]")
+    parser.add_argument("--host", default=HOSTNAME, help="Zabbix host name for system and zcam.* items")
+    parser.add_argument("--fleet-host", default="", help="Zabbix host for the zcam.<agent>.* fleet items (default: off)")
+    parser.add_argument("--zcam-ip", default=ZCAM_IP, help="This host's camera; empty to skip zcam.* items")
+    parser.add_argument("--devices", default=DEVICES_FILE, help="zcam_devices.conf for the fleet items")
+    parser.add_argument("--keys", default=KEY_PATTERNS, help="Comma-separated key patterns to send (default: all)")
+    parser.add_argument("--interval", type=float, default=INTERVAL, help=f"Seconds between batches (default: {INTERVAL:g})")
+    parser.add_argument("--once", action="store_true", help="Send one batch per host and exit")
+    parser.add_argument("--dry-run", action="store_true", help="Print the batches instead of sending them")
+    args = parser.parse_args()
+
+    conf = read_agent_conf(args.agent_conf) if args.agent_conf else {}
+    host = args.host or conf.get("Hostname") or socket.gethostname()
+    server = args.server or conf.get("ServerActive", "127.0.0.1").split(",")[0]
+    address, _, port = server.strip().rpartition(":") if server.count(":") == 1 else (server, "", "")
+    sender = ZabbixSender(address.strip(), int(port or DEFAULT_PORT))
+
+    collector = BulkCollector(host, args.zcam_ip, args.fleet_host, args.devices, args.keys)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    logger.info(f"Sending {host}{' and ' + args.fleet_host if args.fleet_host else ''} to "
+                f"{sender.server}:{sender.port} every {args.interval:g}s")
+    try:
+        asyncio.run(run(args, collector, sender))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
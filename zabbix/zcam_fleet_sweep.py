@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+ZCAM fleet health sweep
+
+Replaces the device loop of zcam_multi_monitor.sh, which pinged and then
+curled each camera one request at a time (--max-time 5 each) and parsed
+the replies with grep/sed, so one slow camera held up the whole fleet.
+Here every check of every device in zcam_devices.conf runs concurrently,
+so a sweep takes about as long as the slowest single request:
+
+  camera     TCP connect to port 80, then /ctrl/rtmp?action=query&index=0,
+             /ctrl/get?k=battery, /ctrl/mode, /ctrl/get?k=resolution, /ctrl/get?k=iso
+  stream     the camera's RTMP URL against rtmp://<RTMP_SERVER>:1935/live/<STREAM_KEY>
+  server     TCP connect to RTMP_SERVER:1935, once per server
+  stream key whether STREAM_KEY is being published, from the SRS HTTP API
+             (/api/v1/streams/ on port 1985, once per server); unknown when the
+             API does not answer
+
+Health is the share of the four checks the shell loop scored (camera
+reachable, streaming, battery >= 30%, recording mode), graded HEALTHY >= 80,
+WARNING >= 60, else CRITICAL as before, so one failed check still makes a
+device WARNING. The RTMP server and stream key checks are reported
+separately (stream_checks, zcam_sweep_rtmp_server_up and
+zcam_sweep_stream_published) and listed as issues, but do not change the
+score. The exit code is the script's overall status (0 healthy, 1 warning,
+2 critical), so zcam.system.health keeps working.
+
+Reports:
+  --format text        human-readable summary (default)
+  --format json        one JSON document with every device and check
+  --format prometheus  text exposition; with --output, written atomically for the
+                       node_exporter textfile collector
+
+Usage:
+  python3 zcam_fleet_sweep.py
+  python3 zcam_fleet_sweep.py --format json
+  python3 zcam_fleet_sweep.py --format prometheus --output /var/lib/node_exporter/textfile/zcam_fleet.prom
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import aiohttp
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = os.environ.get("ZCAM_DEVICES_FILE", os.path.join(SCRIPT_DIR, "zcam_devices.conf"))
+TIMEOUT = float(os.environ.get("ZCAM_REQUEST_TIMEOUT", "5"))
+CONNECT_TIMEOUT = 2
+RTMP_PORT = 1935
+SRS_API_PORT = int(os.environ.get("SRS_API_PORT", "1985"))
+
+ENDPOINTS = {
+    "rtmp": "/ctrl/rtmp?action=query&index=0",
+    "battery": "/ctrl/get?k=battery",
+    "mode": "/ctrl/mode",
+    "resolution": "/ctrl/get?k=resolution",
+    "iso": "/ctrl/get?k=iso",
+}
+# Enough connections for all endpoints of a camera at once, so a slow camera costs one request time
+CONNECTIONS_PER_DEVICE = int(os.environ.get("ZCAM_CONNECTIONS_PER_DEVICE", str(len(ENDPOINTS))))
+BATTERY_LOW = 30
+HEALTHY, WARNING, CRITICAL = "HEALTHY", "WARNING", "CRITICAL"
+STATUS_CODES = {HEALTHY: 0, WARNING: 1, CRITICAL: 2}
+
+
+class Device(NamedTuple):
+    name: str
+    ip: str
+    agent: str
+    rtmp_server: str
+    stream_key: str
+
+
+def load_devices(path: str) -> List[Device]:
+    """DEVICE_NAME|IP_ADDRESS|AGENT_NAME|RTMP_SERVER|STREAM_KEY lines of zcam_devices.conf"""
+    devices = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = [field.strip() for field in line.split("|")]
+            if len(fields) < 2 or not fields[0] or not fields[1]:
+                raise ValueError(f"{path}:{line_number}: expected DEVICE_NAME|IP_ADDRESS|AGENT_NAME|RTMP_SERVER|STREAM_KEY")
+            devices.append(Device(*(fields + [""] * 5)[:5]))
+    return devices
+
+
+async def tcp_check(host: str, port: int) -> Dict[str, Any]:
+    """Whether host:port accepts a connection, and how long the connect took"""
+    started = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), CONNECT_TIMEOUT)
+    except (OSError, asyncio.TimeoutError) as e:
+        return {"ok": False, "seconds": round(time.perf_counter() - started, 4), "error": str(e) or type(e).__name__}
+    writer.close()
+    return {"ok": True, "seconds": round(time.perf_counter() - started, 4)}
+
+
+async def get_json(session: aiohttp.ClientSession, url: str) -> Dict[str, Any]:
+    """{"ok", "seconds", "data"} for a JSON object response, else {"ok": False, "error"}"""
+    started = time.perf_counter()
+    try:
+        async with session.get(url) as response:
+            body = await response.text()
+            status = response.status
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return {"ok": False, "seconds": round(time.perf_counter() - started, 4), "error": str(e) or type(e).__name__}
+    result = {"seconds": round(time.perf_counter() - started, 4), "http_status": status}
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return {**result, "ok": False, "error": "invalid_json"}
+    if status != 200 or not isinstance(data, dict):
+        return {**result, "ok": False, "error": f"unexpected response (HTTP {status})"}
+    return {**result, "ok": True, "data": data}
+
+
+async def published_streams(session: aiohttp.ClientSession, server: str) -> Optional[Dict[str, dict]]:
+    """Stream name -> SRS stream entry for streams being published on the server, None when the API is unavailable"""
+    result = await get_json(session, f"http://{server}:{SRS_API_PORT}/api/v1/streams/?count=1000")
+    if not result["ok"]:
+        return None
+    return {stream.get("name"): stream for stream in result["data"].get("streams", [])
+            if stream.get("publish", {}).get("active")}
+
+
+def evaluate(device: Device, connect: Dict[str, Any], responses: Dict[str, Dict[str, Any]],
+             server_check: Optional[Dict[str, Any]], streams: Optional[Dict[str, dict]]) -> Dict[str, Any]:
+    """Device report: values, per-check results, health and issues"""
+    report: Dict[str, Any] = {
+        "device_name": device.name, "device_ip": device.ip, "agent": device.agent,
+        "rtmp_server": device.rtmp_server, "stream_key": device.stream_key,
+        "reachable": connect["ok"],
+        "requests": {"connect": connect, **{name: {k: v for k, v in result.items() if k != "data"}
+                                            for name, result in responses.items()}},
+    }
+    issues: List[str] = []
+    # Scored checks, the same four as zcam_multi_monitor.sh; stream_checks are reported but not scored
+    checks: Dict[str, bool] = {"reachable": connect["ok"]}
+    stream_checks: Dict[str, bool] = {}
+    if not connect["ok"]:
+        issues.append("Host unreachable")
+
+    def value(endpoint: str, field: str):
+        result = responses[endpoint]
+        return result["data"].get(field) if result["ok"] else None
+
+    rtmp = responses["rtmp"]
+    if rtmp["ok"]:
+        data = rtmp["data"]
+        report.update(rtmp_status=data.get("status"), rtmp_url=data.get("url"),
+                      bandwidth_mbps=data.get("bw"), auto_restart=data.get("autoRestart") == 1)
+        checks["streaming"] = data.get("status") == "busy"
+        if not checks["streaming"]:
+            issues.append("Not streaming")
+    else:
+        checks["streaming"] = False
+        issues.append("RTMP API failed")
+
+    battery = value("battery", "value")
+    try:
+        report["battery_level"] = float(battery)
+        checks["battery"] = report["battery_level"] >= BATTERY_LOW
+        if report["battery_level"] < 80:
+            issues.append(f"Battery {'low' if not checks['battery'] else 'medium'} ({battery}%)")
+    except (TypeError, ValueError):
+        checks["battery"] = False
+        issues.append("Battery API failed")
+
+    report["camera_mode"] = value("mode", "msg")
+    checks["recording_mode"] = report["camera_mode"] == "rec"
+    if report["camera_mode"] is None:
+        issues.append("Mode API failed")
+    elif not checks["recording_mode"]:
+        issues.append("Not in recording mode")
+
+    report["resolution"] = value("resolution", "value")
+    report["iso"] = value("iso", "value")
+
+    if device.rtmp_server:
+        expected = f"rtmp://{device.rtmp_server}:{RTMP_PORT}/live/{device.stream_key}"
+        report["expected_rtmp_url"] = expected
+        report["rtmp_url_match"] = report.get("rtmp_url") == expected
+        if rtmp["ok"] and not report["rtmp_url_match"]:
+            issues.append("Unexpected stream URL")
+
+        report["rtmp_server_reachable"] = server_check["ok"]
+        stream_checks["rtmp_server"] = server_check["ok"]
+        if not server_check["ok"]:
+            issues.append(f"RTMP server {device.rtmp_server}:{RTMP_PORT} unreachable")
+
+        # None: the SRS API did not answer, so the stream key is not counted either way
+        stream = streams.get(device.stream_key) if streams is not None else None
+        report["stream_published"] = None if streams is None else stream is not None
+        if streams is not None:
+            stream_checks["stream_published"] = stream is not None
+            if stream is None:
+                issues.append(f"Stream key {device.stream_key} not published on {device.rtmp_server}")
+            else:
+                report["stream_kbps"] = stream.get("kbps", {}).get("recv_30s")
+
+    report["checks"] = checks
+    report["stream_checks"] = stream_checks
+    report["health_percent"] = sum(checks.values()) * 100 // len(checks) if connect["ok"] else 0
+    report["status"] = (HEALTHY if report["health_percent"] >= 80
+                        else WARNING if report["health_percent"] >= 60 else CRITICAL)
+    report["issues"] = issues
+    return report
+
+
+async def sweep(devices: List[Device], timeout: float = TIMEOUT) -> Dict[str, Any]:
+    """Check every device, RTMP server and stream key concurrently"""
+    started = time.perf_counter()
+    servers = sorted({device.rtmp_server for device in devices if device.rtmp_server})
+    client_timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=CONNECT_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=0, limit_per_host=CONNECTIONS_PER_DEVICE)
+    async with aiohttp.ClientSession(timeout=client_timeout, connector=connector) as session:
+        connects = [tcp_check(device.ip, 80) for device in devices]
+        requests = [get_json(session, f"http://{device.ip}{path}") for device in devices for path in ENDPOINTS.values()]
+        server_checks = [tcp_check(server, RTMP_PORT) for server in servers]
+        stream_lists = [published_streams(session, server) for server in servers]
+        results = await asyncio.gather(*connects, *requests, *server_checks, *stream_lists)
+
+    connect_results = results[:len(devices)]
+    request_results = results[len(devices):len(devices) * (1 + len(ENDPOINTS))]
+    server_results = dict(zip(servers, results[len(devices) * (1 + len(ENDPOINTS)):][:len(servers)]))
+    stream_results = dict(zip(servers, results[len(devices) * (1 + len(ENDPOINTS)) + len(servers):]))
+
+    reports = []
+    for index, device in enumerate(devices):
+        responses = dict(zip(ENDPOINTS, request_results[index * len(ENDPOINTS):(index + 1) * len(ENDPOINTS)]))
+        reports.append(evaluate(device, connect_results[index], responses,
+                                server_results.get(device.rtmp_server), stream_results.get(device.rtmp_server)))
+
+    counts = {status: sum(1 for report in reports if report["status"] == status) for status in STATUS_CODES}
+    overall = counts[HEALTHY] * 100 // len(reports) if reports else 0
+    return {
+        "timestamp": time.time(),
+        "duration_seconds": round(time.perf_counter() - started, 4),
+        "total_devices": len(reports),
+        "healthy": counts[HEALTHY], "warning": counts[WARNING], "critical": counts[CRITICAL],
+        "overall_health_percent": overall,
+        "overall_status": HEALTHY if overall >= 80 else WARNING if overall >= 60 else CRITICAL,
+        "rtmp_servers": {server: {"reachable": server_results[server]["ok"],
+                                  "srs_api": stream_results[server] is not None} for server in servers},
+        "devices": reports,
+    }
+
+
+def prometheus_text(report: Dict[str, Any]) -> str:
+    """Render the report in the Prometheus text format"""
+    from prometheus_client import CollectorRegistry, Gauge, generate_latest
+
+    registry = CollectorRegistry()
+    labels = ["device_name", "device_ip", "agent"]
+
+    def gauge(name, documentation, labelnames=labels):
+        return Gauge(f"zcam_sweep_{name}", documentation, labelnames, registry=registry)
+
+    up = gauge("device_up", "Camera accepts connections on port 80 (1=up, 0=down)")
+    health = gauge("device_health_percent", "Share of passed device checks")
+    status = gauge("device_status", "Device status (0=healthy, 1=warning, 2=critical)")
+    streaming = gauge("rtmp_streaming", "Camera reports an active RTMP stream (1=busy)")
+    bandwidth = gauge("rtmp_bandwidth_mbps", "Camera-reported RTMP bandwidth in Mbps")
+    battery = gauge("battery_level", "Camera battery level percentage")
+    url_match = gauge("rtmp_url_match", "Camera RTMP URL matches rtmp://RTMP_SERVER:1935/live/STREAM_KEY")
+    published = gauge("stream_published", "Stream key is published on the RTMP server (SRS API)",
+                      labels + ["rtmp_server", "stream_key"])
+    request_seconds = gauge("request_duration_seconds", "Duration of each check request", labels + ["check"])
+    server_up = gauge("rtmp_server_up", "RTMP server accepts connections on port 1935", ["rtmp_server"])
+
+    for device in report["devices"]:
+        values = [device["device_name"], device["device_ip"], device["agent"]]
+        up.labels(*values).set(1 if device["reachable"] else 0)
+        health.labels(*values).set(device["health_percent"])
+        status.labels(*values).set(STATUS_CODES[device["status"]])
+        streaming.labels(*values).set(1 if device.get("rtmp_status") == "busy" else 0)
+        if isinstance(device.get("bandwidth_mbps"), (int, float)):
+            bandwidth.labels(*values).set(device["bandwidth_mbps"])
+        if device.get("battery_level") is not None:
+            battery.labels(*values).set(device["battery_level"])
+        if "rtmp_url_match" in device:
+            url_match.labels(*values).set(1 if device["rtmp_url_match"] else 0)
+        if device.get("stream_published") is not None:
+            published.labels(*values, device["rtmp_server"], device["stream_key"]).set(
+                1 if device["stream_published"] else 0)
+        for check, result in device["requests"].items():
+            request_seconds.labels(*values, check).set(result["seconds"])
+    for server, state in report["rtmp_servers"].items():
+        server_up.labels(server).set(1 if state["reachable"] else 0)
+
+    gauge("overall_health_percent", "Share of healthy devices", []).set(report["overall_health_percent"])
+    gauge("duration_seconds", "Duration of the whole sweep", []).set(report["duration_seconds"])
+    gauge("timestamp_seconds", "Unix time of the sweep", []).set(report["timestamp"])
+    return generate_latest(registry).decode()
+
+
+def text_summary(report: Dict[str, Any]) -> str:
+    icons = {HEALTHY: "✅", WARNING: "⚠️ ", CRITICAL: "❌"}
+    lines = ["=== ZCAM Fleet Sweep ===", f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}", ""]
+    for device in report["devices"]:
+        lines.append(f"{icons[device['status']]} {device['device_name']:<12} ({device['agent']}) {device['device_ip']:<15} "
+                     f"{device['status']:<8} {device['health_percent']:3d}%  "
+                     f"rtmp={device.get('rtmp_status') or '-'} bw={device.get('bandwidth_mbps', '-')} "
+                     f"battery={device.get('battery_level', '-')} mode={device.get('camera_mode') or '-'}")
+        for issue in device["issues"]:
+            lines.append(f"   ⚠ {issue}")
+    lines += [
+        "",
+        "=== GLOBAL SUMMARY ===",
+        f"Total Devices: {report['total_devices']}",
+        f"Healthy: {report['healthy']}  Warning: {report['warning']}  Critical: {report['critical']}",
+        f"Overall Status: SYSTEM {report['overall_status']} ({report['overall_health_percent']}%)",
+        f"Sweep time: {report['duration_seconds']:.2f}s",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def write_atomic(path: str, content: str):
+    """Write through a temporary file in the same directory so readers never see a partial report"""
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "w") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check every ZCAM device, RTMP server and stream key concurrently")
+    parser.add_argument("--config", default=CONFIG_FILE, help="zcam_devices.conf")
+    parser.add_argument("--format", choices=["text", "json", "prometheus"], default="text", help="Report format")
+    parser.add_argument("--output", help="Write the report to this file instead of stdout")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help=f"Per-request timeout in seconds (default: {TIMEOUT:g})")
+    parser.add_argument("--device", action="append", help="Only check this device (repeatable)")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.config):
+        print(f"❌ Configuration file not found: {args.config}", file=sys.stderr)
+        sys.exit(2)
+    devices = load_devices(args.config)
+    if args.device:
+        devices = [device for device in devices if device.name in args.device]
+
+    report = asyncio.run(sweep(devices, args.timeout))
+    if args.format == "json":
+        content = json.dumps(report, indent=2) + "\n"
+    elif args.format == "prometheus":
+        content = prometheus_text(report)
+    else:
+        content = text_summary(report)
+
+    if args.output:
+        write_atomic(args.output, content)
+    else:
+        sys.stdout.write(content)
+    sys.exit(STATUS_CODES[report["overall_status"]])
+
+
+if __name__ == "__main__":
+    main()